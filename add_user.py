@@ -3,7 +3,7 @@ from sqlalchemy.ext.asyncio import AsyncSession
 from infrastructure.database.repo.users import UserRepo
 from infrastructure.database.models import UserRole
 from infrastructure.database.setup import create_engine, create_session_pool
-from tgbot.config import load_config
+from tgbot.config import get_config
 from infrastructure.api.security.password import get_password_hash
 
 
@@ -15,7 +15,7 @@ async def add_user(
         role: UserRole = UserRole.UNIVERSITY_ADMIN
 ):
     # Загрузка конфигурации и создание сессии базы данных
-    config = load_config(".env")
+    config = get_config()
     engine = create_engine(config.db)
     session_pool = create_session_pool(engine)
 
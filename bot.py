@@ -1,25 +1,45 @@
+import argparse
 import asyncio
 import logging
+from typing import Optional
 
 from aiogram import Bot, Dispatcher
 from aiogram.fsm.storage.memory import MemoryStorage
-from aiogram.fsm.storage.redis import RedisStorage, DefaultKeyBuilder
 from aiogram.client.default import DefaultBotProperties
+from aiogram.client.session.base import BaseSession
+from aiogram.fsm.storage.base import BaseStorage
 
 from loguru import logger
-from tgbot.config import load_config, Config
+from prometheus_client import REGISTRY
+from tgbot.config import get_config, Config
 from tgbot.handlers import routers_list
 from tgbot.middlewares.config import ConfigMiddleware
 from tgbot.middlewares.database import DatabaseMiddleware
+from tgbot.middlewares.membership import MembershipMiddleware
+from tgbot.middlewares.metrics import MetricsMiddleware, HandlerLabelMiddleware, TelegramRequestMetrics
+from tgbot.middlewares.serialization import UserSerializationMiddleware
 from tgbot.services import broadcaster
-from infrastructure.database.setup import create_engine, create_session_pool
+from tgbot.services.membership import MembershipRecorder
+from tgbot.services.inline_index import InlineIndex
+from tgbot.services.metrics import PoolCollector, start_metrics_server
+from tgbot.services.session import create_bot_session
+from infrastructure.database.invalidation import InvalidationBus
+from infrastructure.database.listener import PgListener
+from infrastructure.database.partitions import maintain_response_partitions
+from infrastructure.database.setup import create_engine, create_replica, create_session_pool
 
 
 async def on_startup(bot: Bot, admin_ids: list[int]):
     await broadcaster.broadcast(bot, admin_ids, "Bot is started")
 
 
-def register_global_middlewares(dp: Dispatcher, config: Config, session_pool=None):
+def register_global_middlewares(
+        dp: Dispatcher,
+        config: Config,
+        session_pool=None,
+        storage: Optional[BaseStorage] = None,
+        membership: Optional[MembershipRecorder] = None,
+):
     """
     Register global middlewares for the given dispatcher.
     Global middlewares here are the ones that are applied to all the handlers (you specify the type of update)
@@ -28,8 +48,18 @@ def register_global_middlewares(dp: Dispatcher, config: Config, session_pool=Non
     :type dp: Dispatcher
     :param config: The configuration object from the loaded configuration.
     :param session_pool: Optional session pool object for the database using SQLAlchemy.
+    :param storage: Optional FSM storage; with `RedisStorage` updates are also serialized across processes.
+    :param membership: Optional recorder of the group members seen in messages.
     :return: None
     """
+    dp.update.outer_middleware(MetricsMiddleware())
+    dp.update.outer_middleware(
+        # Only RedisStorage has a `redis` connection
+        UserSerializationMiddleware(redis=getattr(storage, "redis", None))
+    )
+    if membership is not None:
+        dp.message.outer_middleware(MembershipMiddleware(membership))
+
     middleware_types = [
         ConfigMiddleware(config),
         DatabaseMiddleware(session_pool),
@@ -40,6 +70,13 @@ def register_global_middlewares(dp: Dispatcher, config: Config, session_pool=Non
         dp.callback_query.outer_middleware(middleware_type)
         dp.my_chat_member.outer_middleware(middleware_type)
 
+    handler_labels = HandlerLabelMiddleware()
+    dp.message.middleware(handler_labels)
+    dp.callback_query.middleware(handler_labels)
+    dp.my_chat_member.middleware(handler_labels)
+    dp.chat_member.middleware(handler_labels)
+    dp.inline_query.middleware(handler_labels)
+
 
 def setup_logging():
     """
@@ -71,6 +108,9 @@ def get_storage(config):
 
     """
     if config.tg_bot.use_redis:
+        # Imported here: redis is only loaded when it is used
+        from aiogram.fsm.storage.redis import RedisStorage, DefaultKeyBuilder
+
         return RedisStorage.from_url(
             config.redis.dsn(),
             key_builder=DefaultKeyBuilder(with_bot_id=True, with_destiny=True),
@@ -79,32 +119,142 @@ def get_storage(config):
         return MemoryStorage()
 
 
-async def main():
-    setup_logging()
-
-    config = load_config(".env")
-    storage = get_storage(config)
-
-    # Setup database
-    engine = create_engine(config.db)
-    session_pool = create_session_pool(engine)
+def create_bot(config: Config, session: Optional[BaseSession] = None) -> Bot:
+    """
+    Create the bot with the Telegram request metrics installed.
 
+    :param config: The configuration object from the loaded configuration.
+    :param session: Optional Bot API session, e.g. a fake one for local load tests.
+        By default the session talks to `config.tg_bot.api_url` when it is set.
+    :return: The bot instance.
+    """
     bot = Bot(
         token=config.tg_bot.token,
+        session=session or create_bot_session(config.tg_bot),
         default=DefaultBotProperties(parse_mode="HTML")
     )
+    bot.session.middleware(TelegramRequestMetrics())
+    return bot
+
+
+def create_dispatcher(config: Config, storage: BaseStorage, engine, session_pool) -> Dispatcher:
+    """
+    Create the dispatcher with all routers and global middlewares registered.
+
+    :param config: The configuration object from the loaded configuration.
+    :param storage: FSM storage, see `get_storage`.
+    :param engine: The database engine, available to handlers as `engine`.
+    :param session_pool: Session pool object for the database using SQLAlchemy.
+    :return: The dispatcher instance. Group members are collected by `dp["membership"]`,
+        run its `run()` to write them. Inline queries are answered from `dp["inline_index"]`,
+        kept up to date by `dp["invalidation"]` once it is attached to a running `PgListener`.
+    """
     dp = Dispatcher(storage=storage)
+    dp["engine"] = engine
+    dp["membership"] = MembershipRecorder(session_pool)
+    dp["invalidation"] = InvalidationBus()
+    dp["inline_index"] = InlineIndex(session_pool, invalidation=dp["invalidation"])
 
     dp.include_routers(*routers_list)
 
-    register_global_middlewares(dp, config, session_pool)
+    register_global_middlewares(dp, config, session_pool, storage, dp["membership"])
+    return dp
+
+
+async def run_receiver(config: Config):
+    """Poll Telegram and push the updates into the Redis streams, see `tgbot.services.update_stream`."""
+    from redis.asyncio import Redis
+    from tgbot.services.update_stream import UpdateReceiver
+
+    bot = create_bot(config)
+    redis = Redis.from_url(config.redis.dsn())
+
+    # The receiver does not handle updates, the dispatcher only tells which types are used
+    dp = Dispatcher()
+    dp.include_routers(*routers_list)
 
     await on_startup(bot, config.tg_bot.admin_ids)
-    await dp.start_polling(bot)
+    try:
+        await UpdateReceiver(bot, redis, config.stream).run(dp.resolve_used_update_types())
+    finally:
+        await redis.aclose()
+        await bot.session.close()
+
+
+async def main(mode: str = "polling", worker_index: int = 0):
+    """
+    Run the bot.
+
+    :param mode: "polling" handles the updates in this process, "worker" handles the updates
+        of its shards of the Redis streams filled by "receiver".
+    :param worker_index: Index of the worker, from 0 to `UPDATES_STREAM_WORKERS` - 1.
+    """
+    setup_logging()
+
+    config = get_config()
+    if mode == "receiver":
+        return await run_receiver(config)
+    if mode == "worker" and not config.tg_bot.use_redis:
+        logger.warning("Workers keep FSM states in memory, set USE_REDIS to keep them across restarts")
+
+    storage = get_storage(config)
+
+    # Setup database
+    engine = create_engine(config.db)
+    replica = create_replica(config.db)
+    session_pool = create_session_pool(engine, replica)
+
+    bot = create_bot(config)
+    dp = create_dispatcher(config, storage, engine, session_pool)
+
+    metrics_runner = None
+    if config.metrics.enabled:
+        REGISTRY.register(PoolCollector(engine))
+        # Workers on the same host need a port each
+        metrics_runner = await start_metrics_server(config.metrics.host, config.metrics.port + worker_index)
+
+    listener = PgListener(config.db)
+    dp["invalidation"].attach(listener)
+
+    background_tasks = [
+        asyncio.create_task(maintain_response_partitions(engine)),
+        asyncio.create_task(dp["membership"].run()),
+        asyncio.create_task(listener.run()),
+    ]
+    if replica is not None:
+        background_tasks.append(asyncio.create_task(replica.monitor()))
+
+    redis = None
+    try:
+        if mode == "worker":
+            from redis.asyncio import Redis
+            from tgbot.services.update_stream import UpdateWorker
+
+            redis = Redis.from_url(config.redis.dsn())
+            await UpdateWorker(dp, bot, redis, config.stream, worker_index).run()
+        else:
+            await on_startup(bot, config.tg_bot.admin_ids)
+            await dp.start_polling(bot)
+    finally:
+        for task in background_tasks:
+            task.cancel()
+        try:
+            await dp["membership"].flush()
+        except Exception:
+            logging.exception("Failed to record the last group members")
+        if redis is not None:
+            await redis.aclose()
+        if metrics_runner:
+            await metrics_runner.cleanup()
 
 
 if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Run the bot")
+    parser.add_argument("mode", nargs="?", default="polling", choices=["polling", "receiver", "worker"])
+    parser.add_argument("--worker-index", type=int, default=0)
+    args = parser.parse_args()
+
     try:
-        asyncio.run(main())
+        asyncio.run(main(args.mode, args.worker_index))
     except (KeyboardInterrupt, SystemExit):
         logging.error("Bot is stopped")
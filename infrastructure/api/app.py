@@ -1,18 +1,114 @@
+import asyncio
 import logging
+from contextlib import AsyncExitStack, asynccontextmanager, suppress
+from typing import Optional
 
 from fastapi import FastAPI
 from fastapi.templating import Jinja2Templates
 from fastapi.staticfiles import StaticFiles
+from sqlalchemy.ext.asyncio import AsyncEngine
+
+from infrastructure.api.idempotency import create_idempotency_store
+from infrastructure.api.middlewares import query_log_middleware
+from infrastructure.database.invalidation import ENTITIES, InvalidationBus
+from infrastructure.database.listener import PgListener
+from infrastructure.database.live import LiveResponses
+from infrastructure.database.partitions import ensure_response_partitions
+from infrastructure.database.setup import create_engine, create_replica, create_session_pool, warm_up_pool
+from tgbot.config import get_config, Config
 from .routes import questionnaires
 from .routes import groups
 from .routes import auth
+from .routes import admin
+from .routes import dashboard
+from .routes import assignments
+from .routes import jobs
 
-app = FastAPI()
-app.mount("/static", StaticFiles(directory="infrastructure/api/static"), name="static")
 templates = Jinja2Templates(directory="infrastructure/api/templates")
 
 
-# Include routers
-app.include_router(auth.router)
-app.include_router(groups.router)
-app.include_router(questionnaires.router)
+async def _stop_task(task: asyncio.Task) -> None:
+    task.cancel()
+    with suppress(asyncio.CancelledError):
+        await task
+
+
+async def _close_bot(app: FastAPI) -> None:
+    if app.state.bot is not None:
+        await app.state.bot.session.close()
+
+
+async def _dispose_engine(engine: AsyncEngine) -> None:
+    await engine.dispose()
+    logging.info("Database pool disposed")
+
+
+def create_app(config: Optional[Config] = None) -> FastAPI:
+    """
+    Create the API application.
+
+    The configuration is loaded once, when the application starts, unless a
+    ready `config` is passed in (e.g. to point the API at another database).
+    The lifespan owns the engine, the optional read replica, the session pool,
+    the notification listener and the bot, which is created on first use (see
+    `get_bot`): the pool is warmed up before the application accepts requests,
+    and everything is closed on shutdown.
+
+    :param config: Optional configuration to use instead of the `.env` file.
+    :return: The FastAPI application.
+    """
+
+    @asynccontextmanager
+    async def lifespan(app: FastAPI):
+        app_config = config or get_config()
+        app.state.config = app_config
+        # Created by get_bot when a route needs it
+        app.state.bot = None
+
+        # Everything opened is closed in reverse order, also when a later startup step fails
+        async with AsyncExitStack() as resources:
+            engine = create_engine(app_config.db)
+            resources.push_async_callback(_dispose_engine, engine)
+            await warm_up_pool(engine, app_config.db.pool_warmup)
+            await ensure_response_partitions(engine)
+
+            replica = create_replica(app_config.db)
+            if replica is not None:
+                resources.push_async_callback(replica.engine.dispose)
+                await replica.check()
+                resources.push_async_callback(_stop_task, asyncio.create_task(replica.monitor()))
+
+            resources.push_async_callback(_close_bot, app)
+            app.state.engine = engine
+            app.state.replica = replica
+            app.state.session_pool = create_session_pool(engine, replica)
+            app.state.idempotency = create_idempotency_store(app_config)
+            resources.push_async_callback(app.state.idempotency.close)
+
+            # One connection receives the notifications for all live streams and caches of the process
+            listener = PgListener(app_config.db)
+            app.state.live_responses = LiveResponses()
+            app.state.live_responses.attach(listener)
+            app.state.invalidation = InvalidationBus()
+            app.state.invalidation.attach(listener)
+            app.state.invalidation.subscribe(ENTITIES, dashboard.summary_cache.clear)
+            resources.push_async_callback(_stop_task, asyncio.create_task(listener.run()))
+            yield
+
+    app = FastAPI(lifespan=lifespan)
+    app.middleware("http")(query_log_middleware)
+    app.mount("/static", StaticFiles(directory="infrastructure/api/static"), name="static")
+
+    # Include routers
+    app.include_router(auth.router)
+    app.include_router(admin.router)
+    app.include_router(groups.router)
+    app.include_router(questionnaires.router)
+    app.include_router(dashboard.router)
+    app.include_router(assignments.router)
+    app.include_router(jobs.router)
+
+    return app
+
+
+app = create_app()
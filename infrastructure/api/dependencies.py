@@ -1,35 +1,53 @@
-from typing import Annotated, TypeVar, Type, AsyncGenerator
+from typing import Annotated, TypeVar, Type, AsyncGenerator, TYPE_CHECKING
 
-from fastapi import Header, Depends
+from fastapi import Header, Depends, Request
 from sqlalchemy.ext.asyncio import AsyncSession
-from aiogram import Bot
 
 from infrastructure.database.repo.base import BaseRepo
+from infrastructure.database.routing import prefer_replica
 from infrastructure.database.repo.requests import RequestsRepo
 from infrastructure.database.repo.questionnaires import QuestionnaireRepo
 from infrastructure.database.repo.users import UserRepo
 from infrastructure.database.repo.schedule import ScheduleRepo
 from infrastructure.database.repo.groups import GroupRepo
-from infrastructure.database.setup import create_engine, create_session_pool
-from tgbot.config import load_config
+from infrastructure.database.repo.group_members import GroupMemberRepo
+from infrastructure.database.repo.dashboard import DashboardRepo
+from infrastructure.database.repo.jobs import JobRepo
+from tgbot.config import Config
 
-# Initialize engine and session pool
-config = load_config(".env")
-engine = create_engine(config.db)
-session_pool = create_session_pool(engine)
+if TYPE_CHECKING:
+    from aiogram import Bot
 
 # Generic type for repositories
 RepoT = TypeVar('RepoT', bound=BaseRepo)
 
 
-def get_bot():
-    bot = Bot(token=config.tg_bot.token)
-    return bot
+def get_config(request: Request) -> Config:
+    """Get the configuration loaded by the application lifespan"""
+    return request.app.state.config
 
 
-async def get_session() -> AsyncGenerator[AsyncSession, None]:
-    """Get database session"""
-    async with session_pool() as session:
+def get_bot(request: Request) -> "Bot":
+    """
+    Get the bot of the application, created on first use and closed by the lifespan
+
+    Few routes talk to Telegram and aiogram takes seconds to import, so it is
+    kept off the startup path of the API.
+    """
+    if request.app.state.bot is None:
+        from aiogram import Bot
+        from tgbot.services.session import create_bot_session
+
+        tg_bot = request.app.state.config.tg_bot
+        request.app.state.bot = Bot(token=tg_bot.token, session=create_bot_session(tg_bot))
+    return request.app.state.bot
+
+
+async def get_session(request: Request) -> AsyncGenerator[AsyncSession, None]:
+    """Get database session, reading from the replica (when there is one) for GET requests"""
+    async with request.app.state.session_pool() as session:
+        if request.method == "GET":
+            prefer_replica(session)
         yield session
 
 
@@ -47,7 +65,10 @@ get_questionnaire_repo = get_repo_factory(QuestionnaireRepo)
 get_user_repo = get_repo_factory(UserRepo)
 get_requests_repo = get_repo_factory(RequestsRepo)
 get_group_repo = get_repo_factory(GroupRepo)
+get_group_member_repo = get_repo_factory(GroupMemberRepo)
 get_schedule_repo = get_repo_factory(ScheduleRepo)
+get_dashboard_repo = get_repo_factory(DashboardRepo)
+get_job_repo = get_repo_factory(JobRepo)
 
 
 async def is_api_request(
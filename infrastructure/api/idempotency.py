@@ -0,0 +1,151 @@
+"""
+`Idempotency-Key` support for POST routes.
+
+A client sends the same `Idempotency-Key` header with every retry of one
+request. The first request runs and its result is stored for `IDEMPOTENCY_TTL`
+seconds; retries get the stored result without running the route again. A
+retry arriving while the first request still runs gets 409, reusing a key for
+a different body gets 422. Requests without the header are not affected.
+
+Keys are scoped by user and route. They are kept in Redis when the
+application uses it (`USE_REDIS`), so all API processes share them, and in
+process memory otherwise.
+
+Example usage:
+    @router.post("/")
+    async def create(..., idempotency: Idempotency = Depends(get_idempotency)):
+        if idempotency.result is not None:
+            return idempotency.result
+        result = {...}
+        await idempotency.save(result)
+        return result
+"""
+import hashlib
+import json
+import time
+from typing import Annotated, Any, AsyncGenerator, Dict, Optional, Tuple
+
+from fastapi import Depends, Header, HTTPException, Request, status
+
+from infrastructure.api.security.token import TokenData, get_current_token_data
+
+IDEMPOTENCY_TTL = 600
+PENDING = "pending"
+
+
+class MemoryIdempotencyStore:
+    """Keys of this process only, for a single API process or without Redis."""
+
+    def __init__(self) -> None:
+        self._records: Dict[str, Tuple[float, dict]] = {}
+
+    async def reserve(self, key: str, record: dict, ttl: int) -> Optional[dict]:
+        """Store `record` unless the key exists; return the existing record, or None when reserved."""
+        now = time.monotonic()
+        if len(self._records) > 10_000:
+            self._records = {k: v for k, v in self._records.items() if v[0] > now}
+        existing = self._records.get(key)
+        if existing is not None and existing[0] > now:
+            return existing[1]
+        self._records[key] = (now + ttl, record)
+        return None
+
+    async def save(self, key: str, record: dict, ttl: int) -> None:
+        self._records[key] = (time.monotonic() + ttl, record)
+
+    async def release(self, key: str) -> None:
+        self._records.pop(key, None)
+
+    async def close(self) -> None:
+        self._records.clear()
+
+
+class RedisIdempotencyStore:
+    """Keys shared by all API processes."""
+
+    def __init__(self, redis) -> None:
+        self.redis = redis
+
+    async def reserve(self, key: str, record: dict, ttl: int) -> Optional[dict]:
+        if await self.redis.set(key, json.dumps(record), nx=True, ex=ttl):
+            return None
+        existing = await self.redis.get(key)
+        # Expired in between: the key is free again
+        return json.loads(existing) if existing is not None else await self.reserve(key, record, ttl)
+
+    async def save(self, key: str, record: dict, ttl: int) -> None:
+        await self.redis.set(key, json.dumps(record), ex=ttl)
+
+    async def release(self, key: str) -> None:
+        await self.redis.delete(key)
+
+    async def close(self) -> None:
+        await self.redis.aclose()
+
+
+def create_idempotency_store(config):
+    """A Redis store when the application uses Redis, an in-memory one otherwise."""
+    if config.tg_bot.use_redis:
+        from redis.asyncio import Redis
+
+        return RedisIdempotencyStore(Redis.from_url(config.redis.dsn()))
+    return MemoryIdempotencyStore()
+
+
+class Idempotency:
+    """The stored result of an earlier attempt, if any, and a way to store the result of this one."""
+
+    def __init__(self, store=None, key: Optional[str] = None, fingerprint: Optional[str] = None) -> None:
+        self.store = store
+        self.key = key
+        self.fingerprint = fingerprint
+        self.result: Any = None
+        self.saved = False
+
+    async def save(self, result: Any) -> None:
+        """Store the JSON-serializable result of the route for the retries."""
+        if self.key is not None:
+            await self.store.save(
+                self.key, {"status": "done", "fingerprint": self.fingerprint, "result": result}, IDEMPOTENCY_TTL
+            )
+        self.saved = True
+
+
+async def get_idempotency(
+        request: Request,
+        idempotency_key: Annotated[Optional[str], Header(max_length=255)] = None,
+        token_data: TokenData = Depends(get_current_token_data),
+) -> AsyncGenerator[Idempotency, None]:
+    """Reserve the `Idempotency-Key` of the request, or load the result stored for it."""
+    if idempotency_key is None:
+        yield Idempotency()
+        return
+
+    store = request.app.state.idempotency
+    key = f"idempotency:{token_data.user_id}:{request.method}:{request.url.path}:{idempotency_key}"
+    fingerprint = hashlib.sha256(await request.body()).hexdigest()
+    existing = await store.reserve(key, {"status": PENDING, "fingerprint": fingerprint}, IDEMPOTENCY_TTL)
+
+    idempotency = Idempotency(store, key, fingerprint)
+    if existing is not None:
+        if existing["fingerprint"] != fingerprint:
+            raise HTTPException(
+                status_code=status.HTTP_422_UNPROCESSABLE_ENTITY,
+                detail="Idempotency-Key was already used for a different request",
+            )
+        if existing["status"] == PENDING:
+            raise HTTPException(
+                status_code=status.HTTP_409_CONFLICT,
+                detail="A request with this Idempotency-Key is still being processed",
+            )
+        idempotency.result = existing["result"]
+        idempotency.saved = True
+        yield idempotency
+        return
+
+    try:
+        yield idempotency
+    finally:
+        # Failed attempts are not stored, the client may retry them
+        if not idempotency.saved:
+            await store.release(key)
@@ -0,0 +1,24 @@
+import logging
+import time
+from typing import Awaitable, Callable
+
+from fastapi import Request, Response
+
+from infrastructure.database.instrumentation import track_queries
+
+
+async def query_log_middleware(
+        request: Request,
+        call_next: Callable[[Request], Awaitable[Response]]
+) -> Response:
+    """Attribute SQL statements to the request and log their count and DB time with it"""
+    started = time.perf_counter()
+    with track_queries(f"{request.method} {request.url.path}") as stats:
+        response = await call_next(request)
+
+    elapsed = time.perf_counter() - started
+    logging.info(
+        f"{request.method} {request.url.path} {response.status_code} "
+        f"in {elapsed * 1000:.1f} ms: {stats.summary()}"
+    )
+    return response
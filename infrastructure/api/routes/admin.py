@@ -0,0 +1,21 @@
+from fastapi import APIRouter, Depends, Request
+
+from infrastructure.api.routes.auth import is_admin
+from infrastructure.api.security.token import TokenData
+from infrastructure.database.pool import pool_status
+
+router = APIRouter(prefix="/admin", tags=["admin"])
+
+
+@router.get("/pool")
+async def get_pool_status(
+    request: Request,
+    token_data: TokenData = Depends(is_admin)
+):
+    """Get connection pool gauges of the API process, and the replica state when there is one"""
+    replica = request.app.state.replica
+    return {
+        "status": "success",
+        "pool": pool_status(request.app.state.engine),
+        "replica": replica.status() if replica is not None else None,
+    }
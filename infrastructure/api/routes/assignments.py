@@ -0,0 +1,79 @@
+import asyncio
+import json
+
+from fastapi import APIRouter, Depends, HTTPException, Request
+from fastapi.responses import StreamingResponse
+
+from infrastructure.api.routes.auth import is_mentor_or_admin
+from infrastructure.api.security.token import TokenData
+from infrastructure.database.live import LiveResponses, choice_options, count_options, load_counts
+from infrastructure.database.repo.questionnaires import QuestionnaireRepo
+
+router = APIRouter(prefix="/assignments", tags=["assignments"])
+
+# Comment lines keep idle streams open through proxies
+KEEPALIVE_SECONDS = 15
+
+
+def _sse(event: str, data: dict) -> str:
+    return f"event: {event}\ndata: {json.dumps(data, ensure_ascii=False)}\n\n"
+
+
+@router.get("/{assignment_id}/live")
+async def live_responses(
+    assignment_id: int,
+    request: Request,
+    token_data: TokenData = Depends(is_mentor_or_admin)
+):
+    """
+    Stream the response counts of an assignment as Server-Sent Events.
+
+    A `snapshot` event carries the number of responses and the option counts of
+    the multiple-choice questions, by question index; every submitted response
+    then sends a `response` event with the changes to add to them. A new
+    `snapshot` replaces everything received before.
+    """
+    live: LiveResponses = request.app.state.live_responses
+    session_pool = request.app.state.session_pool
+
+    async with session_pool() as session:
+        assignment = await QuestionnaireRepo(session).get_assignment(assignment_id)
+    if assignment is None:
+        raise HTTPException(status_code=404, detail=f"Assignment with ID {assignment_id} not found")
+    options = choice_options(assignment.questionnaire.questions)
+
+    async def stream():
+        with live.subscribe(assignment_id) as events:
+            snapshot = None
+            while True:
+                if snapshot is None:
+                    async with session_pool() as session:
+                        counts = await load_counts(session, assignment_id)
+                    snapshot = counts.snapshot
+                    yield _sse("snapshot", {
+                        "assignment_id": assignment_id,
+                        "responses": counts.responses,
+                        "options": count_options(counts.options, options, fill=True),
+                    })
+
+                try:
+                    event = await asyncio.wait_for(events.get(), KEEPALIVE_SECONDS)
+                except asyncio.TimeoutError:
+                    yield ": keepalive\n\n"
+                    continue
+
+                if event.get("resync"):
+                    snapshot = None
+                elif not snapshot.includes(event["xid"]):
+                    yield _sse("response", {
+                        "assignment_id": assignment_id,
+                        "responses": 1 if event["new"] else 0,
+                        "options": count_options(event["options"], options),
+                    })
+
+    return StreamingResponse(
+        stream(),
+        media_type="text/event-stream",
+        # nginx must not buffer the stream
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
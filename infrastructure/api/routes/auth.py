@@ -7,13 +7,9 @@ from pydantic import BaseModel
 
 from infrastructure.database.models import User, UserRole
 from infrastructure.database.repo.users import UserRepo
-from infrastructure.api.dependencies import get_user_repo
+from infrastructure.api.dependencies import get_user_repo, get_config
 from infrastructure.api.security.token import create_access_token, TokenData, get_current_token_data
-from tgbot.config import load_config
-
-# Load configuration
-config = load_config(".env")
-auth_config = config.auth
+from tgbot.config import Config
 
 router = APIRouter(prefix="/auth", tags=["authentication"])
 
@@ -33,7 +29,8 @@ class UserResponse(BaseModel):
 @router.post("/token", response_model=Token)
 async def login_for_access_token(
     form_data: OAuth2PasswordRequestForm = Depends(),
-    user_repo: UserRepo = Depends(get_user_repo)
+    user_repo: UserRepo = Depends(get_user_repo),
+    config: Config = Depends(get_config)
 ):
     """
     Authenticate user and return JWT token
@@ -56,7 +53,8 @@ async def login_for_access_token(
     # Create access token
     access_token = create_access_token(
         data=token_data,
-        expires_delta=timedelta(minutes=auth_config.access_token_expire_minutes)
+        auth_config=config.auth,
+        expires_delta=timedelta(minutes=config.auth.access_token_expire_minutes)
     )
     
     return {"access_token": access_token, "token_type": "bearer"}
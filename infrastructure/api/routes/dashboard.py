@@ -0,0 +1,70 @@
+import asyncio
+import time
+from datetime import datetime
+from typing import Any, Awaitable, Callable, Dict, Tuple
+
+from fastapi import APIRouter, Depends
+
+from infrastructure.api.dependencies import get_dashboard_repo
+from infrastructure.api.routes.auth import is_mentor_or_admin
+from infrastructure.api.security.token import TokenData
+from infrastructure.database.repo.dashboard import DashboardRepo
+
+router = APIRouter(prefix="/dashboard", tags=["dashboard"])
+
+# Seconds a summary is served from memory
+SUMMARY_TTL = 5
+
+
+class SummaryCache:
+    """Summaries by role for `ttl` seconds; requests missing the same role at once share one query."""
+
+    def __init__(self, ttl: float) -> None:
+        self.ttl = ttl
+        self._entries: Dict[str, Tuple[float, Dict[str, Any]]] = {}
+        self._locks: Dict[str, asyncio.Lock] = {}
+
+    def _fresh(self, role: str):
+        entry = self._entries.get(role)
+        return entry[1] if entry is not None and entry[0] > time.monotonic() else None
+
+    async def get(self, role: str, load: Callable[[], Awaitable[Dict[str, Any]]]) -> Dict[str, Any]:
+        summary = self._fresh(role)
+        if summary is not None:
+            return summary
+        async with self._locks.setdefault(role, asyncio.Lock()):
+            summary = self._fresh(role)
+            if summary is None:
+                summary = await load()
+                self._entries[role] = (time.monotonic() + self.ttl, summary)
+            return summary
+
+    def clear(self, ids=None) -> None:
+        """Forget all summaries, e.g. when the data behind them changed."""
+        self._entries.clear()
+
+
+summary_cache = SummaryCache(SUMMARY_TTL)
+
+
+@router.get("/summary")
+async def get_summary(
+    token_data: TokenData = Depends(is_mentor_or_admin),
+    dashboard_repo: DashboardRepo = Depends(get_dashboard_repo)
+):
+    """
+    Get the dashboard figures: totals, active assignments, responses of the last
+    24 hours and the response rate of every active group.
+
+    Totals listed in `estimated` are planner estimates of very large tables.
+    The summary is up to `SUMMARY_TTL` seconds old.
+    """
+
+    async def load() -> Dict[str, Any]:
+        return {
+            "status": "success",
+            "generated_at": datetime.now().isoformat(),
+            **await dashboard_repo.get_summary(),
+        }
+
+    return await summary_cache.get(token_data.role, load)
@@ -15,7 +15,7 @@ async def list_groups(
 ):
     """List all groups"""
     try:
-        groups = await group_repo.get_active_groups()
+        groups = await group_repo.get_groups()
         return JSONResponse(
             status_code=200,
             content={
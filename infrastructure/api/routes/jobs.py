@@ -0,0 +1,55 @@
+from fastapi import APIRouter, Depends, HTTPException
+from fastapi.responses import Response
+
+from infrastructure.api.dependencies import get_job_repo
+from infrastructure.api.security.token import get_current_token_data, TokenData
+from infrastructure.database.models import Job, UserRole
+from infrastructure.database.repo.jobs import JobRepo
+
+router = APIRouter(prefix="/jobs", tags=["jobs"])
+
+
+def job_to_dict(job: Job) -> dict:
+    """Convert job model to dictionary"""
+    return {
+        "id": job.id,
+        "kind": job.kind,
+        "status": job.status.value,
+        "progress": job.progress,
+        "attempts": job.attempts,
+        "max_attempts": job.max_attempts,
+        "run_at": job.run_at.isoformat() if job.run_at else None,
+        "started_at": job.started_at.isoformat() if job.started_at else None,
+        "finished_at": job.finished_at.isoformat() if job.finished_at else None,
+        "result": job.result,
+        "has_output": job.output_type is not None,
+        "error": job.error,
+    }
+
+
+async def get_own_job(
+        job_id: int,
+        token_data: TokenData = Depends(get_current_token_data),
+        job_repo: JobRepo = Depends(get_job_repo)
+) -> Job:
+    """Get a job queued by the caller, admins see every job"""
+    job = await job_repo.get_job(job_id)
+    if job is None or (job.created_by != token_data.user_id and token_data.role != UserRole.UNIVERSITY_ADMIN.value):
+        raise HTTPException(status_code=404, detail=f"Job with ID {job_id} not found")
+    return job
+
+
+@router.get("/{job_id}")
+async def get_job(job: Job = Depends(get_own_job)):
+    """Get the status, progress and result of a background job"""
+    return {"status": "success", "job": job_to_dict(job)}
+
+
+@router.get("/{job_id}/output")
+async def get_job_output(job: Job = Depends(get_own_job), job_repo: JobRepo = Depends(get_job_repo)):
+    """Download the file produced by a finished job, e.g. a bundle export"""
+    output = await job_repo.get_job_output(job.id)
+    if output is None:
+        raise HTTPException(status_code=404, detail=f"Job {job.id} has no output")
+    content, media_type = output
+    return Response(content=content, media_type=media_type)
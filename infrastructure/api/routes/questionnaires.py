@@ -1,26 +1,36 @@
-from typing import List, Optional
+import base64
+from typing import List, Optional, TYPE_CHECKING
 from datetime import datetime
-from fastapi import APIRouter, Depends, HTTPException
-from pydantic import BaseModel
+from fastapi import APIRouter, Depends, HTTPException, Query, Request
+from fastapi.responses import StreamingResponse
+from sqlalchemy.ext.asyncio import AsyncSession
+from pydantic import BaseModel, Field
 
 from infrastructure.database.repo.users import UserRepo
-from infrastructure.database.models import Questionnaire
+from infrastructure.database.models import JobKind, Questionnaire
 from infrastructure.api.dependencies import (
     get_questionnaire_repo,
     get_user_repo,
-    get_bot
+    get_bot,
+    get_session,
+    get_group_member_repo,
+    get_job_repo
 )
+from infrastructure.database.bundles import (
+    FORMATS, MEDIA_TYPES, BundleError, QuestionModel, decode_records, export_bundle, import_bundle
+)
+from infrastructure.database.routing import prefer_replica
 from infrastructure.database.exceptions import NotFoundError, DatabaseError
 from infrastructure.database.repo.questionnaires import QuestionnaireRepo
+from infrastructure.database.repo.group_members import GroupMemberRepo
+from infrastructure.database.repo.jobs import JobRepo
 from infrastructure.api.security.token import get_current_token_data, TokenData
+from infrastructure.api.idempotency import Idempotency, get_idempotency
 
-router = APIRouter(prefix="/questionnaires", tags=["questionnaires"])
-
+if TYPE_CHECKING:
+    from aiogram import Bot
 
-class QuestionModel(BaseModel):
-    text: str
-    type: str
-    options: List[str] | None = None
+router = APIRouter(prefix="/questionnaires", tags=["questionnaires"])
 
 
 class CreateQuestionnaireRequest(BaseModel):
@@ -44,6 +54,11 @@ class QuestionnaireAssign(BaseModel):
     due_date: datetime
 
 
+class QuestionnaireBulkAssign(BaseModel):
+    group_ids: List[int] = Field(min_length=1, max_length=500)
+    due_date: datetime
+
+
 @router.get("/")
 async def list_questionnaires(
         token_data: TokenData = Depends(get_current_token_data),
@@ -81,14 +96,115 @@ async def get_latest_questionnaires(
         raise HTTPException(status_code=500, detail=f"Error fetching latest questionnaires: {str(e)}")
 
 
+@router.get("/search")
+async def search_questionnaires(
+        q: str = Query(min_length=1, max_length=200),
+        limit: int = Query(default=20, ge=1, le=100),
+        cursor: Optional[str] = None,
+        token_data: TokenData = Depends(get_current_token_data),
+        questionnaire_repo: QuestionnaireRepo = Depends(get_questionnaire_repo)
+):
+    """Search questionnaires by title, description and questions, best matches first"""
+    after = None
+    if cursor:
+        try:
+            rank, questionnaire_id = base64.urlsafe_b64decode(cursor.encode()).decode().split(":")
+            after = (float(rank), int(questionnaire_id))
+        except ValueError:
+            raise HTTPException(status_code=400, detail="Invalid cursor")
+    try:
+        results = await questionnaire_repo.search_questionnaires(q, limit=limit, after=after)
+        next_cursor = None
+        if len(results) == limit:
+            last, last_rank = results[-1]
+            next_cursor = base64.urlsafe_b64encode(f"{last_rank!r}:{last.id}".encode()).decode()
+        return {
+            "status": "success",
+            "count": len(results),
+            "questionnaires": [
+                {**questionnaire_to_dict(questionnaire), "rank": rank} for questionnaire, rank in results
+            ],
+            "next_cursor": next_cursor
+        }
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Error searching questionnaires: {str(e)}")
+
+
+@router.get("/bundle")
+async def export_questionnaires(
+        request: Request,
+        format: str = "ndjson",
+        token_data: TokenData = Depends(get_current_token_data)
+):
+    """Export all questionnaires and schedules as an NDJSON or YAML bundle, streamed"""
+    if format not in FORMATS:
+        raise HTTPException(status_code=400, detail=f"Unknown bundle format {format}, use one of {FORMATS}")
+
+    async def stream():
+        # The response outlives the request dependencies, so it has its own session
+        async with request.app.state.session_pool() as session:
+            prefer_replica(session)
+            async for text in export_bundle(session, format):
+                yield text
+
+    return StreamingResponse(
+        stream(),
+        media_type=MEDIA_TYPES[format],
+        headers={"Content-Disposition": f'attachment; filename="questionnaires.{format}"'}
+    )
+
+
+@router.post("/bundle/export", status_code=202)
+async def queue_questionnaires_export(
+        format: str = "ndjson",
+        token_data: TokenData = Depends(get_current_token_data),
+        job_repo: JobRepo = Depends(get_job_repo)
+):
+    """Export the bundle in the background, download it from `/jobs/{job_id}/output` once the job is done"""
+    if format not in FORMATS:
+        raise HTTPException(status_code=400, detail=f"Unknown bundle format {format}, use one of {FORMATS}")
+    job = await job_repo.enqueue(JobKind.EXPORT_BUNDLE, {"format": format}, created_by=token_data.user_id)
+    return {"status": "queued", "job_id": job.id}
+
+
+@router.post("/bundle")
+async def import_questionnaires(
+        request: Request,
+        format: str = "ndjson",
+        token_data: TokenData = Depends(get_current_token_data),
+        session: AsyncSession = Depends(get_session)
+):
+    """Import an NDJSON or YAML bundle in one transaction, the questionnaires are created by the caller"""
+    if format not in FORMATS:
+        raise HTTPException(status_code=400, detail=f"Unknown bundle format {format}, use one of {FORMATS}")
+    try:
+        result = await import_bundle(
+            session, decode_records(request.stream(), format), created_by=token_data.user_id
+        )
+        return {
+            "status": "success",
+            "questionnaires": result.questionnaires,
+            "schedules": result.schedules,
+            "skipped_groups": result.skipped_groups
+        }
+    except BundleError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Error importing questionnaires: {str(e)}")
+
+
 @router.post("/{questionnaire_id}/assign")
 async def assign_questionnaire(
         questionnaire_id: int,
         assignment: QuestionnaireAssign,
         token_data: TokenData = Depends(get_current_token_data),
-        questionnaire_repo: QuestionnaireRepo = Depends(get_questionnaire_repo)
+        questionnaire_repo: QuestionnaireRepo = Depends(get_questionnaire_repo),
+        bot: "Bot" = Depends(get_bot),
+        idempotency: Idempotency = Depends(get_idempotency)
 ):
     """Assign questionnaire to a group"""
+    if idempotency.result is not None:
+        return idempotency.result
     try:
         questionnaire = await questionnaire_repo.get_questionnaire(questionnaire_id)
         if not questionnaire:
@@ -104,15 +220,19 @@ async def assign_questionnaire(
             questionnaire_id=questionnaire_id,
             group_id=assignment.group_id,
             due_date=assignment.due_date,
-            bot=get_bot(),
-            bot_username="vinylonbot"
+            created_by=token_data.user_id,
         )
+        # Imported here like the bot itself, see get_bot
+        from tgbot.services.notifications import notify_group_about_assignment
+        await notify_group_about_assignment(bot, assignment_result, questionnaire, bot_username="vinylonbot")
 
-        return {
+        result = {
             "status": "success",
             "message": "Questionnaire assigned successfully",
             "questionnaire": questionnaire_to_dict(questionnaire)
         }
+        await idempotency.save(result)
+        return result
 
     except NotFoundError as e:
         raise HTTPException(status_code=404, detail=str(e))
@@ -120,6 +240,114 @@ async def assign_questionnaire(
         raise HTTPException(status_code=500, detail=f"Error assigning questionnaire: {str(e)}")
 
 
+@router.post("/{questionnaire_id}/assign-bulk")
+async def assign_questionnaire_bulk(
+        questionnaire_id: int,
+        assignment: QuestionnaireBulkAssign,
+        background: bool = Query(False),
+        token_data: TokenData = Depends(get_current_token_data),
+        questionnaire_repo: QuestionnaireRepo = Depends(get_questionnaire_repo),
+        job_repo: JobRepo = Depends(get_job_repo),
+        bot: "Bot" = Depends(get_bot),
+        idempotency: Idempotency = Depends(get_idempotency)
+):
+    """
+    Assign questionnaire to several groups and report the outcome per group.
+
+    With `background=true` the groups are assigned by a job instead; the report
+    is its result, see `GET /jobs/{job_id}`.
+    """
+    if idempotency.result is not None:
+        return idempotency.result
+    try:
+        if background:
+            job = await job_repo.enqueue(
+                JobKind.ASSIGN_BULK,
+                {
+                    "questionnaire_id": questionnaire_id,
+                    "group_ids": assignment.group_ids,
+                    "due_date": assignment.due_date.isoformat(),
+                    "created_by": token_data.user_id,
+                },
+                priority=1,
+                # Not retried, a second attempt would assign the groups again
+                max_attempts=1,
+                created_by=token_data.user_id,
+            )
+            result = {"status": "queued", "job_id": job.id}
+            await idempotency.save(result)
+            return result
+
+        results = await questionnaire_repo.assign_questionnaire_to_groups(
+            questionnaire_id=questionnaire_id,
+            group_ids=assignment.group_ids,
+            due_date=assignment.due_date,
+            created_by=token_data.user_id,
+        )
+        assignments = [result.assignment for result in results if result.assignment]
+        questionnaire = await questionnaire_repo.get_questionnaire(questionnaire_id)
+        from tgbot.services.notifications import notify_groups_about_assignments
+        notified = await notify_groups_about_assignments(
+            bot, assignments, questionnaire, bot_username="vinylonbot"
+        )
+
+        report = {
+            "status": "success",
+            "assigned": len(assignments),
+            "failed": len(results) - len(assignments),
+            "groups": [
+                {
+                    "group_id": result.group_id,
+                    "status": "assigned" if result.assignment else "failed",
+                    "assignment_id": result.assignment.id if result.assignment else None,
+                    "notified": notified.get(result.group_id, False),
+                    "error": result.error,
+                }
+                for result in results
+            ]
+        }
+        await idempotency.save(report)
+        return report
+
+    except NotFoundError as e:
+        raise HTTPException(status_code=404, detail=str(e))
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Error assigning questionnaire: {str(e)}")
+
+
+# Declared before /{questionnaire_id}, which would match "assignments" first
+@router.get("/assignments")
+async def list_assignments(
+        token_data: TokenData = Depends(get_current_token_data),
+        questionnaire_repo: QuestionnaireRepo = Depends(get_questionnaire_repo)
+):
+    """List all questionnaire assignments"""
+    try:
+        assignments = await questionnaire_repo.get_active_assignments()
+        return {
+            "status": "success",
+            "count": len(assignments),
+            "assignments": [
+                {
+                    "id": assignment.id,
+                    "questionnaire_id": assignment.questionnaire_id,
+                    "questionnaire": questionnaire_to_dict(assignment.questionnaire),
+                    "group_id": assignment.group_id,
+                    "group": {
+                        "group_id": assignment.group.group_id,
+                        "title": assignment.group.title,
+                        "is_active": assignment.group.is_active
+                    },
+                    "due_date": assignment.due_date.isoformat(),
+                    "is_active": assignment.is_active,
+                    "recurrence": "Once"
+                } for assignment in assignments
+            ]
+        }
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Error listing assignments: {str(e)}")
+
+
 @router.get("/{questionnaire_id}")
 async def get_questionnaire(
         questionnaire_id: int,
@@ -147,9 +375,12 @@ async def create_questionnaire(
         questionnaire: CreateQuestionnaireRequest,
         token_data: TokenData = Depends(get_current_token_data),
         questionnaire_repo: QuestionnaireRepo = Depends(get_questionnaire_repo),
-        user_repo: UserRepo = Depends(get_user_repo)
+        user_repo: UserRepo = Depends(get_user_repo),
+        idempotency: Idempotency = Depends(get_idempotency)
 ):
     """Create a new questionnaire"""
+    if idempotency.result is not None:
+        return idempotency.result
     try:
         user = await user_repo.get_user(questionnaire.created_by)
         if not user:
@@ -160,10 +391,12 @@ async def create_questionnaire(
         if 'due_date' in questionnaire_data:
             questionnaire_data.pop('due_date')  # Remove due_date as it's not accepted by the repository method
         created = await questionnaire_repo.create_questionnaire(**questionnaire_data)
-        return {
+        result = {
             "status": "success",
             "questionnaire_id": created.id
         }
+        await idempotency.save(result)
+        return result
     except NotFoundError as e:
         raise HTTPException(status_code=404, detail=str(e))
     except Exception as e:
@@ -212,38 +445,52 @@ async def delete_questionnaire(
         raise HTTPException(status_code=500, detail=f"Error deleting questionnaire: {str(e)}")
 
 
-@router.get("/assignments")
-async def list_assignments(
+@router.get("/assignments/{assignment_id}/non-responders")
+async def list_non_responders(
+        assignment_id: int,
         token_data: TokenData = Depends(get_current_token_data),
-        questionnaire_repo: QuestionnaireRepo = Depends(get_questionnaire_repo)
+        group_member_repo: GroupMemberRepo = Depends(get_group_member_repo)
 ):
-    """List all questionnaire assignments"""
+    """List members of the assigned group who have not responded yet"""
     try:
-        assignments = await questionnaire_repo.get_active_assignments()
+        user_ids = await group_member_repo.get_non_responders(assignment_id)
         return {
             "status": "success",
-            "count": len(assignments),
-            "assignments": [
-                {
-                    "id": assignment.id,
-                    "questionnaire_id": assignment.questionnaire_id,
-                    "questionnaire": questionnaire_to_dict(assignment.questionnaire),
-                    "group_id": assignment.group_id,
-                    "group": {
-                        "group_id": assignment.group.group_id,
-                        "title": assignment.group.title,
-                        "is_active": assignment.group.is_active
-                    },
-                    "due_date": assignment.due_date.isoformat(),
-                    "is_active": assignment.is_active,
-                    "recurrence": "Once"
-                } for assignment in assignments
-            ]
+            "count": len(user_ids),
+            "user_ids": user_ids
         }
     except Exception as e:
-        raise HTTPException(status_code=500, detail=f"Error listing assignments: {str(e)}")
+        raise HTTPException(status_code=500, detail=f"Error listing non-responders: {str(e)}")
 
 
+@router.post("/assignments/{assignment_id}/remind", status_code=202)
+async def remind_assignment(
+        assignment_id: int,
+        token_data: TokenData = Depends(get_current_token_data),
+        questionnaire_repo: QuestionnaireRepo = Depends(get_questionnaire_repo),
+        job_repo: JobRepo = Depends(get_job_repo)
+):
+    """Remind non-responders in private messages, the reminders are sent by a job"""
+    try:
+        assignment = await questionnaire_repo.get_assignment(assignment_id)
+        if not assignment:
+            raise NotFoundError(f"Assignment {assignment_id} not found")
+
+        job = await job_repo.enqueue(
+            JobKind.REMIND_NON_RESPONDERS,
+            {"assignment_id": assignment_id},
+            priority=1,
+            created_by=token_data.user_id,
+        )
+        return {
+            "status": "queued",
+            "job_id": job.id
+        }
+    except NotFoundError as e:
+        raise HTTPException(status_code=404, detail=str(e))
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Error queuing reminders: {str(e)}")
+
 def questionnaire_to_dict(questionnaire: Questionnaire) -> dict:
     """Convert questionnaire model to dictionary"""
     return {
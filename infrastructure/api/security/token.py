@@ -6,11 +6,8 @@ from fastapi import Depends, HTTPException, status
 from fastapi.security import OAuth2PasswordBearer
 from pydantic import BaseModel
 
-from tgbot.config import load_config
-
-# Load configuration
-config = load_config(".env")
-auth_config = config.auth
+from infrastructure.api.dependencies import get_config
+from tgbot.config import Config, AuthConfig
 
 # OAuth2 scheme for token authentication
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="auth/token")
@@ -20,12 +17,17 @@ class TokenData(BaseModel):
     user_id: Optional[int] = None
     role: Optional[str] = None
 
-def create_access_token(data: Dict[str, Any], expires_delta: Optional[timedelta] = None) -> str:
+def create_access_token(
+    data: Dict[str, Any],
+    auth_config: AuthConfig,
+    expires_delta: Optional[timedelta] = None
+) -> str:
     """
     Create a JWT access token.
     
     Args:
         data: The data to encode in the token
+        auth_config: Authentication settings used to sign the token
         expires_delta: Optional expiration time delta
         
     Returns:
@@ -43,12 +45,13 @@ def create_access_token(data: Dict[str, Any], expires_delta: Optional[timedelta]
     
     return encoded_jwt
 
-def decode_token(token: str) -> TokenData:
+def decode_token(token: str, auth_config: AuthConfig) -> TokenData:
     """
     Decode a JWT token and extract the data.
     
     Args:
         token: The JWT token to decode
+        auth_config: Authentication settings used to verify the token
         
     Returns:
         The decoded token data
@@ -78,14 +81,18 @@ def decode_token(token: str) -> TokenData:
             headers={"WWW-Authenticate": "Bearer"},
         )
 
-async def get_current_token_data(token: str = Depends(oauth2_scheme)) -> TokenData:
+async def get_current_token_data(
+    token: str = Depends(oauth2_scheme),
+    config: Config = Depends(get_config)
+) -> TokenData:
     """
     Get the current user's token data from the JWT token.
     
     Args:
         token: The JWT token from the Authorization header
+        config: The application configuration
         
     Returns:
         The decoded token data
     """
-    return decode_token(token)
\ No newline at end of file
+    return decode_token(token, config.auth)
\ No newline at end of file
@@ -0,0 +1,333 @@
+"""
+Export and import of the questionnaire catalog as bundles.
+
+A bundle is a stream of records, either NDJSON (one JSON object per line) or
+YAML (one document per record, separated by `---` lines):
+
+    {"kind": "bundle", "version": 1}
+    {"kind": "questionnaire", "title": "...", "description": "...", "questions": [...], "is_anonymous": false, "created_by": 1}
+    {"kind": "schedule", "schedule_type": "WEEKLY", "weekdays": "0,3", "weekly_time": "10:00:00", "group_ids": [...]}
+
+Exports read the questionnaires through a server-side cursor and write the
+records as they come. Imports parse one record at a time, validate it and
+insert the records in batches of `BATCH_SIZE`, all in one transaction: a
+bundle is imported completely or not at all. Schedule groups unknown to the
+target database are skipped.
+
+Usage:
+    python -m infrastructure.database.bundles export catalog.ndjson
+    python -m infrastructure.database.bundles import catalog.yaml --created-by 12345
+"""
+import json
+from dataclasses import dataclass
+from datetime import date, time
+from typing import Any, AsyncIterable, AsyncIterator, Dict, List, Literal, Optional, Tuple
+
+from pydantic import AliasChoices, BaseModel, Field, ValidationError
+from sqlalchemy import insert, select
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import selectinload
+
+from infrastructure.database.invalidation import publish
+from infrastructure.database.models import Group, Questionnaire, Schedule, ScheduleGroup, ScheduleType, User
+
+BUNDLE_VERSION = 1
+BATCH_SIZE = 1000
+FORMATS = ("ndjson", "yaml")
+MEDIA_TYPES = {"ndjson": "application/x-ndjson", "yaml": "application/yaml"}
+
+
+class BundleError(ValueError):
+    """Raised when a bundle cannot be imported, the message tells the line of the bad record"""
+
+
+class BundleHeader(BaseModel):
+    kind: Literal["bundle"] = "bundle"
+    version: int = BUNDLE_VERSION
+
+
+class QuestionModel(BaseModel):
+    # Questions created in the bot keep their text under "question"
+    text: str = Field(validation_alias=AliasChoices("text", "question"))
+    type: str
+    options: List[str] | None = None
+
+
+class QuestionnaireRecord(BaseModel):
+    kind: Literal["questionnaire"] = "questionnaire"
+    title: str = Field(max_length=255)
+    description: str = Field(max_length=1000)
+    questions: List[QuestionModel]
+    is_anonymous: bool = False
+    created_by: Optional[int] = None
+
+
+class ScheduleRecord(BaseModel):
+    kind: Literal["schedule"] = "schedule"
+    schedule_type: ScheduleType
+    one_time_date: Optional[date] = None
+    one_time_time: Optional[time] = None
+    weekdays: Optional[str] = Field(default=None, max_length=20)
+    weekly_time: Optional[time] = None
+    start_date: Optional[date] = None
+    end_date: Optional[date] = None
+    specific_time: Optional[time] = None
+    specific_dates: Optional[List[Any]] = None
+    is_active: bool = True
+    group_ids: List[int] = []
+
+
+@dataclass
+class ImportResult:
+    questionnaires: int = 0
+    schedules: int = 0
+    skipped_groups: int = 0
+
+
+def bundle_format(filename: str) -> str:
+    """Guess the bundle format from a file name."""
+    return "yaml" if filename.endswith((".yaml", ".yml")) else "ndjson"
+
+
+def _yaml():
+    try:
+        import yaml
+    except ImportError:
+        raise BundleError("YAML bundles need PyYAML, install it or use NDJSON") from None
+    return yaml
+
+
+def encode_record(record: Dict[str, Any], fmt: str) -> str:
+    if fmt == "yaml":
+        return "---\n" + _yaml().safe_dump(record, allow_unicode=True, sort_keys=False)
+    return json.dumps(record, ensure_ascii=False) + "\n"
+
+
+async def export_records(session: AsyncSession) -> AsyncIterator[Dict[str, Any]]:
+    """Yield the header, every questionnaire and every schedule as bundle records."""
+    yield BundleHeader().model_dump()
+
+    rows = await session.stream(
+        select(
+            Questionnaire.title,
+            Questionnaire.description,
+            Questionnaire.questions,
+            Questionnaire.is_anonymous,
+            Questionnaire.created_by,
+        )
+        .order_by(Questionnaire.id)
+        .execution_options(yield_per=BATCH_SIZE)
+    )
+    async for row in rows:
+        yield {"kind": "questionnaire", **row._asdict()}
+
+    schedules = await session.scalars(
+        select(Schedule).options(selectinload(Schedule.groups)).order_by(Schedule.id)
+    )
+    for schedule in schedules:
+        record = ScheduleRecord.model_validate(schedule, from_attributes=True)
+        record.group_ids = [schedule_group.group_id for schedule_group in schedule.groups]
+        yield record.model_dump(mode="json")
+
+
+async def export_bundle(session: AsyncSession, fmt: str) -> AsyncIterator[str]:
+    """Yield the catalog as encoded bundle records, see `export_records`."""
+    async for record in export_records(session):
+        yield encode_record(record, fmt)
+
+
+async def _lines(chunks: AsyncIterable[bytes]) -> AsyncIterator[str]:
+    buffer = b""
+    async for chunk in chunks:
+        buffer += chunk
+        *lines, buffer = buffer.split(b"\n")
+        for line in lines:
+            yield line.decode()
+    if buffer:
+        yield buffer.decode()
+
+
+async def decode_records(chunks: AsyncIterable[bytes], fmt: str) -> AsyncIterator[Tuple[int, Any]]:
+    """
+    Parse a bundle incrementally.
+
+    :param chunks: The raw bundle, in chunks of any size.
+    :param fmt: "ndjson" or "yaml".
+    :return: (line number, record) pairs, the line being where the record starts.
+    """
+    number = 0
+    if fmt == "ndjson":
+        async for line in _lines(chunks):
+            number += 1
+            if line.strip():
+                try:
+                    yield number, json.loads(line)
+                except ValueError as e:
+                    raise BundleError(f"Line {number}: invalid JSON: {e}") from None
+        return
+
+    yaml = _yaml()
+    document: List[str] = []
+    start = 1
+
+    def load() -> Any:
+        try:
+            return yaml.safe_load("\n".join(document))
+        except yaml.YAMLError as e:
+            raise BundleError(f"Line {start}: invalid YAML: {e}") from None
+
+    async for line in _lines(chunks):
+        number += 1
+        if line.rstrip() == "---":
+            if document and (record := load()) is not None:
+                yield start, record
+            document, start = [], number + 1
+        else:
+            document.append(line)
+    if document and (record := load()) is not None:
+        yield start, record
+
+
+async def import_bundle(
+        session: AsyncSession,
+        records: AsyncIterable[Tuple[int, Any]],
+        created_by: Optional[int] = None,
+) -> ImportResult:
+    """
+    Validate and insert bundle records in one transaction.
+
+    :param session: The session to import with, it is committed on success and rolled back on failure.
+    :param records: (line number, record) pairs, see `decode_records`.
+    :param created_by: Author of all imported questionnaires, instead of the ones in the bundle.
+    :raises BundleError: If a record is invalid or its author does not exist.
+    """
+    result = ImportResult()
+    questionnaires: List[Tuple[int, Dict[str, Any]]] = []
+    schedules: List[ScheduleRecord] = []
+    try:
+        async for number, raw in records:
+            kind = raw.get("kind") if isinstance(raw, dict) else None
+            try:
+                if kind == "bundle":
+                    header = BundleHeader.model_validate(raw)
+                    if header.version > BUNDLE_VERSION:
+                        raise BundleError(f"Line {number}: unsupported bundle version {header.version}")
+                elif kind in ("questionnaire", None) and isinstance(raw, dict):
+                    record = QuestionnaireRecord.model_validate(raw)
+                    author = created_by or record.created_by
+                    if author is None:
+                        raise BundleError(f"Line {number}: created_by is missing")
+                    questionnaires.append((number, {
+                        "title": record.title,
+                        "description": record.description,
+                        # Stored as given, validation must not rename the question keys
+                        "questions": raw["questions"],
+                        "is_anonymous": record.is_anonymous,
+                        "created_by": author,
+                    }))
+                elif kind == "schedule":
+                    schedules.append(ScheduleRecord.model_validate(raw))
+                else:
+                    raise BundleError(f"Line {number}: unknown record kind {kind!r}")
+            except ValidationError as e:
+                raise BundleError(f"Line {number}: {e}") from None
+
+            if len(questionnaires) >= BATCH_SIZE:
+                result.questionnaires += await _insert_questionnaires(session, questionnaires)
+                questionnaires.clear()
+            if len(schedules) >= BATCH_SIZE:
+                await _insert_schedules(session, schedules, result)
+                schedules.clear()
+
+        if questionnaires:
+            result.questionnaires += await _insert_questionnaires(session, questionnaires)
+        if schedules:
+            await _insert_schedules(session, schedules, result)
+        if result.questionnaires:
+            await publish(session, "questionnaire")
+        await session.commit()
+    except Exception:
+        await session.rollback()
+        raise
+    return result
+
+
+async def _insert_questionnaires(session: AsyncSession, batch: List[Tuple[int, Dict[str, Any]]]) -> int:
+    authors = {row["created_by"] for _, row in batch}
+    known = set(await session.scalars(select(User.user_id).where(User.user_id.in_(authors))))
+    for number, row in batch:
+        if row["created_by"] not in known:
+            raise BundleError(f"Line {number}: user {row['created_by']} does not exist, "
+                              f"import with another created_by")
+
+    await session.execute(insert(Questionnaire), [row for _, row in batch])
+    return len(batch)
+
+
+async def _insert_schedules(session: AsyncSession, batch: List[ScheduleRecord], result: ImportResult) -> None:
+    ids = await session.scalars(
+        insert(Schedule).returning(Schedule.id, sort_by_parameter_order=True),
+        [record.model_dump(exclude={"kind", "group_ids"}) for record in batch],
+    )
+
+    group_ids = {group_id for record in batch for group_id in record.group_ids}
+    known = set(await session.scalars(select(Group.group_id).where(Group.group_id.in_(group_ids)))) \
+        if group_ids else set()
+    links = []
+    for schedule_id, record in zip(ids.all(), batch):
+        for group_id in dict.fromkeys(record.group_ids):
+            if group_id in known:
+                links.append({"schedule_id": schedule_id, "group_id": group_id})
+            else:
+                result.skipped_groups += 1
+    if links:
+        await session.execute(insert(ScheduleGroup), links)
+    result.schedules += len(batch)
+
+
+if __name__ == "__main__":
+    import argparse
+    import asyncio
+    import sys
+    import time as timer
+
+    from infrastructure.database.setup import create_engine, create_session_pool
+    from tgbot.config import get_config
+
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("command", choices=["export", "import"])
+    parser.add_argument("file", help="bundle file, .yaml/.yml for YAML, anything else for NDJSON")
+    parser.add_argument("--format", choices=FORMATS, help="override the format guessed from the file name")
+    parser.add_argument("--created-by", type=int, help="import: author of all imported questionnaires")
+    args = parser.parse_args()
+    fmt = args.format or bundle_format(args.file)
+
+    async def read_chunks(path: str) -> AsyncIterator[bytes]:
+        with open(path, "rb") as file:
+            while chunk := file.read(1 << 16):
+                yield chunk
+
+    async def main():
+        engine = create_engine(get_config().db)
+        session_pool = create_session_pool(engine)
+        started = timer.perf_counter()
+        try:
+            async with session_pool() as session:
+                if args.command == "export":
+                    with open(args.file, "w", encoding="utf-8") as file:
+                        async for text in export_bundle(session, fmt):
+                            file.write(text)
+                    print(f"Exported to {args.file}")
+                else:
+                    result = await import_bundle(
+                        session, decode_records(read_chunks(args.file), fmt), created_by=args.created_by
+                    )
+                    print(f"Imported {result.questionnaires} questionnaires and {result.schedules} schedules, "
+                          f"skipped {result.skipped_groups} unknown schedule groups")
+        except BundleError as e:
+            sys.exit(str(e))
+        finally:
+            await engine.dispose()
+        print(f"Done in {timer.perf_counter() - started:.1f} s")
+
+    asyncio.run(main())
@@ -0,0 +1,87 @@
+from contextlib import contextmanager
+from contextvars import ContextVar
+from dataclasses import dataclass, field
+from typing import Any, Iterator, Optional
+
+
+@dataclass
+class QueryStats:
+    """
+    SQL statements executed on behalf of one unit of work (a bot update, an API request).
+
+    Attributes
+    ----------
+    label : str
+        What the statements are attributed to, e.g. "update 1234" or "GET /groups/".
+    statements : int
+        Number of statements executed.
+    duration : float
+        Total time spent executing them, in seconds.
+    slow_statements : int
+        Number of statements that went to the slow-query log.
+    parent : Optional[QueryStats]
+        The enclosing unit of work, which is credited with the same statements.
+    """
+
+    label: str = ""
+    statements: int = 0
+    duration: float = 0.0
+    slow_statements: int = 0
+    parent: Optional["QueryStats"] = field(default=None, repr=False)
+
+    def record(self, duration: float, slow: bool = False) -> None:
+        """Count one statement here and in every enclosing unit of work."""
+        stats = self
+        while stats is not None:
+            stats.statements += 1
+            stats.duration += duration
+            if slow:
+                stats.slow_statements += 1
+            stats = stats.parent
+
+    def summary(self) -> str:
+        return f"{self.statements} queries, {self.duration * 1000:.1f} ms in DB"
+
+
+_current_query_stats: ContextVar[Optional[QueryStats]] = ContextVar("query_stats", default=None)
+
+
+def current_query_stats() -> Optional[QueryStats]:
+    """Return the stats of the unit of work being tracked in this context, if any."""
+    return _current_query_stats.get()
+
+
+@contextmanager
+def track_queries(label: str = "") -> Iterator[QueryStats]:
+    """
+    Attribute every statement executed inside the block to a fresh `QueryStats`.
+
+    Blocks can be nested; statements are counted by every enclosing block.
+
+    Example usage:
+        with track_queries("GET /groups/") as stats:
+            await repo.users.get_user(user_id)
+        print(stats.statements, stats.duration)
+    """
+    stats = QueryStats(label=label, parent=_current_query_stats.get())
+    token = _current_query_stats.set(stats)
+    try:
+        yield stats
+    finally:
+        _current_query_stats.reset(token)
+
+
+def redact_parameters(parameters: Any) -> Any:
+    """
+    Replace bound parameter values with their type names, keeping the shape.
+
+    Used by the slow-query log, so statements can be told apart without
+    leaking user data (answers, password hashes, names) into the logs.
+    """
+    if isinstance(parameters, dict):
+        return {key: redact_parameters(value) for key, value in parameters.items()}
+    if isinstance(parameters, (list, tuple)):
+        return type(parameters)(redact_parameters(value) for value in parameters)
+    if parameters is None:
+        return None
+    return f"<{type(parameters).__name__}>"
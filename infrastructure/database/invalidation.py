@@ -0,0 +1,106 @@
+"""
+Cache invalidation across the bot and API processes.
+
+Repository methods changing questionnaires, groups, assignments or users
+call `publish` in their transaction, or add `publish_returning` to the
+RETURNING clause of their write. It sends a NOTIFY on
+`INVALIDATION_CHANNEL`, which Postgres delivers to every listening process
+once the transaction commits, including the process that made the change.
+Each process's `InvalidationBus` receives these notifications through the
+process's `PgListener` and calls the callbacks subscribed to the entity with
+the changed IDs. None means any entity of that kind may have changed.
+
+A notification can be missed while the listener is disconnected. For that
+reason every callback gets None after a reconnect, and `connected` tells
+caches whether they can rely on being told about changes.
+
+Example usage:
+    bus = InvalidationBus()
+    bus.attach(listener)
+    bus.subscribe(["questionnaire"], lambda ids: cache.clear())
+"""
+import json
+import logging
+from collections import defaultdict
+from typing import Any, Callable, Dict, Iterable, List, Optional
+
+from sqlalchemy import ColumnElement, Text, cast, func, literal, select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from infrastructure.database.listener import PgListener
+from infrastructure.database.routing import use_primary
+
+INVALIDATION_CHANNEL = "cache_invalidation"
+ENTITIES = ("questionnaire", "group", "assignment", "user")
+
+# More IDs than this are sent as "all of them", keeping the payload under the 8000 bytes limit
+MAX_IDS = 200
+
+Callback = Callable[[Optional[List[Any]]], None]
+
+
+async def publish(session: AsyncSession, entity: str, ids: Optional[Iterable[Any]] = None) -> None:
+    """
+    Tell every process, when the session's transaction commits, that entities changed.
+
+    :param session: The session making the change.
+    :param entity: One of `ENTITIES`.
+    :param ids: IDs of the changed entities, None for any of them.
+    """
+    if ids is not None:
+        ids = list(dict.fromkeys(ids))
+        if len(ids) > MAX_IDS:
+            ids = None
+    use_primary(session)
+    payload = json.dumps({"entity": entity, "ids": ids})
+    await session.execute(select(func.pg_notify(INVALIDATION_CHANNEL, payload)))
+
+
+def publish_returning(entity: str, id_column: ColumnElement) -> ColumnElement:
+    """
+    `publish` for the written row, as an expression to add to the RETURNING clause of a write.
+
+    It saves the extra statement of `publish` where a write returns the row anyway.
+
+    :param entity: One of `ENTITIES`.
+    :param id_column: The ID column of the written table.
+    """
+    prefix = json.dumps({"entity": entity, "ids": []})[:-2]
+    payload = literal(prefix, Text) + cast(id_column, Text) + literal("]}", Text)
+    return func.pg_notify(INVALIDATION_CHANNEL, payload)
+
+
+class InvalidationBus:
+    def __init__(self) -> None:
+        self._listener: Optional[PgListener] = None
+        self._callbacks: Dict[str, List[Callback]] = defaultdict(list)
+
+    def attach(self, listener: PgListener) -> None:
+        listener.listen(INVALIDATION_CHANNEL, self._dispatch)
+        listener.on_reconnect(self.flush)
+        self._listener = listener
+
+    @property
+    def connected(self) -> bool:
+        """Whether changes are being received right now."""
+        return self._listener is not None and self._listener.connected
+
+    def subscribe(self, entities: Iterable[str], callback: Callback) -> None:
+        for entity in entities:
+            self._callbacks[entity].append(callback)
+
+    def _notify(self, entity: str, ids: Optional[List[Any]]) -> None:
+        for callback in self._callbacks.get(entity, ()):
+            try:
+                callback(ids)
+            except Exception:
+                logging.exception(f"Failed to invalidate cached {entity} entries")
+
+    def _dispatch(self, payload: str) -> None:
+        event = json.loads(payload)
+        self._notify(event["entity"], event["ids"])
+
+    def flush(self) -> None:
+        """Invalidate everything, e.g. after notifications may have been missed."""
+        for entity in list(self._callbacks):
+            self._notify(entity, None)
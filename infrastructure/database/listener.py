@@ -0,0 +1,101 @@
+"""
+One Postgres connection receiving the NOTIFY messages of a process.
+
+Writers send notifications from their transaction (`pg_notify`), so they are
+delivered when it commits and not at all when it rolls back. A process keeps
+a single `PgListener` outside of the connection pool and hands each payload to
+the callbacks registered for its channel.
+
+Notifications sent while the listener is disconnected are lost. After every
+reconnect the `on_reconnect` callbacks run, so consumers can reload what
+they derived from the missed notifications.
+
+Example usage:
+    listener = PgListener(config.db)
+    listener.listen("responses", lambda payload: print(payload))
+    task = asyncio.create_task(listener.run())
+"""
+import asyncio
+import logging
+from collections import defaultdict
+from typing import Callable, Dict, List
+
+from tgbot.config import DbConfig
+
+# The listening connection is idle most of the time, check it is still alive this often
+KEEPALIVE_INTERVAL = 30
+MAX_RECONNECT_DELAY = 30
+
+
+class PgListener:
+    def __init__(self, db: DbConfig) -> None:
+        self.db = db
+        self.connected = False
+        self._handlers: Dict[str, List[Callable[[str], None]]] = defaultdict(list)
+        self._on_reconnect: List[Callable[[], None]] = []
+        self._listened = False
+
+    def listen(self, channel: str, handler: Callable[[str], None]) -> None:
+        """Call `handler` with the payload of every notification on `channel`; register before `run`."""
+        self._handlers[channel].append(handler)
+
+    def on_reconnect(self, callback: Callable[[], None]) -> None:
+        """Call `callback` after the connection was lost and established again."""
+        self._on_reconnect.append(callback)
+
+    def _dispatch(self, connection, pid: int, channel: str, payload: str) -> None:
+        for handler in self._handlers[channel]:
+            try:
+                handler(payload)
+            except Exception:
+                logging.exception(f"Failed to handle a notification on {channel}")
+
+    async def _listen_once(self, reconnected: bool) -> None:
+        import asyncpg
+
+        connection = await asyncpg.connect(
+            host=self.db.host,
+            port=self.db.port,
+            user=self.db.user,
+            password=self.db.password,
+            database=self.db.database,
+        )
+        lost = asyncio.Event()
+        connection.add_termination_listener(lambda _: lost.set())
+        try:
+            for channel in self._handlers:
+                await connection.add_listener(channel, self._dispatch)
+            self.connected = self._listened = True
+            logging.info(f"Listening to {', '.join(self._handlers)}")
+            if reconnected:
+                for callback in self._on_reconnect:
+                    callback()
+
+            while not lost.is_set():
+                try:
+                    await asyncio.wait_for(lost.wait(), KEEPALIVE_INTERVAL)
+                except asyncio.TimeoutError:
+                    await connection.fetchval("SELECT 1", timeout=5)
+        finally:
+            self.connected = False
+            if not connection.is_closed():
+                await connection.close(timeout=5)
+
+    async def run(self) -> None:
+        """Listen forever, reconnecting with a growing delay when the connection is lost."""
+        delay = 0.5
+        reconnected = False
+        while True:
+            self._listened = False
+            try:
+                await self._listen_once(reconnected)
+                error = "connection closed"
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                error = str(e) or type(e).__name__
+            # Back off only while connecting fails
+            delay = 1 if self._listened else min(delay * 2, MAX_RECONNECT_DELAY)
+            logging.warning(f"Notification listener disconnected, reconnecting in {delay} s: {error}")
+            await asyncio.sleep(delay)
+            reconnected = True
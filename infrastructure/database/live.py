@@ -0,0 +1,182 @@
+"""
+Live response counts of assignments.
+
+`submit_response` notifies `RESPONSES_CHANNEL` in its transaction with the
+assignment, whether the response is new, how the answer counts changed and
+the ID of the writing transaction. `LiveResponses` fans the notifications
+received by the process's `PgListener` out to the subscribers of each
+assignment, e.g. the streams of `GET /assignments/{id}/live`, so one
+database connection serves any number of them.
+
+A subscriber starts from counts read after it subscribed (`load_counts`).
+Notifications of transactions those counts already include are recognized
+by their transaction ID and skipped, so nothing is counted twice.
+"""
+import asyncio
+import json
+from collections import defaultdict
+from contextlib import contextmanager
+from dataclasses import dataclass
+from typing import Any, Dict, Iterator, List, Optional, Set
+
+from sqlalchemy import Text, cast, func, literal, select
+from sqlalchemy.dialects.postgresql import JSONB
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from infrastructure.database.listener import PgListener
+from infrastructure.database.repo.responses import ResponseRepo
+from infrastructure.database.routing import use_primary
+
+RESPONSES_CHANNEL = "responses"
+
+# Longer answers are free text, not options
+MAX_OPTION_LENGTH = 100
+# Postgres rejects payloads of 8000 bytes and more; bigger changes are sent without their counts
+MAX_PAYLOAD_BYTES = 7000
+SUBSCRIBER_QUEUE_SIZE = 100
+
+# Event telling a subscriber to read the counts again
+RESYNC: Dict[str, Any] = {"resync": True}
+
+Counts = Dict[str, Dict[str, int]]
+
+
+def _option_values(answer: Any) -> List[str]:
+    values = answer if isinstance(answer, list) else [answer]
+    return [str(value) for value in values if len(str(value)) <= MAX_OPTION_LENGTH]
+
+
+def answer_deltas(answers: dict, previous: Optional[dict]) -> Counts:
+    """How replacing `previous` answers (None for a new response) by `answers` changes the counts."""
+    deltas: Dict[str, Dict[str, int]] = defaultdict(lambda: defaultdict(int))
+    for sign, source in ((1, answers), (-1, previous or {})):
+        for key, answer in source.items():
+            for value in _option_values(answer):
+                deltas[key][value] += sign
+    return {
+        key: {value: delta for value, delta in values.items() if delta}
+        for key, values in deltas.items()
+        if any(values.values())
+    }
+
+
+def notify_response(assignment_id: int, answers: dict, previous: Optional[dict]):
+    """The statement notifying subscribers of a submitted response, None when nothing changed."""
+    event = {"assignment_id": assignment_id, "new": previous is None, "options": answer_deltas(answers, previous)}
+    if not event["new"] and not event["options"]:
+        return None
+    payload = json.dumps(event, ensure_ascii=False)
+    if len(payload.encode()) > MAX_PAYLOAD_BYTES:
+        event["options"] = None
+        payload = json.dumps(event)
+    xid = func.jsonb_build_object("xid", func.txid_current())
+    # Bound as text: a JSONB bind parameter would encode the JSON string once more
+    event_json = cast(literal(payload, Text), JSONB)
+    return select(func.pg_notify(RESPONSES_CHANNEL, cast(event_json.op("||")(xid), Text)))
+
+
+def choice_options(questions: List[dict]) -> Dict[str, List[str]]:
+    """Options of the multiple-choice questions, by the question index used as the key of the answers."""
+    return {
+        str(index): question["options"]
+        for index, question in enumerate(questions or [])
+        if isinstance(question, dict) and question.get("options")
+    }
+
+
+def count_options(counts: Counts, options: Dict[str, List[str]], fill: bool = False) -> Counts:
+    """Keep the counts of the given options only; with `fill`, options nobody picked count 0."""
+    result = {}
+    for key, question_options in options.items():
+        values = counts.get(key, {})
+        kept = {option: values.get(option, 0) for option in question_options if fill or option in values}
+        if kept:
+            result[key] = kept
+    return result
+
+
+@dataclass
+class Snapshot:
+    """A `txid_current_snapshot()`: which transactions a read could see."""
+    xmin: int
+    xmax: int
+    running: Set[int]
+
+    @classmethod
+    def parse(cls, text: str) -> "Snapshot":
+        xmin, xmax, running = text.split(":")
+        return cls(int(xmin), int(xmax), {int(xid) for xid in running.split(",") if xid})
+
+    def includes(self, xid: int) -> bool:
+        return xid < self.xmin or (xid < self.xmax and xid not in self.running)
+
+
+@dataclass
+class LiveCounts:
+    responses: int
+    options: Counts
+    snapshot: Snapshot
+
+
+async def load_counts(session: AsyncSession, assignment_id: int) -> LiveCounts:
+    """Read the counts of an assignment, with the snapshot they were read in."""
+    # The snapshot has to be the primary's and the same for every statement
+    use_primary(session)
+    await session.connection(execution_options={"isolation_level": "REPEATABLE READ"})
+    snapshot = Snapshot.parse(await session.scalar(select(cast(func.txid_current_snapshot(), Text))))
+    responses, options = await ResponseRepo(session).get_answer_counts(assignment_id)
+    return LiveCounts(responses, options, snapshot)
+
+
+class LiveResponses:
+    """
+    Response notifications by assignment, for any number of subscribers.
+
+    Example usage:
+        live = LiveResponses()
+        live.attach(listener)
+        with live.subscribe(assignment_id) as events:
+            event = await events.get()
+    """
+
+    def __init__(self) -> None:
+        self._subscribers: Dict[int, Set[asyncio.Queue]] = defaultdict(set)
+
+    def attach(self, listener: PgListener) -> None:
+        listener.listen(RESPONSES_CHANNEL, self._publish)
+        # Notifications sent while the listener was away are lost
+        listener.on_reconnect(self._resync_all)
+
+    @contextmanager
+    def subscribe(self, assignment_id: int) -> Iterator[asyncio.Queue]:
+        """A queue of the notification events of an assignment, or `RESYNC`."""
+        queue = asyncio.Queue(maxsize=SUBSCRIBER_QUEUE_SIZE)
+        self._subscribers[assignment_id].add(queue)
+        try:
+            yield queue
+        finally:
+            self._subscribers[assignment_id].discard(queue)
+            if not self._subscribers[assignment_id]:
+                del self._subscribers[assignment_id]
+
+    @staticmethod
+    def _put(queue: asyncio.Queue, event: Dict[str, Any]) -> None:
+        if queue.full():
+            # A subscriber this far behind reads the counts again instead
+            while not queue.empty():
+                queue.get_nowait()
+            event = RESYNC
+        queue.put_nowait(event)
+
+    def _publish(self, payload: str) -> None:
+        event = json.loads(payload)
+        queues = self._subscribers.get(event["assignment_id"], ())
+        if event["options"] is None:
+            event = RESYNC
+        for queue in queues:
+            self._put(queue, event)
+
+    def _resync_all(self) -> None:
+        for queues in self._subscribers.values():
+            for queue in queues:
+                self._put(queue, RESYNC)
@@ -1,11 +1,12 @@
 from .base import Base
 from .users import User, UserRole
 from .user_profiles import StudentProfile, MentorProfile, AdminProfile
-from .groups import Group
+from .groups import Group, GroupMember
 from .schedules import Schedule, ScheduleType, Weekday, ScheduleGroup
 from .assignments import Assignment
 from .questionnaires import Questionnaire
 from .responses import Response
+from .jobs import Job, JobKind, JobStatus
 
 __all__ = [
     "Base",
@@ -15,6 +16,7 @@ __all__ = [
     "MentorProfile",
     "AdminProfile",
     "Group",
+    "GroupMember",
     "Schedule",
     "ScheduleGroup",
     "ScheduleType",
@@ -22,4 +24,7 @@ __all__ = [
     "Assignment",
     "Questionnaire",
     "Response",
+    "Job",
+    "JobKind",
+    "JobStatus",
 ]
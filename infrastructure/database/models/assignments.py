@@ -1,8 +1,8 @@
 from datetime import datetime
 from typing import List, Optional
 
-from sqlalchemy import BigInteger, ForeignKey, Column, Integer
-from sqlalchemy.orm import Mapped, mapped_column, relationship
+from sqlalchemy import BigInteger, ForeignKey, Column, Integer, Index, text
+from sqlalchemy.orm import Mapped, mapped_column, relationship, synonym
 from sqlalchemy.sql import expression
 
 from sqlalchemy.dialects.postgresql import TIMESTAMP
@@ -24,11 +24,17 @@ class Assignment(Base, TimestampMixin):
         schedule_id: Reference to schedule (optional)
 
         start_time: Start time of the assignment
-        deadline_time: Deadline time of the assignment
+        deadline_time: Deadline time of the assignment (also available as due_date)
+        is_active: Whether the assignment still accepts responses
         
         created_by: User who created the assignment
     """
     __tablename__ = "assignments"
+    __table_args__ = (
+        Index("ix_assignments_group_id_active", "group_id", postgresql_where=text("is_active")),
+        Index("ix_assignments_active_deadline", "deadline_time", postgresql_where=text("is_active")),
+        Index("ix_assignments_questionnaire_id", "questionnaire_id"),
+    )
 
     id: Mapped[int] = mapped_column(BigInteger, primary_key=True)
     questionnaire_id: Mapped[int] = mapped_column(ForeignKey("questionnaires.id"))
@@ -38,11 +44,13 @@ class Assignment(Base, TimestampMixin):
     # Schedule 
     start_time: Mapped[datetime] = mapped_column(TIMESTAMP)
     deadline_time: Mapped[datetime] = mapped_column(TIMESTAMP)
+    due_date = synonym("deadline_time")
+    is_active: Mapped[bool] = mapped_column(default=True, server_default=expression.true())
     
     created_by: Mapped[int] = mapped_column(ForeignKey("users.user_id"))
 
     questionnaire: Mapped["Questionnaire"] = relationship("Questionnaire")
-    target_group: Mapped["Group"] = relationship("Group")
+    group: Mapped["Group"] = relationship("Group")
     schedule: Mapped[Optional["Schedule"]] = relationship(
         "Schedule",
         primaryjoin="Assignment.schedule_id == Schedule.id",
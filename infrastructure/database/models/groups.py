@@ -1,5 +1,10 @@
-from sqlalchemy import String, BigInteger
+from datetime import datetime
+
+from sqlalchemy import String, BigInteger, ForeignKey
+from sqlalchemy.dialects.postgresql import TIMESTAMP
 from sqlalchemy.orm import Mapped, mapped_column
+from sqlalchemy.sql import expression
+from sqlalchemy.sql.functions import func
 
 from .base import Base, TimestampMixin
 
@@ -19,3 +24,21 @@ class Group(Base, TimestampMixin):
     title: Mapped[str] = mapped_column(String(255))
     type: Mapped[str] = mapped_column(String(20))
     is_active: Mapped[bool] = mapped_column(default=True)
+
+
+class GroupMember(Base):
+    """
+    Represents a user seen in a group, fed from chat_member updates and group messages
+
+    Attributes:
+        group_id: Telegram group ID
+        user_id: Telegram user ID, not necessarily a registered user
+        is_member: Whether the user is still in the group
+        updated_at: When the membership was last confirmed
+    """
+    __tablename__ = "group_members"
+
+    group_id: Mapped[int] = mapped_column(ForeignKey("groups.group_id"), primary_key=True)
+    user_id: Mapped[int] = mapped_column(BigInteger, primary_key=True)
+    is_member: Mapped[bool] = mapped_column(default=True, server_default=expression.true())
+    updated_at: Mapped[datetime] = mapped_column(TIMESTAMP, server_default=func.now())
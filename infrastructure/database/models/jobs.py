@@ -0,0 +1,73 @@
+from datetime import datetime
+from enum import Enum
+from typing import Optional
+
+from sqlalchemy import BigInteger, Enum as SQLEnum, Float, ForeignKey, Index, Integer, LargeBinary, String, Text, text
+from sqlalchemy.dialects.postgresql import JSONB, TIMESTAMP
+from sqlalchemy.orm import Mapped, mapped_column
+from sqlalchemy.sql.functions import func
+
+from .base import Base, TimestampMixin
+
+
+class JobStatus(str, Enum):
+    QUEUED = "queued"
+    RUNNING = "running"
+    DONE = "done"
+    FAILED = "failed"
+
+
+class JobKind:
+    """Kinds of jobs `infrastructure.worker` runs"""
+    EXPORT_BUNDLE = "export_bundle"
+    ASSIGN_BULK = "assign_bulk"
+    REMIND_NON_RESPONDERS = "remind_non_responders"
+
+
+class Job(Base, TimestampMixin):
+    """
+    Represents a unit of background work, run by `infrastructure.worker`
+
+    Attributes:
+        id: Primary key
+        kind: What to do, see JobKind
+        payload: Arguments of the job
+        status: queued, running, done or failed
+        priority: Jobs with a higher priority run first
+        attempts: How many times the job was started
+        max_attempts: Failed attempts are retried until this many were made
+        run_at: When the job may run next, later than now while waiting for a retry
+        locked_by: Worker running the job
+        locked_until: The job is given to another worker if its worker stops renewing this
+        progress: Share of the work done, from 0 to 1
+        result: JSON result of a finished job
+        output: File produced by the job, e.g. an export; deferred, load it explicitly
+        output_type: Media type of the output
+        error: Error of the last failed attempt
+        created_by: User who asked for the job
+    """
+    __tablename__ = "jobs"
+    __table_args__ = (
+        # Claiming takes the first queued job in this order
+        Index("ix_jobs_queue", text("priority DESC"), "run_at", postgresql_where=text("status = 'QUEUED'")),
+        Index("ix_jobs_running_locked_until", "locked_until", postgresql_where=text("status = 'RUNNING'")),
+    )
+
+    id: Mapped[int] = mapped_column(BigInteger, primary_key=True)
+    kind: Mapped[str] = mapped_column(String(50))
+    payload: Mapped[dict] = mapped_column(JSONB)
+    status: Mapped[JobStatus] = mapped_column(SQLEnum(JobStatus, name="job_status_enum"), default=JobStatus.QUEUED)
+    priority: Mapped[int] = mapped_column(Integer, default=0, server_default=text("0"))
+    attempts: Mapped[int] = mapped_column(Integer, default=0, server_default=text("0"))
+    max_attempts: Mapped[int] = mapped_column(Integer, default=5, server_default=text("5"))
+    run_at: Mapped[datetime] = mapped_column(TIMESTAMP, server_default=func.now())
+    locked_by: Mapped[Optional[str]] = mapped_column(String(100), nullable=True)
+    locked_until: Mapped[Optional[datetime]] = mapped_column(TIMESTAMP, nullable=True)
+    progress: Mapped[float] = mapped_column(Float, default=0, server_default=text("0"))
+    result: Mapped[Optional[dict]] = mapped_column(JSONB, nullable=True)
+    output: Mapped[Optional[bytes]] = mapped_column(LargeBinary, nullable=True, deferred=True)
+    output_type: Mapped[Optional[str]] = mapped_column(String(100), nullable=True)
+    error: Mapped[Optional[str]] = mapped_column(Text, nullable=True)
+    created_by: Mapped[Optional[int]] = mapped_column(ForeignKey("users.user_id"), nullable=True)
+    started_at: Mapped[Optional[datetime]] = mapped_column(TIMESTAMP, nullable=True)
+    finished_at: Mapped[Optional[datetime]] = mapped_column(TIMESTAMP, nullable=True)
@@ -1,9 +1,23 @@
-from sqlalchemy import String, ForeignKey, Integer, JSON, BigInteger
+from sqlalchemy import String, ForeignKey, Integer, BigInteger, Index, Computed, text
+from sqlalchemy.dialects.postgresql import JSONB, TSVECTOR
 from sqlalchemy.orm import Mapped, mapped_column, relationship
 
 from .base import Base, TimestampMixin
 from .users import User
 
+# Text search configuration: no stemming, questionnaires are written in several languages
+SEARCH_CONFIG = "simple"
+
+# Title weighs most, then the description, then the question texts ("text" from the API, "question" from the bot)
+SEARCH_VECTOR = (
+    f"setweight(to_tsvector('{SEARCH_CONFIG}', coalesce(title, '')), 'A') || "
+    f"setweight(to_tsvector('{SEARCH_CONFIG}', coalesce(description, '')), 'B') || "
+    f"setweight(jsonb_to_tsvector('{SEARCH_CONFIG}', "
+    f"jsonb_path_query_array(questions, '$[*].text') || "
+    f"jsonb_path_query_array(questions, '$[*].question'), '[\"string\"]'), 'C')"
+)
+
+
 class Questionnaire(Base, TimestampMixin):
     """
     Represents a questionnaire template
@@ -12,18 +26,26 @@ class Questionnaire(Base, TimestampMixin):
         id: Primary key
         title: Questionnaire title
         description: Questionnaire description
-        questions: JSON field containing questions structure
+        questions: JSONB field containing questions structure
         created_by: ID of admin who created the questionnaire
         is_anonymous: Whether responses should be anonymous
+        search_vector: Generated full-text search document, see SEARCH_VECTOR
         schedules: Schedules for this questionnaire
     """
     __tablename__ = "questionnaires"
+    __table_args__ = (
+        Index("ix_questionnaires_created_at", text("created_at DESC")),
+        Index("ix_questionnaires_search_vector", "search_vector", postgresql_using="gin"),
+    )
 
     id: Mapped[int] = mapped_column(Integer, primary_key=True)
     title: Mapped[str] = mapped_column(String(255))
     description: Mapped[str] = mapped_column(String(1000))
-    questions: Mapped[dict] = mapped_column(JSON)
+    questions: Mapped[dict] = mapped_column(JSONB)
     created_by: Mapped[int] = mapped_column(BigInteger, ForeignKey("users.user_id"))
     is_anonymous: Mapped[bool] = mapped_column(default=False)
+    search_vector: Mapped[str] = mapped_column(
+        TSVECTOR, Computed(SEARCH_VECTOR, persisted=True), nullable=True, deferred=True
+    )
 
     creator: Mapped["User"] = relationship("User")
\ No newline at end of file
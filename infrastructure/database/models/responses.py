@@ -1,4 +1,5 @@
-from sqlalchemy import ForeignKey, Integer, JSON
+from sqlalchemy import ForeignKey, Integer, Index
+from sqlalchemy.dialects.postgresql import JSONB
 from sqlalchemy.orm import Mapped, mapped_column, relationship
 
 from .base import Base, TimestampMixin
@@ -8,20 +9,33 @@ from .assignments import Assignment
 class Response(Base, TimestampMixin):
     """
     Represents a student's response to a questionnaire
+
+    The table is partitioned by ranges of assignment_id, see
+    infrastructure.database.partitions. The primary key includes
+    assignment_id because Postgres requires the partition key in it.
     
     Attributes:
-        id: Primary keyr
-        assignment_id: Reference to questionnaire assignment
+        id: Primary key, together with assignment_id
+        assignment_id: Reference to questionnaire assignment, the partition key
         student_id: Reference to student who responded
-        answers: JSON field containing answers
+        answers: JSONB field containing answers, keyed by question index
         is_completed: Whether the response is complete
     """
     __tablename__ = "responses"
+    __table_args__ = (
+        # One response per student and assignment, submit_response upserts on it
+        Index("uq_responses_assignment_id_student_id", "assignment_id", "student_id", unique=True),
+        Index("ix_responses_student_id", "student_id"),
+        # Recent responses of the dashboard
+        Index("ix_responses_created_at", "created_at"),
+        Index("ix_responses_answers", "answers", postgresql_using="gin", postgresql_ops={"answers": "jsonb_path_ops"}),
+        {"postgresql_partition_by": "RANGE (assignment_id)"},
+    )
 
-    id: Mapped[int] = mapped_column(Integer, primary_key=True)
-    assignment_id: Mapped[int] = mapped_column(ForeignKey("assignments.id"))
+    id: Mapped[int] = mapped_column(Integer, primary_key=True, autoincrement=True)
+    assignment_id: Mapped[int] = mapped_column(ForeignKey("assignments.id"), primary_key=True)
     student_id: Mapped[int] = mapped_column(ForeignKey("users.user_id"))
-    answers: Mapped[dict] = mapped_column(JSON)
+    answers: Mapped[dict] = mapped_column(JSONB)
     is_completed: Mapped[bool] = mapped_column(default=False)
 
     assignment: Mapped["Assignment"] = relationship("Assignment")
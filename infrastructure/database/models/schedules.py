@@ -2,7 +2,8 @@ from datetime import datetime, time
 from enum import Enum
 from typing import List, Optional
 
-from sqlalchemy import String, BigInteger, ForeignKey, Integer, JSON, Time, Date
+from sqlalchemy import String, BigInteger, ForeignKey, Integer, Time, Date
+from sqlalchemy.dialects.postgresql import JSONB
 from sqlalchemy.orm import Mapped, mapped_column, relationship
 
 from .base import Base, TimestampMixin, int_pk
@@ -65,7 +66,7 @@ class Schedule(Base, TimestampMixin):
         start_date: Start date for specific dates schedule
         end_date: End date for specific dates schedule (optional)
         specific_time: Time for specific dates schedule
-        specific_dates: JSON array of specific dates (optional)
+        specific_dates: JSONB array of specific dates (optional)
         
         # Common fields
         is_active: Whether the schedule is active
@@ -85,7 +86,7 @@ class Schedule(Base, TimestampMixin):
     start_date: Mapped[Optional[datetime]] = mapped_column(Date, nullable=True)
     end_date: Mapped[Optional[datetime]] = mapped_column(Date, nullable=True)
     specific_time: Mapped[Optional[time]] = mapped_column(Time, nullable=True)
-    specific_dates: Mapped[Optional[dict]] = mapped_column(JSON, nullable=True)  # JSON array of specific dates
+    specific_dates: Mapped[Optional[dict]] = mapped_column(JSONB, nullable=True)  # JSON array of specific dates
     
     # Common fields
     is_active: Mapped[bool] = mapped_column(default=True)
@@ -1,7 +1,7 @@
 from enum import Enum
 from typing import Optional
 
-from sqlalchemy import String, Enum as SQLEnum
+from sqlalchemy import String, Enum as SQLEnum, Index
 from sqlalchemy import text, BIGINT, Boolean, true
 from sqlalchemy.orm import Mapped, mapped_column
 
@@ -36,6 +36,10 @@ class User(Base, TimestampMixin, TableNameMixin):
         can_view_anonymous_data(): Returns True if user can view anonymous data
         can_view_full_data(): Returns True if user can view full data
     """
+    __table_args__ = (
+        Index("ix_users_username", "username", postgresql_where=text("username IS NOT NULL")),
+    )
+
     user_id: Mapped[int] = mapped_column(BIGINT, primary_key=True, autoincrement=False)
     username: Mapped[Optional[str]] = mapped_column(String(128))
     full_name: Mapped[str] = mapped_column(String(128))
@@ -0,0 +1,162 @@
+"""
+Maintenance of the `responses` partitions.
+
+`responses` is partitioned by RANGE (assignment_id), one partition per
+`RESPONSES_PARTITION_SIZE` assignments. Inserting a response for an
+assignment without a partition fails, so `ensure_response_partitions` keeps
+`PARTITIONS_AHEAD` empty partitions in front of the newest assignment; the bot
+runs it on startup and then hourly. Old partitions are detached as a whole
+with `detach_response_partitions` instead of deleting rows.
+
+Usage:
+    python -m infrastructure.database.partitions list
+    python -m infrastructure.database.partitions ensure
+    python -m infrastructure.database.partitions detach --older-than-days 365
+"""
+import asyncio
+import logging
+import re
+from dataclasses import dataclass
+from datetime import timedelta
+from typing import List, Optional
+
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import AsyncConnection, AsyncEngine
+
+RESPONSES_PARTITION_SIZE = 10_000
+PARTITIONS_AHEAD = 2
+MAINTENANCE_INTERVAL = 3600
+
+_BOUND = re.compile(r"FROM \((?:MINVALUE|'?(-?\d+)'?)\) TO \((?:MAXVALUE|'?(-?\d+)'?)\)")
+
+
+@dataclass
+class Partition:
+    """A partition of `responses` covering assignment ids in [lower, upper), None is unbounded."""
+
+    name: str
+    lower: Optional[int]
+    upper: Optional[int]
+
+
+async def list_response_partitions(connection: AsyncConnection) -> List[Partition]:
+    """List the partitions of `responses`, ordered by their ranges."""
+    result = await connection.execute(text(
+        "SELECT c.relname, pg_get_expr(c.relpartbound, c.oid) "
+        "FROM pg_inherits i JOIN pg_class c ON c.oid = i.inhrelid "
+        "WHERE i.inhparent = 'responses'::regclass"
+    ))
+    partitions = []
+    for name, bound in result:
+        match = _BOUND.search(bound)
+        if not match:
+            continue
+        lower, upper = match.groups()
+        partitions.append(Partition(name, int(lower) if lower else None, int(upper) if upper else None))
+    return sorted(partitions, key=lambda p: (p.lower is not None, p.lower or 0))
+
+
+async def ensure_response_partitions(
+        engine: AsyncEngine,
+        ahead: int = PARTITIONS_AHEAD,
+        size: int = RESPONSES_PARTITION_SIZE,
+) -> List[str]:
+    """
+    Create the missing partitions up to `ahead` partitions past the newest assignment.
+
+    Safe to run concurrently from several processes: the work is serialized
+    by an advisory lock.
+
+    :return: Names of the created partitions.
+    """
+    created = []
+    async with engine.begin() as connection:
+        await connection.execute(text("SELECT pg_advisory_xact_lock(hashtext('responses_partitions'))"))
+        max_assignment_id = (await connection.execute(text("SELECT coalesce(max(id), 0) FROM assignments"))).scalar()
+        partitions = await list_response_partitions(connection)
+
+        upper = max((p.upper for p in partitions if p.upper is not None), default=0)
+        target = (max_assignment_id // size + 1 + ahead) * size
+        while upper < target:
+            name = f"responses_{upper}_{upper + size}"
+            await connection.execute(text(
+                f"CREATE TABLE {name} PARTITION OF responses FOR VALUES FROM ({upper}) TO ({upper + size})"
+            ))
+            created.append(name)
+            upper += size
+
+    if created:
+        logging.info(f"Created responses partitions: {', '.join(created)}")
+    return created
+
+
+async def detach_response_partitions(engine: AsyncEngine, older_than: timedelta) -> List[str]:
+    """
+    Detach the partitions whose assignments all ended more than `older_than` ago.
+
+    Partitions are detached CONCURRENTLY, without blocking reads and writes of
+    `responses`. The detached tables are left in place, to be archived or
+    dropped.
+
+    :return: Names of the detached partitions.
+    """
+    async with engine.connect() as connection:
+        first_recent = (await connection.execute(
+            text("SELECT coalesce(min(id), (SELECT coalesce(max(id), 0) + 1 FROM assignments)) "
+                 "FROM assignments WHERE deadline_time >= now() - :older_than"),
+            {"older_than": older_than},
+        )).scalar()
+        partitions = await list_response_partitions(connection)
+
+    detached = []
+    async with engine.connect() as connection:
+        # DETACH PARTITION ... CONCURRENTLY cannot run inside a transaction block
+        await connection.execution_options(isolation_level="AUTOCOMMIT")
+        for partition in partitions:
+            if partition.upper is None or partition.upper > first_recent:
+                continue
+            await connection.execute(text(f"ALTER TABLE responses DETACH PARTITION {partition.name} CONCURRENTLY"))
+            detached.append(partition.name)
+
+    if detached:
+        logging.info(f"Detached responses partitions: {', '.join(detached)}")
+    return detached
+
+
+async def maintain_response_partitions(engine: AsyncEngine, interval: float = MAINTENANCE_INTERVAL) -> None:
+    """Run `ensure_response_partitions` every `interval` seconds, forever."""
+    while True:
+        try:
+            await ensure_response_partitions(engine)
+        except Exception:
+            logging.exception("Failed to create responses partitions")
+        await asyncio.sleep(interval)
+
+
+if __name__ == "__main__":
+    import argparse
+
+    from infrastructure.database.setup import create_engine
+    from tgbot.config import get_config
+
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("command", choices=["list", "ensure", "detach"])
+    parser.add_argument("--older-than-days", type=int, default=365, help="detach: minimum age of the data")
+    args = parser.parse_args()
+
+    async def main():
+        engine = create_engine(get_config().db)
+        try:
+            if args.command == "list":
+                async with engine.connect() as connection:
+                    for partition in await list_response_partitions(connection):
+                        print(f"{partition.name:32} {partition.lower} .. {partition.upper}")
+            elif args.command == "ensure":
+                print(await ensure_response_partitions(engine))
+            else:
+                print(await detach_response_partitions(engine, timedelta(days=args.older_than_days)))
+        finally:
+            await engine.dispose()
+
+    logging.basicConfig(level=logging.INFO)
+    asyncio.run(main())
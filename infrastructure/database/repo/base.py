@@ -1,10 +1,22 @@
+import functools
+import inspect
+
 from sqlalchemy.ext.asyncio import AsyncSession
 
+from infrastructure.database.routing import repository_call
+
+READ_ONLY_PREFIXES = ("get_", "list_", "search_")
+
 
 class BaseRepo:
     """
     A class representing a base repository for handling database operations.
 
+    Public coroutine methods of subclasses are marked for replica routing:
+    `get_*`, `list_*` and `search_*` methods are read-only and may read from
+    the replica, all others use the primary (see infrastructure.database.routing).
+    Writes always go to the primary, whatever the method name.
+
     Attributes:
         session (AsyncSession): The database session used by the repository.
 
@@ -12,3 +24,19 @@ class BaseRepo:
 
     def __init__(self, session):
         self.session: AsyncSession = session
+
+    def __init_subclass__(cls, **kwargs):
+        super().__init_subclass__(**kwargs)
+        for name, method in list(vars(cls).items()):
+            if name.startswith("_") or not inspect.iscoroutinefunction(method):
+                continue
+            setattr(cls, name, _routed(method, read_only=name.startswith(READ_ONLY_PREFIXES)))
+
+
+def _routed(method, read_only: bool):
+    @functools.wraps(method)
+    async def wrapper(*args, **kwargs):
+        with repository_call(read_only):
+            return await method(*args, **kwargs)
+
+    return wrapper
@@ -0,0 +1,144 @@
+from datetime import timedelta
+from typing import Any, Dict, Tuple
+
+from sqlalchemy import BigInteger, case, cast, column, func, literal_column, or_, select, table, type_coerce
+from sqlalchemy.dialects.postgresql import JSON, aggregate_order_by
+from sqlalchemy.sql.elements import ColumnElement
+
+from infrastructure.database.models import Assignment, Group, GroupMember, Questionnaire, Response, User
+from .base import BaseRepo
+
+# Tables the planner believes to be larger than this are not counted, their estimate is reported instead
+ESTIMATE_ABOVE = 100_000
+
+RECENT_RESPONSES_WINDOW = timedelta(hours=24)
+
+_pg_class = table("pg_class", column("oid"), column("relkind"), column("reltuples"))
+_pg_inherits = table("pg_inherits", column("inhrelid"), column("inhparent"))
+
+
+def _total(model) -> Tuple[ColumnElement, ColumnElement]:
+    """
+    Row count of a model's table and whether it is a planner estimate.
+
+    The estimate is `pg_class.reltuples` as of the last ANALYZE, summed over
+    the partitions of a partitioned table (ANALYZE also estimates the parent,
+    which would count every row twice). The exact count only runs when the
+    estimate is small: Postgres evaluates the uncorrelated subqueries of a
+    CASE lazily, when their branch is taken.
+    """
+    oid = literal_column(f"'{model.__tablename__}'::regclass")
+    estimate = (
+        select(func.coalesce(func.sum(func.greatest(_pg_class.c.reltuples, 0)), 0))
+        .where(
+            or_(
+                _pg_class.c.oid == oid,
+                _pg_class.c.oid.in_(select(_pg_inherits.c.inhrelid).where(_pg_inherits.c.inhparent == oid)),
+            ),
+            _pg_class.c.relkind != "p",
+        )
+        .scalar_subquery()
+    )
+    exact = select(func.count()).select_from(model).scalar_subquery()
+    estimated = estimate > ESTIMATE_ABOVE
+    return case((estimated, cast(estimate, BigInteger)), else_=exact), estimated
+
+
+class DashboardRepo(BaseRepo):
+    async def get_summary(self) -> Dict[str, Any]:
+        """
+        Get the dashboard figures with one statement
+
+        Response rate of a group is its responses to its active assignments
+        divided by active assignments × current members, None without either.
+
+        Responses are never counted with a scan of all of `responses`: those
+        of the groups are counted per active assignment with the
+        (assignment_id, student_id) index, the recent ones with the
+        created_at index.
+        """
+        since = func.now() - RECENT_RESPONSES_WINDOW
+        active = select(Assignment.id, Assignment.group_id).where(Assignment.is_active == True).subquery()
+        completed_responses = (
+            select(func.count()).select_from(Response)
+            .where(Response.assignment_id == active.c.id, Response.is_completed == True)
+            .scalar_subquery()
+        )
+
+        assignment_counts = (
+            select(
+                active.c.group_id,
+                func.count().label("count"),
+                cast(func.sum(completed_responses), BigInteger).label("responses"),
+            )
+            .group_by(active.c.group_id)
+            .subquery()
+        )
+        member_counts = (
+            select(GroupMember.group_id, func.count().label("count"))
+            .where(GroupMember.is_member == True)
+            .group_by(GroupMember.group_id)
+            .subquery()
+        )
+        group_row = func.json_build_object(
+            "group_id", Group.group_id,
+            "title", Group.title,
+            "active_assignments", func.coalesce(assignment_counts.c.count, 0),
+            "responses", func.coalesce(assignment_counts.c.responses, 0),
+            "members", func.coalesce(member_counts.c.count, 0),
+        )
+        groups = (
+            select(func.coalesce(
+                func.json_agg(aggregate_order_by(group_row, Group.title)), literal_column("'[]'::json")
+            ))
+            .select_from(Group)
+            .outerjoin(assignment_counts, assignment_counts.c.group_id == Group.group_id)
+            .outerjoin(member_counts, member_counts.c.group_id == Group.group_id)
+            .where(Group.is_active == True)
+            .scalar_subquery()
+        )
+
+        questionnaires, questionnaires_estimated = _total(Questionnaire)
+        users, users_estimated = _total(User)
+        responses, responses_estimated = _total(Response)
+        query = select(
+            questionnaires.label("questionnaires"),
+            questionnaires_estimated.label("questionnaires_estimated"),
+            users.label("users"),
+            users_estimated.label("users_estimated"),
+            responses.label("responses"),
+            responses_estimated.label("responses_estimated"),
+            select(func.count()).select_from(Group).where(Group.is_active == True)
+            .scalar_subquery().label("active_groups"),
+            select(func.count()).select_from(active).scalar_subquery().label("active_assignments"),
+            select(func.count()).select_from(Response).where(Response.created_at >= since)
+            .scalar_subquery().label("responses_last_24h"),
+            type_coerce(groups, JSON).label("groups"),
+        )
+        row = (await self.session.execute(query)).one()
+
+        group_summaries = []
+        for group in row.groups:
+            expected = group["active_assignments"] * group["members"]
+            group_summaries.append({
+                **group,
+                "response_rate": round(group["responses"] / expected, 3) if expected else None,
+            })
+        return {
+            "totals": {
+                "questionnaires": row.questionnaires,
+                "users": row.users,
+                "responses": row.responses,
+                "active_groups": row.active_groups,
+            },
+            "estimated": [
+                name for name, estimated in (
+                    ("questionnaires", row.questionnaires_estimated),
+                    ("users", row.users_estimated),
+                    ("responses", row.responses_estimated),
+                ) if estimated
+            ],
+            "active_assignments": row.active_assignments,
+            "responses_last_24h": row.responses_last_24h,
+            "groups": group_summaries,
+        }
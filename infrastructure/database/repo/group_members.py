@@ -0,0 +1,66 @@
+from typing import Dict, List, Tuple
+
+from sqlalchemy import select, exists, and_, func
+from sqlalchemy.dialects.postgresql import insert
+
+from infrastructure.database.models import Assignment, Group, GroupMember, Response
+from .base import BaseRepo
+
+
+class GroupMemberRepo(BaseRepo):
+    async def upsert_members(self, members: Dict[Tuple[int, int], bool]) -> int:
+        """
+        Record group memberships in one statement.
+
+        Args:
+            members: Whether the user is in the group, by (group_id, user_id).
+                Memberships of groups the bot does not know are skipped.
+
+        Returns:
+            The number of recorded memberships.
+        """
+        group_ids = {group_id for group_id, _ in members}
+        known = set(await self.session.scalars(select(Group.group_id).where(Group.group_id.in_(group_ids))))
+        rows = [
+            {"group_id": group_id, "user_id": user_id, "is_member": is_member}
+            for (group_id, user_id), is_member in members.items()
+            if group_id in known
+        ]
+        if rows:
+            query = insert(GroupMember)
+            query = query.on_conflict_do_update(
+                index_elements=[GroupMember.group_id, GroupMember.user_id],
+                set_={"is_member": query.excluded.is_member, "updated_at": func.now()},
+            )
+            await self.session.execute(query, rows)
+            await self.session.commit()
+        return len(rows)
+
+    async def get_group_members(self, group_id: int) -> List[int]:
+        """Get IDs of the current members of a group"""
+        query = select(GroupMember.user_id).where(GroupMember.group_id == group_id, GroupMember.is_member)
+        result = await self.session.scalars(query)
+        return result.all()
+
+    async def get_non_responders(self, assignment_id: int) -> List[int]:
+        """
+        Get IDs of the members of the assigned group who have not responded yet.
+
+        An anti-join of the group members (primary key lookup by group) with
+        the responses (unique index on assignment_id, student_id).
+        """
+        query = (
+            select(GroupMember.user_id)
+            .join(Assignment, Assignment.group_id == GroupMember.group_id)
+            .where(
+                Assignment.id == assignment_id,
+                GroupMember.is_member,
+                ~exists().where(and_(
+                    Response.assignment_id == Assignment.id,
+                    Response.student_id == GroupMember.user_id,
+                )),
+            )
+            .order_by(GroupMember.user_id)
+        )
+        result = await self.session.scalars(query)
+        return result.all()
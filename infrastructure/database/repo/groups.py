@@ -1,5 +1,6 @@
 from typing import Optional, List
 from sqlalchemy import select, update
+from infrastructure.database.invalidation import publish
 from infrastructure.database.models import Group
 from .base import BaseRepo
 
@@ -14,9 +15,15 @@ class GroupRepo(BaseRepo):
     ) -> Group:
         """Create new group or update existing one"""
         await self.session.merge(group)
+        await publish(self.session, "group", [group.group_id])
         await self.session.commit()
         return group
 
+    async def get_groups(self) -> List[Group]:
+        """Get all groups, active or not"""
+        result = await self.session.execute(select(Group))
+        return result.scalars().all()
+
     async def get_active_groups(self) -> List[Group]:
         """Get all active groups"""
         query = select(Group).where(Group.is_active == True)
@@ -31,4 +38,5 @@ class GroupRepo(BaseRepo):
             .values(is_active=False)
         )
         await self.session.execute(query)
+        await publish(self.session, "group", [group_id])
         await self.session.commit()
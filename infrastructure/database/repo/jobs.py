@@ -0,0 +1,165 @@
+from datetime import datetime, timedelta
+from typing import Any, Iterable, Optional, Tuple
+
+from sqlalchemy import case, func, literal, select, update
+
+from infrastructure.database.models import Job, JobStatus
+from .base import BaseRepo
+
+# Workers are woken up by notifications on this channel when a job is queued
+JOBS_CHANNEL = "jobs"
+
+
+class JobRepo(BaseRepo):
+    async def enqueue(
+            self,
+            kind: str,
+            payload: dict,
+            priority: int = 0,
+            max_attempts: int = 5,
+            created_by: Optional[int] = None,
+            run_at: Optional[datetime] = None,
+    ) -> Job:
+        """
+        Queue a job for `infrastructure.worker`
+
+        Args:
+            kind: What to do, see JobKind.
+            payload: JSON arguments of the job.
+            priority: Jobs with a higher priority run first.
+            max_attempts: How many times the job is tried before it fails.
+            created_by: ID of the user asking for the job.
+            run_at: Not before this time, now by default.
+        """
+        job = Job(
+            kind=kind,
+            payload=payload,
+            priority=priority,
+            max_attempts=max_attempts,
+            created_by=created_by,
+        )
+        if run_at is not None:
+            job.run_at = run_at
+        self.session.add(job)
+        await self.session.flush()
+        # Delivered on commit
+        await self.session.execute(select(func.pg_notify(JOBS_CHANNEL, kind)))
+        await self.session.commit()
+        return job
+
+    async def get_job(self, job_id: int) -> Optional[Job]:
+        """Get a job by ID, without its output"""
+        return await self.session.get(Job, job_id)
+
+    async def get_job_output(self, job_id: int) -> Optional[Tuple[bytes, str]]:
+        """Get the output of a job and its media type, None if it has none"""
+        row = (await self.session.execute(
+            select(Job.output, Job.output_type).where(Job.id == job_id, Job.output.is_not(None))
+        )).one_or_none()
+        return (row.output, row.output_type) if row else None
+
+    async def claim_job(self, worker: str, kinds: Iterable[str], lease: timedelta) -> Optional[Job]:
+        """
+        Take the next due job of the given kinds and mark it running for `worker`
+
+        Jobs locked by another claim are skipped instead of waited for, so any
+        number of workers can claim at the same time.
+        """
+        next_job = (
+            select(Job.id)
+            .where(Job.status == JobStatus.QUEUED, Job.run_at <= func.now(), Job.kind.in_(list(kinds)))
+            .order_by(Job.priority.desc(), Job.run_at)
+            .limit(1)
+            .with_for_update(skip_locked=True)
+            .scalar_subquery()
+        )
+        query = (
+            update(Job)
+            .where(Job.id == next_job)
+            .values(
+                status=JobStatus.RUNNING,
+                attempts=Job.attempts + 1,
+                locked_by=worker,
+                locked_until=func.now() + lease,
+                started_at=func.now(),
+                error=None,
+            )
+            .returning(Job)
+        )
+        job = await self.session.scalar(query, execution_options={"populate_existing": True})
+        await self.session.commit()
+        return job
+
+    async def report_progress(
+            self, job_id: int, worker: str, lease: timedelta, progress: Optional[float] = None
+    ) -> bool:
+        """Renew the lease of a running job, optionally with its progress; False if the worker lost the job"""
+        values: dict[str, Any] = {"locked_until": func.now() + lease}
+        if progress is not None:
+            values["progress"] = min(max(progress, 0), 1)
+        result = await self.session.execute(
+            update(Job)
+            .where(Job.id == job_id, Job.locked_by == worker, Job.status == JobStatus.RUNNING)
+            .values(**values)
+        )
+        await self.session.commit()
+        return result.rowcount == 1
+
+    async def complete_job(
+            self,
+            job_id: int,
+            worker: str,
+            result: Optional[dict] = None,
+            output: Optional[bytes] = None,
+            output_type: Optional[str] = None,
+    ) -> None:
+        """Mark a running job done, with its result and output file"""
+        await self.session.execute(
+            update(Job)
+            .where(Job.id == job_id, Job.locked_by == worker, Job.status == JobStatus.RUNNING)
+            .values(
+                status=JobStatus.DONE,
+                progress=1,
+                result=result,
+                output=output,
+                output_type=output_type,
+                locked_by=None,
+                locked_until=None,
+                finished_at=func.now(),
+            )
+        )
+        await self.session.commit()
+
+    async def fail_job(self, job_id: int, worker: str, error: str, retry_in: Optional[timedelta]) -> None:
+        """Record a failed attempt: retry the job after `retry_in`, or fail it for good when None"""
+        values: dict[str, Any] = {"error": error, "locked_by": None, "locked_until": None}
+        if retry_in is None:
+            values.update(status=JobStatus.FAILED, finished_at=func.now())
+        else:
+            values.update(status=JobStatus.QUEUED, run_at=func.now() + retry_in)
+        await self.session.execute(
+            update(Job)
+            .where(Job.id == job_id, Job.locked_by == worker, Job.status == JobStatus.RUNNING)
+            .values(**values)
+        )
+        await self.session.commit()
+
+    async def requeue_expired_jobs(self) -> int:
+        """Take back the running jobs whose worker stopped renewing their lease, e.g. because it died"""
+        result = await self.session.execute(
+            update(Job)
+            .where(Job.status == JobStatus.RUNNING, Job.locked_until < func.now())
+            .values(
+                # Plain values would make the CASE text, which Postgres does not assign to the enum column
+                status=case(
+                    (Job.attempts >= Job.max_attempts, literal(JobStatus.FAILED, Job.__table__.c.status.type)),
+                    else_=literal(JobStatus.QUEUED, Job.__table__.c.status.type),
+                ),
+                finished_at=case((Job.attempts >= Job.max_attempts, func.now()), else_=None),
+                error="The worker stopped responding",
+                locked_by=None,
+                locked_until=None,
+            )
+        )
+        await self.session.commit()
+        return result.rowcount
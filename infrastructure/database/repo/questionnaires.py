@@ -1,9 +1,14 @@
-from typing import Optional, List
+from dataclasses import dataclass
+from typing import Optional, List, Iterable, Tuple
 from datetime import datetime
 
-from sqlalchemy import select, update, desc
-from sqlalchemy.orm import joinedload
+from sqlalchemy import select, update, desc, insert, func, tuple_
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlalchemy.orm import aliased, joinedload
 
+from infrastructure.database.invalidation import publish, publish_returning
+from infrastructure.database.live import notify_response
+from infrastructure.database.models.questionnaires import SEARCH_CONFIG
 from infrastructure.database.models import (
     Questionnaire,
     Assignment,
@@ -11,12 +16,19 @@ from infrastructure.database.models import (
     User,
     Group
 )
-from tgbot.keyboards.inline import get_questionnaire_button
-from tgbot.services.broadcaster import send_message
 from .base import BaseRepo
 from infrastructure.database.exceptions import NotFoundError
 
 
+@dataclass
+class GroupAssignmentResult:
+    """Outcome of assigning a questionnaire to one group of a bulk assignment."""
+
+    group_id: int
+    assignment: Optional[Assignment] = None
+    error: Optional[str] = None
+
+
 class QuestionnaireRepo(BaseRepo):
     async def create_questionnaire(
             self,
@@ -45,14 +57,18 @@ class QuestionnaireRepo(BaseRepo):
         if not user:
             raise NotFoundError(f"User with ID {created_by} not found")
 
-        questionnaire = Questionnaire(
-            title=title,
-            description=description,
-            questions=questions,
-            created_by=created_by,
-            is_anonymous=is_anonymous,
-        )
-        self.session.add(questionnaire)
+        # The notification rides on the INSERT instead of costing a statement of its own
+        questionnaire = (await self.session.execute(
+            insert(Questionnaire)
+            .values(
+                title=title,
+                description=description,
+                questions=questions,
+                created_by=created_by,
+                is_anonymous=is_anonymous,
+            )
+            .returning(Questionnaire, publish_returning("questionnaire", Questionnaire.id))
+        )).scalar_one()
         await self.session.commit()
         return questionnaire
 
@@ -61,18 +77,19 @@ class QuestionnaireRepo(BaseRepo):
             questionnaire_id: int,
             group_id: int,
             due_date: datetime,
-            bot: str = None,
-            bot_username: str = None
+            created_by: int,
     ) -> Assignment:
         """
-        Assign questionnaire to a group and notify the group.
+        Assign questionnaire to a group.
+
+        The group is not notified here, see
+        `tgbot.services.notifications.notify_group_about_assignment`.
 
         Args:
             questionnaire_id: ID of the questionnaire to assign.
             group_id: ID of the group to assign the questionnaire to.
             due_date: The deadline for the questionnaire responses.
-            bot: Instance of `aiogram.Bot` to send messages.
-            bot_username: Bot's username for deep link creation.
+            created_by: ID of the user making the assignment.
 
         Returns:
             The created Assignment object.
@@ -84,24 +101,89 @@ class QuestionnaireRepo(BaseRepo):
         if not group.is_active:
             raise ValueError(f"Group with ID {group_id} is inactive and cannot be assigned to")
 
+        questionnaire = await self.session.get(Questionnaire, questionnaire_id)
+        if not questionnaire:
+            raise NotFoundError(f"Questionnaire with ID {questionnaire_id} not found")
+
         # Step 2: Assign the questionnaire
         assignment = Assignment(
             questionnaire_id=questionnaire_id,
             group_id=group_id,
+            start_time=datetime.now(),
             due_date=due_date,
+            created_by=created_by,
         )
         self.session.add(assignment)
+        await self.session.flush()
+        await publish(self.session, "assignment", [assignment.id])
         await self.session.commit()
 
-        # Step 3: Notify the group
-        text = f"📋 A new questionnaire has been assigned to your group!\n\n" \
-               f"Title: {assignment.questionnaire.title}\n" \
-               f"Due Date: {due_date.strftime('%Y-%m-%d %H:%M')}"  # Format as needed
+        return assignment
+
+    async def assign_questionnaire_to_groups(
+            self,
+            questionnaire_id: int,
+            group_ids: Iterable[int],
+            due_date: datetime,
+            created_by: int,
+    ) -> List[GroupAssignmentResult]:
+        """
+        Assign questionnaire to several groups at once.
 
-        button = get_questionnaire_button(assignment_id=assignment.id, bot_username=bot_username)
-        await send_message(bot=bot, user_id=group_id, text=text, reply_markup=button)
+        The groups are validated with one query and the assignments are
+        created with one multi-row insert in one transaction. Unknown and
+        inactive groups are reported and skipped, they do not fail the others.
 
-        return assignment
+        Args:
+            questionnaire_id: ID of the questionnaire to assign.
+            group_ids: IDs of the groups to assign the questionnaire to, duplicates are ignored.
+            due_date: The deadline for the questionnaire responses.
+            created_by: ID of the user making the assignments.
+
+        Raises:
+            NotFoundError: If the questionnaire does not exist.
+
+        Returns:
+            One result per group, in the order of `group_ids`.
+        """
+        questionnaire = await self.session.get(Questionnaire, questionnaire_id)
+        if not questionnaire:
+            raise NotFoundError(f"Questionnaire with ID {questionnaire_id} not found")
+
+        group_ids = list(dict.fromkeys(group_ids))
+        groups = {
+            group.group_id: group
+            for group in await self.session.scalars(select(Group).where(Group.group_id.in_(group_ids)))
+        }
+
+        results = []
+        rows = []
+        start_time = datetime.now()
+        for group_id in group_ids:
+            group = groups.get(group_id)
+            if group is None:
+                results.append(GroupAssignmentResult(group_id, error=f"Group with ID {group_id} not found"))
+            elif not group.is_active:
+                results.append(GroupAssignmentResult(group_id, error=f"Group with ID {group_id} is inactive"))
+            else:
+                results.append(GroupAssignmentResult(group_id))
+                rows.append({
+                    "questionnaire_id": questionnaire_id,
+                    "group_id": group_id,
+                    "start_time": start_time,
+                    "deadline_time": due_date,
+                    "created_by": created_by,
+                })
+
+        if rows:
+            assignments = await self.session.scalars(insert(Assignment).returning(Assignment), rows)
+            by_group = {assignment.group_id: assignment for assignment in assignments}
+            await publish(self.session, "assignment", [assignment.id for assignment in by_group.values()])
+            await self.session.commit()
+            for result in results:
+                result.assignment = by_group.get(result.group_id)
+
+        return results
 
     async def get_active_assignments_for_group(
             self,
@@ -125,14 +207,40 @@ class QuestionnaireRepo(BaseRepo):
             student_id: int,
             answers: dict,
     ) -> Response:
-        """Submit response to questionnaire"""
-        response = Response(
-            assignment_id=assignment_id,
-            student_id=student_id,
-            answers=answers,
-            is_completed=True,
+        """
+        Submit response to questionnaire
+
+        A student has one response per assignment: submitting again, e.g. a
+        double tap or a retried request, replaces the answers of the stored
+        response instead of adding another one. Live subscribers are notified
+        on commit, see `infrastructure.database.live`.
+        """
+        # Evaluated in the snapshot of the statement, i.e. before the upsert
+        stored = aliased(Response)
+        previous_answers = (
+            select(stored.answers)
+            .where(stored.assignment_id == assignment_id, stored.student_id == student_id)
+            .scalar_subquery()
+        )
+        query = (
+            pg_insert(Response)
+            .values(
+                assignment_id=assignment_id,
+                student_id=student_id,
+                answers=answers,
+                is_completed=True,
+            )
         )
-        self.session.add(response)
+        query = query.on_conflict_do_update(
+            index_elements=[Response.assignment_id, Response.student_id],
+            set_={"answers": query.excluded.answers, "is_completed": query.excluded.is_completed},
+        ).returning(Response, previous_answers)
+        response, previous = (
+            await self.session.execute(query, execution_options={"populate_existing": True})
+        ).one()
+        notification = notify_response(assignment_id, answers, previous)
+        if notification is not None:
+            await self.session.execute(notification)
         await self.session.commit()
         return response
 
@@ -170,6 +278,7 @@ class QuestionnaireRepo(BaseRepo):
             .values(is_active=False)
         )
         await self.session.execute(query)
+        await publish(self.session, "assignment", [assignment_id])
         await self.session.commit()
 
     async def get_questionnaire(self, questionnaire_id: int) -> Optional[Questionnaire]:
@@ -209,6 +318,7 @@ class QuestionnaireRepo(BaseRepo):
         questionnaire.questions = questions
         questionnaire.is_anonymous = is_anonymous
 
+        await publish(self.session, "questionnaire", [questionnaire_id])
         await self.session.commit()
         await self.session.refresh(questionnaire)
         return questionnaire
@@ -218,6 +328,7 @@ class QuestionnaireRepo(BaseRepo):
         questionnaire = await self.get_questionnaire(questionnaire_id)
         if questionnaire:
             await self.session.delete(questionnaire)
+            await publish(self.session, "questionnaire", [questionnaire_id])
             await self.session.commit()
             return True
         return False
@@ -240,6 +351,40 @@ class QuestionnaireRepo(BaseRepo):
         result = await self.session.execute(query)
         return result.scalars().all()
 
+    async def search_questionnaires(
+            self,
+            text: str,
+            limit: int = 20,
+            after: Optional[Tuple[float, int]] = None,
+    ) -> List[Tuple[Questionnaire, float]]:
+        """
+        Full-text search over titles, descriptions and question texts
+
+        Served by the GIN index on `questionnaires.search_vector`. Results are
+        ordered by rank, then by ID, and paginated by keyset: pass the
+        (rank, id) of the last result of a page as `after` to get the next one.
+
+        Args:
+            text: The search query in web search syntax: words, "quoted phrases", -excluded, or.
+            limit: Maximum number of results.
+            after: (rank, id) of the last result of the previous page.
+
+        Returns:
+            (questionnaire, rank) pairs, best matches first.
+        """
+        query = func.websearch_to_tsquery(SEARCH_CONFIG, text)
+        rank = func.ts_rank_cd(Questionnaire.search_vector, query).label("rank")
+        statement = (
+            select(Questionnaire, rank)
+            .where(Questionnaire.search_vector.op("@@")(query))
+            .order_by(rank.desc(), Questionnaire.id.desc())
+            .limit(limit)
+        )
+        if after is not None:
+            statement = statement.where(tuple_(rank, Questionnaire.id) < tuple_(*after))
+        result = await self.session.execute(statement)
+        return [(questionnaire, rank) for questionnaire, rank in result]
+
     async def get_group(self, group_id) -> Group:
         """
             Get a group by its ID.
@@ -7,9 +7,12 @@ from infrastructure.database.setup import create_engine
 from infrastructure.database.repo.users import UserRepo
 from infrastructure.database.repo.user_profiles import StudentProfileRepo, MentorProfileRepo, AdminProfileRepo
 from infrastructure.database.repo.groups import GroupRepo
+from infrastructure.database.repo.group_members import GroupMemberRepo
 from infrastructure.database.repo.questionnaires import QuestionnaireRepo
 from infrastructure.database.repo.assignments import AssignmentsRepo
 from infrastructure.database.repo.responses import ResponseRepo
+from infrastructure.database.repo.dashboard import DashboardRepo
+from infrastructure.database.repo.jobs import JobRepo
 
 
 @dataclass
@@ -52,6 +55,11 @@ class RequestsRepo:
         """Group repository for group operations"""
         return GroupRepo(self.session)
     
+    @property
+    def group_members(self) -> GroupMemberRepo:
+        """Group member repository for group membership operations"""
+        return GroupMemberRepo(self.session)
+
     @property
     def assignments(self) -> AssignmentsRepo:
         """Assignment repository for assignment operations."""
@@ -61,6 +69,16 @@ class RequestsRepo:
     def responses(self) -> ResponseRepo:
         """Response repository for response operations."""
         return ResponseRepo(self.session)
+
+    @property
+    def dashboard(self) -> DashboardRepo:
+        """Dashboard repository for summary figures."""
+        return DashboardRepo(self.session)
+
+    @property
+    def jobs(self) -> JobRepo:
+        """Job repository for queuing background work."""
+        return JobRepo(self.session)
     
 
 
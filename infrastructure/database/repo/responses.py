@@ -1,7 +1,111 @@
-from typing import Optional, List
-from sqlalchemy import select, update
-from infrastructure.database.models import Response
+from typing import Any, Dict, Optional, List, Tuple
+from sqlalchemy import case, func, select, true, update, or_
+from sqlalchemy.sql.elements import ColumnElement
+from infrastructure.database.models import Assignment, Response, User
 from .base import BaseRepo
 
 class ResponseRepo(BaseRepo):
-    pass
\ No newline at end of file
+    async def get_assignment_responses(self, assignment_id: int) -> List[Response]:
+        """Get all responses submitted for an assignment"""
+        query = select(Response).where(Response.assignment_id == assignment_id)
+        result = await self.session.execute(query)
+        return result.scalars().all()
+
+    async def get_answer_counts(self, assignment_id: int) -> Tuple[int, Dict[str, Dict[str, int]]]:
+        """
+        Count the completed responses of an assignment and how often each answer was given.
+
+        :return: The number of responses, and the counts of the answers by question index and
+            answer; every picked option of a multi-choice answer counts.
+        """
+        completed = (Response.assignment_id == assignment_id, Response.is_completed == True)
+        responses = await self.session.scalar(select(func.count()).select_from(Response).where(*completed))
+
+        answer = func.jsonb_each(Response.answers).table_valued("key", "value").lateral()
+        value = func.jsonb_array_elements_text(
+            case((func.jsonb_typeof(answer.c.value) == "array", answer.c.value),
+                 else_=func.jsonb_build_array(answer.c.value))
+        ).table_valued("value").lateral()
+        query = (
+            select(answer.c.key, value.c.value, func.count())
+            .select_from(Response)
+            .join(answer, true())
+            .join(value, true())
+            .where(*completed)
+            .group_by(answer.c.key, value.c.value)
+        )
+        counts: Dict[str, Dict[str, int]] = {}
+        for key, answer_value, count in await self.session.execute(query):
+            counts.setdefault(key, {})[answer_value] = count
+        return responses, counts
+
+    async def get_student_responses(self, student_id: int) -> List[Response]:
+        """Get all responses of a student, newest first"""
+        query = (
+            select(Response)
+            .where(Response.student_id == student_id)
+            .order_by(Response.created_at.desc())
+        )
+        result = await self.session.execute(query)
+        return result.scalars().all()
+
+    async def get_responses_by_answer(
+            self,
+            question_index: int,
+            value: Any,
+            assignment_id: Optional[int] = None,
+            questionnaire_id: Optional[int] = None,
+    ) -> List[Response]:
+        """
+        Get responses that gave `value` as the answer to a question.
+
+        The filter runs in Postgres as a JSONB containment check served by
+        the GIN index on `responses.answers`.
+
+        Args:
+            question_index: Zero-based index of the question, as used for the keys of `answers`.
+            value: The answer, e.g. the picked option. Matches single answers and multi-choice lists.
+            assignment_id: Optional assignment to limit the search to.
+            questionnaire_id: Optional questionnaire to limit the search to, across its assignments.
+        """
+        query = self._filter_by_answer(select(Response), question_index, value, assignment_id, questionnaire_id)
+        result = await self.session.execute(query)
+        return result.scalars().all()
+
+    async def get_students_by_answer(
+            self,
+            question_index: int,
+            value: Any,
+            assignment_id: Optional[int] = None,
+            questionnaire_id: Optional[int] = None,
+    ) -> List[User]:
+        """
+        Get students who gave `value` as the answer to a question,
+        e.g. everyone who picked option X in the third question.
+
+        Takes the same arguments as `get_responses_by_answer`.
+        """
+        query = self._filter_by_answer(
+            select(User).join(Response, Response.student_id == User.user_id).distinct(),
+            question_index, value, assignment_id, questionnaire_id,
+        )
+        result = await self.session.execute(query)
+        return result.scalars().all()
+
+    @staticmethod
+    def _answer_matches(question_index: int, value: Any) -> ColumnElement[bool]:
+        key = str(question_index)
+        return or_(
+            Response.answers.contains({key: value}),
+            Response.answers.contains({key: [value]}),
+        )
+
+    def _filter_by_answer(self, query, question_index, value, assignment_id, questionnaire_id):
+        query = query.where(self._answer_matches(question_index, value))
+        if assignment_id is not None:
+            query = query.where(Response.assignment_id == assignment_id)
+        if questionnaire_id is not None:
+            query = query.join(Assignment, Assignment.id == Response.assignment_id).where(
+                Assignment.questionnaire_id == questionnaire_id
+            )
+        return query
@@ -3,6 +3,7 @@ from typing import Optional
 from sqlalchemy.dialects.postgresql import insert
 from sqlalchemy import select
 
+from infrastructure.database.invalidation import publish
 from infrastructure.database.models import User, UserRole
 from infrastructure.api.security.password import verify_password, get_password_hash
 from .base import BaseRepo
@@ -43,6 +44,8 @@ class UserRepo(BaseRepo):
                 ),
             )
             .returning(User)
+            # The row comes back with RETURNING, the session need not stick to the primary
+            .execution_options(stick_to_primary=False)
         )
         result = await self.session.execute(insert_stmt)
         await self.session.commit()
@@ -63,6 +66,7 @@ class UserRepo(BaseRepo):
         user = await self.get_user(user_id)
         if user:
             user.role = role
+            await publish(self.session, "user", [user_id])
             await self.session.commit()
             await self.session.refresh(user)
         return user
@@ -0,0 +1,136 @@
+"""
+Routing of read-only queries to a Postgres replica.
+
+Sessions created by `create_session_pool(engine, replica)` are
+`RoutingSession`s. A SELECT goes to the replica when all of these hold:
+
+- it runs inside a read-only repository method (`get_*`, `list_*`,
+  `search_*`, see `BaseRepo`), or the session was opened for a read-only request (FastAPI GET
+  routes) and it does not run inside a writing repository method;
+- the session has not written anything yet: after a flush or an
+  INSERT/UPDATE/DELETE the session sticks to the primary, so flows reading
+  their own writes, e.g. `save_assignment`, see them;
+- the replica is healthy: `ReplicaState.monitor` checks the replication lag
+  and sends everything to the primary while the lag is over the limit or the
+  replica is unreachable.
+
+Everything else goes to the primary.
+"""
+import asyncio
+import logging
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Iterator, Optional
+
+from sqlalchemy import Select, event, text
+from sqlalchemy.ext.asyncio import AsyncEngine, AsyncSession
+from sqlalchemy.orm import Session
+from sqlalchemy.sql.dml import UpdateBase
+
+REPLICA_KEY = "replica"
+READ_ONLY_KEY = "read_only"
+STICKY_KEY = "primary_only"
+
+# None outside of repository methods, True inside read-only ones, False inside writing ones
+_read_only: ContextVar[Optional[bool]] = ContextVar("read_only_repository_call", default=None)
+
+_LAG_QUERY = text(
+    "SELECT CASE WHEN pg_last_wal_receive_lsn() = pg_last_wal_replay_lsn() THEN 0 "
+    "ELSE coalesce(extract(epoch FROM now() - pg_last_xact_replay_timestamp()), 0) END"
+)
+
+
+class ReplicaState:
+    """
+    A replica engine and whether it is currently fresh enough to read from.
+
+    Example usage:
+        replica = ReplicaState(create_engine(config.db, host=config.db.replica_host), max_lag=5)
+        monitor = asyncio.create_task(replica.monitor())
+    """
+
+    def __init__(self, engine: AsyncEngine, max_lag: float) -> None:
+        self.engine = engine
+        self.max_lag = max_lag
+        self.lag: Optional[float] = None
+        self.healthy = False
+
+    async def check(self) -> bool:
+        """Measure the replication lag and update `healthy`."""
+        try:
+            async with self.engine.connect() as connection:
+                self.lag = float((await connection.execute(_LAG_QUERY)).scalar() or 0)
+            healthy = self.lag <= self.max_lag
+        except Exception as e:
+            self.lag = None
+            healthy = False
+            if self.healthy:
+                logging.warning(f"Replica is unreachable, reading from the primary: {e}")
+
+        if healthy != self.healthy:
+            if healthy:
+                logging.info(f"Replica is healthy (lag {self.lag:.1f} s), routing reads to it")
+            elif self.lag is not None:
+                logging.warning(f"Replica lags {self.lag:.1f} s behind, reading from the primary")
+        self.healthy = healthy
+        return healthy
+
+    async def monitor(self, interval: float = 1.0) -> None:
+        """Run `check` every `interval` seconds, forever."""
+        while True:
+            await self.check()
+            await asyncio.sleep(interval)
+
+    def status(self) -> dict:
+        return {"healthy": self.healthy, "lag_seconds": self.lag, "max_lag_seconds": self.max_lag}
+
+
+class RoutingSession(Session):
+    """Session sending read-only SELECTs to the replica in `info["replica"]`, see the module docstring."""
+
+    def get_bind(self, mapper=None, clause=None, **kw):
+        if isinstance(clause, UpdateBase):
+            if clause.get_execution_options().get("stick_to_primary", True):
+                self.info[STICKY_KEY] = True
+        elif isinstance(clause, Select) and not self._flushing and self._replica_allowed():
+            return self.info[REPLICA_KEY].engine.sync_engine
+        return super().get_bind(mapper=mapper, clause=clause, **kw)
+
+    def _replica_allowed(self) -> bool:
+        replica: Optional[ReplicaState] = self.info.get(REPLICA_KEY)
+        if replica is None or not replica.healthy or self.info.get(STICKY_KEY):
+            return False
+        read_only = _read_only.get()
+        if read_only is None:
+            return bool(self.info.get(READ_ONLY_KEY))
+        return read_only
+
+
+@event.listens_for(RoutingSession, "after_flush")
+def _stick_to_primary(session: Session, flush_context) -> None:
+    session.info[STICKY_KEY] = True
+
+
+@contextmanager
+def repository_call(read_only: bool) -> Iterator[None]:
+    """
+    Mark the queries of a repository method as read-only or not.
+
+    The outermost call decides: reads made by a writing method stay on the primary.
+    """
+    current = _read_only.get()
+    token = _read_only.set(read_only if current is None else current and read_only)
+    try:
+        yield
+    finally:
+        _read_only.reset(token)
+
+
+def prefer_replica(session: AsyncSession) -> None:
+    """Let every read-only query of the session go to the replica, e.g. for GET requests."""
+    session.sync_session.info[READ_ONLY_KEY] = True
+
+
+def use_primary(session: AsyncSession) -> None:
+    """Send every further query of the session to the primary."""
+    session.sync_session.info[STICKY_KEY] = True
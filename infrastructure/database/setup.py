@@ -1,20 +1,119 @@
-from sqlalchemy.ext.asyncio import create_async_engine, async_sessionmaker
+import asyncio
+import logging
+import time
+from typing import Optional
 
+from sqlalchemy import event, text
+from sqlalchemy.ext.asyncio import create_async_engine, async_sessionmaker, AsyncEngine
+
+from infrastructure.database.instrumentation import current_query_stats, redact_parameters
+from infrastructure.database.pool import InstrumentedQueuePool
+from infrastructure.database.routing import ReplicaState, RoutingSession, REPLICA_KEY
 from tgbot.config import DbConfig
 
+slow_query_logger = logging.getLogger("slow_query")
+
 
-def create_engine(db: DbConfig, echo=False):
+def create_engine(db: DbConfig, echo=False, host=None, port=None):
     engine = create_async_engine(
-        db.construct_sqlalchemy_url(),
+        db.construct_sqlalchemy_url(host=host, port=port),
         query_cache_size=1200,
-        pool_size=20,
-        max_overflow=200,
+        poolclass=InstrumentedQueuePool,
+        pool_size=db.pool_size,
+        max_overflow=db.max_overflow,
+        pool_timeout=db.pool_timeout,
+        pool_recycle=db.pool_recycle,
+        pool_pre_ping=db.pool_pre_ping,
         future=True,
         echo=echo,
     )
+    instrument_engine(engine, slow_query_ms=db.slow_query_ms)
     return engine
 
 
-def create_session_pool(engine):
-    session_pool = async_sessionmaker(bind=engine, expire_on_commit=False)
+def instrument_engine(engine: AsyncEngine, slow_query_ms: int = 0) -> None:
+    """
+    Install the cursor hooks that time every statement.
+
+    Each statement is attributed to the unit of work tracked in the current
+    context (see `track_queries`), and statements slower than `slow_query_ms`
+    are written to the "slow_query" log with their parameters redacted.
+    """
+    slow_query_seconds = slow_query_ms / 1000
+
+    def before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        context.query_started = time.perf_counter()
+
+    def after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        elapsed = time.perf_counter() - context.query_started
+        slow = bool(slow_query_seconds) and elapsed >= slow_query_seconds
+        stats = current_query_stats()
+        if stats is not None:
+            stats.record(elapsed, slow=slow)
+
+        if slow:
+            slow_query_logger.warning(
+                "Slow query (%.1f ms) in %s: %s; parameters: %s",
+                elapsed * 1000,
+                stats.label if stats is not None else "background",
+                " ".join(statement.split()),
+                redact_parameters(parameters),
+            )
+
+    event.listen(engine.sync_engine, "before_cursor_execute", before_cursor_execute)
+    event.listen(engine.sync_engine, "after_cursor_execute", after_cursor_execute)
+
+
+def create_replica(db: DbConfig, echo=False) -> Optional[ReplicaState]:
+    """
+    Create the engine of the configured read replica, if any.
+
+    The replica starts as unhealthy; run its `monitor` to route reads to it.
+    """
+    if not db.replica_host:
+        return None
+    engine = create_engine(db, echo=echo, host=db.replica_host, port=db.replica_port)
+    return ReplicaState(engine, max_lag=db.replica_max_lag)
+
+
+def create_session_pool(engine, replica: Optional[ReplicaState] = None):
+    if replica is None:
+        return async_sessionmaker(bind=engine, expire_on_commit=False)
+    session_pool = async_sessionmaker(
+        bind=engine,
+        sync_session_class=RoutingSession,
+        info={REPLICA_KEY: replica},
+        expire_on_commit=False,
+    )
     return session_pool
+
+
+async def warm_up_pool(engine: AsyncEngine, connections: int) -> None:
+    """
+    Open `connections` pooled connections up front and hand them back to the pool.
+
+    The connections stay open in the pool, so the first requests after startup
+    don't pay for connection setup. Fails if the database can't be reached.
+    """
+    if connections <= 0:
+        return
+
+    async def checkout():
+        connection = await engine.connect()
+        try:
+            await connection.execute(text("SELECT 1"))
+        except BaseException:
+            await connection.close()
+            raise
+        return connection
+
+    results = await asyncio.gather(
+        *(checkout() for _ in range(connections)), return_exceptions=True
+    )
+    errors = [result for result in results if isinstance(result, BaseException)]
+    for result in results:
+        if not isinstance(result, BaseException):
+            await result.close()
+
+    if errors:
+        raise errors[0]
@@ -0,0 +1,26 @@
+"""Add is_active column to assignments table
+
+Revision ID: 3b7e1c2d9a41
+Revises: 9965b89278d6
+Create Date: 2026-10-19 10:12:31.118402
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '3b7e1c2d9a41'
+down_revision: Union[str, None] = '9965b89278d6'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.add_column('assignments', sa.Column('is_active', sa.Boolean(), server_default=sa.text('true'), nullable=False))
+
+
+def downgrade() -> None:
+    op.drop_column('assignments', 'is_active')
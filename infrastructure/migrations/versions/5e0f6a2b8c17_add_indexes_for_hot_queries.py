@@ -0,0 +1,60 @@
+"""Add indexes for the hot query paths
+
+Revision ID: 5e0f6a2b8c17
+Revises: 3b7e1c2d9a41
+Create Date: 2026-10-19 14:03:52.640215
+
+The indexes are built CONCURRENTLY, so the tables stay writable while the
+migration runs. CREATE INDEX CONCURRENTLY cannot run inside a transaction,
+hence the autocommit blocks.
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '5e0f6a2b8c17'
+down_revision: Union[str, None] = '3b7e1c2d9a41'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    with op.get_context().autocommit_block():
+        # get_active_assignments_for_group: group_id = ? AND is_active
+        op.create_index('ix_assignments_group_id_active', 'assignments', ['group_id'],
+                        postgresql_where=sa.text('is_active'), postgresql_concurrently=True, if_not_exists=True)
+        # get_active_assignments: is_active, a small share of all assignments
+        op.create_index('ix_assignments_active_deadline', 'assignments', ['deadline_time'],
+                        postgresql_where=sa.text('is_active'), postgresql_concurrently=True, if_not_exists=True)
+        op.create_index('ix_assignments_questionnaire_id', 'assignments', ['questionnaire_id'],
+                        postgresql_concurrently=True, if_not_exists=True)
+        # Responses of an assignment, and whether a student already responded to it
+        op.create_index('ix_responses_assignment_id_student_id', 'responses', ['assignment_id', 'student_id'],
+                        postgresql_concurrently=True, if_not_exists=True)
+        op.create_index('ix_responses_student_id', 'responses', ['student_id'],
+                        postgresql_concurrently=True, if_not_exists=True)
+        # get_questionnaires orders by created_at DESC
+        op.create_index('ix_questionnaires_created_at', 'questionnaires', [sa.text('created_at DESC')],
+                        postgresql_concurrently=True, if_not_exists=True)
+        # authenticate_user looks users up by username
+        op.create_index('ix_users_username', 'users', ['username'],
+                        postgresql_where=sa.text('username IS NOT NULL'), postgresql_concurrently=True,
+                        if_not_exists=True)
+
+
+def downgrade() -> None:
+    with op.get_context().autocommit_block():
+        for table, index in [
+            ('users', 'ix_users_username'),
+            ('questionnaires', 'ix_questionnaires_created_at'),
+            ('responses', 'ix_responses_student_id'),
+            ('responses', 'ix_responses_assignment_id_student_id'),
+            ('assignments', 'ix_assignments_questionnaire_id'),
+            ('assignments', 'ix_assignments_active_deadline'),
+            ('assignments', 'ix_assignments_group_id_active'),
+        ]:
+            op.drop_index(index, table_name=table, postgresql_concurrently=True, if_exists=True)
@@ -0,0 +1,49 @@
+"""Use JSONB for questions, answers and schedule dates
+
+Revision ID: 7a9c3e5d1f02
+Revises: 5e0f6a2b8c17
+Create Date: 2026-10-19 16:21:07.354980
+
+Changing the column type rewrites the tables under an exclusive lock, run it
+in a maintenance window on large databases. The GIN index on the answers is
+then built CONCURRENTLY.
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+
+# revision identifiers, used by Alembic.
+revision: str = '7a9c3e5d1f02'
+down_revision: Union[str, None] = '5e0f6a2b8c17'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+COLUMNS = [
+    ('questionnaires', 'questions', False),
+    ('responses', 'answers', False),
+    ('schedules', 'specific_dates', True),
+]
+
+
+def upgrade() -> None:
+    for table, column, nullable in COLUMNS:
+        op.alter_column(table, column, type_=postgresql.JSONB(), existing_type=sa.JSON(),
+                        existing_nullable=nullable, postgresql_using=f'{column}::jsonb')
+
+    with op.get_context().autocommit_block():
+        op.create_index('ix_responses_answers', 'responses', ['answers'], postgresql_using='gin',
+                        postgresql_ops={'answers': 'jsonb_path_ops'}, postgresql_concurrently=True,
+                        if_not_exists=True)
+
+
+def downgrade() -> None:
+    with op.get_context().autocommit_block():
+        op.drop_index('ix_responses_answers', table_name='responses', postgresql_concurrently=True, if_exists=True)
+
+    for table, column, nullable in COLUMNS:
+        op.alter_column(table, column, type_=sa.JSON(), existing_type=postgresql.JSONB(),
+                        existing_nullable=nullable, postgresql_using=f'{column}::json')
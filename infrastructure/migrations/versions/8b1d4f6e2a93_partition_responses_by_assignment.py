@@ -0,0 +1,119 @@
+"""Partition responses by assignment_id ranges
+
+Revision ID: 8b1d4f6e2a93
+Revises: 7a9c3e5d1f02
+Create Date: 2026-10-19 18:40:12.905113
+
+`responses` becomes a table partitioned by RANGE (assignment_id), one
+partition per 10 000 assignments. Assignment ids grow over time, so old
+partitions hold old data and can be detached as a whole.
+
+The existing table is not copied: it is attached as the `responses_legacy`
+partition for all assignment ids below the first new boundary, which only
+needs a scan to validate the range check and a rebuild of its primary key
+on (id, assignment_id). Its other indexes are renamed and adopted by the
+partitioned indexes. Future partitions are created by
+`infrastructure.database.partitions.ensure_response_partitions`.
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+
+# revision identifiers, used by Alembic.
+revision: str = '8b1d4f6e2a93'
+down_revision: Union[str, None] = '7a9c3e5d1f02'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+# Keep in sync with infrastructure.database.partitions.RESPONSES_PARTITION_SIZE
+PARTITION_SIZE = 10_000
+PARTITIONS_AHEAD = 2
+
+LEGACY_INDEXES = [
+    ('responses_pkey', 'responses_legacy_pkey'),
+    ('ix_responses_assignment_id_student_id', 'responses_legacy_assignment_id_student_id_idx'),
+    ('ix_responses_student_id', 'responses_legacy_student_id_idx'),
+    ('ix_responses_answers', 'responses_legacy_answers_idx'),
+]
+
+
+def upgrade() -> None:
+    max_assignment_id = op.get_bind().execute(sa.text('SELECT coalesce(max(id), 0) FROM assignments')).scalar()
+    boundary = (max_assignment_id // PARTITION_SIZE + 1) * PARTITION_SIZE
+
+    op.execute('ALTER TABLE responses RENAME TO responses_legacy')
+    for old_name, new_name in LEGACY_INDEXES:
+        op.execute(f'ALTER INDEX {old_name} RENAME TO {new_name}')
+
+    op.execute("""
+        CREATE TABLE responses (
+            id integer NOT NULL DEFAULT nextval('responses_id_seq'),
+            assignment_id bigint NOT NULL REFERENCES assignments (id),
+            student_id bigint NOT NULL REFERENCES users (user_id),
+            answers jsonb NOT NULL,
+            is_completed boolean NOT NULL,
+            created_at timestamp without time zone NOT NULL DEFAULT now(),
+            CONSTRAINT responses_pkey PRIMARY KEY (id, assignment_id)
+        ) PARTITION BY RANGE (assignment_id)
+    """)
+    op.execute('ALTER SEQUENCE responses_id_seq OWNED BY responses.id')
+
+    # A partition needs the primary key of the parent, which must include the partition key
+    op.execute('ALTER TABLE responses_legacy DROP CONSTRAINT responses_legacy_pkey')
+    op.execute('ALTER TABLE responses_legacy ADD CONSTRAINT responses_legacy_pkey PRIMARY KEY (id, assignment_id)')
+
+    # The check constraint lets ATTACH PARTITION skip its own validation scan
+    op.execute(f'ALTER TABLE responses_legacy ADD CONSTRAINT responses_legacy_range '
+               f'CHECK (assignment_id < {boundary}) NOT VALID')
+    op.execute('ALTER TABLE responses_legacy VALIDATE CONSTRAINT responses_legacy_range')
+    op.execute(f'ALTER TABLE responses ATTACH PARTITION responses_legacy FOR VALUES FROM (MINVALUE) TO ({boundary})')
+    op.execute('ALTER TABLE responses_legacy DROP CONSTRAINT responses_legacy_range')
+
+    for lower in range(boundary, boundary + PARTITION_SIZE * PARTITIONS_AHEAD, PARTITION_SIZE):
+        upper = lower + PARTITION_SIZE
+        op.execute(f'CREATE TABLE responses_{lower}_{upper} PARTITION OF responses FOR VALUES FROM ({lower}) TO ({upper})')
+
+    # Equivalent indexes of responses_legacy are attached instead of being rebuilt
+    op.create_index('ix_responses_assignment_id_student_id', 'responses', ['assignment_id', 'student_id'])
+    op.create_index('ix_responses_student_id', 'responses', ['student_id'])
+    op.create_index('ix_responses_answers', 'responses', ['answers'], postgresql_using='gin',
+                    postgresql_ops={'answers': 'jsonb_path_ops'})
+
+
+def downgrade() -> None:
+    # Back to a plain table keyed by id alone: responses_legacy is detached from the parent and gets its
+    # primary key back, then the rows of all partitions are copied into a new table
+    op.execute('ALTER TABLE responses DETACH PARTITION responses_legacy')
+    op.execute('ALTER TABLE responses_legacy DROP CONSTRAINT responses_legacy_pkey')
+    op.execute('ALTER TABLE responses_legacy ADD CONSTRAINT responses_legacy_pkey PRIMARY KEY (id)')
+    op.execute('ALTER TABLE responses RENAME TO responses_partitioned')
+    op.execute('ALTER INDEX responses_pkey RENAME TO responses_partitioned_pkey')
+    for name in ('ix_responses_assignment_id_student_id', 'ix_responses_student_id', 'ix_responses_answers'):
+        op.execute(f'ALTER INDEX {name} RENAME TO {name}_partitioned')
+
+    op.create_table('responses',
+    sa.Column('id', sa.Integer(), server_default=sa.text("nextval('responses_id_seq')"), nullable=False),
+    sa.Column('assignment_id', sa.BigInteger(), nullable=False),
+    sa.Column('student_id', sa.BIGINT(), nullable=False),
+    sa.Column('answers', postgresql.JSONB(), nullable=False),
+    sa.Column('is_completed', sa.Boolean(), nullable=False),
+    sa.Column('created_at', postgresql.TIMESTAMP(), server_default=sa.text('now()'), nullable=False),
+    sa.ForeignKeyConstraint(['assignment_id'], ['assignments.id'], ),
+    sa.ForeignKeyConstraint(['student_id'], ['users.user_id'], ),
+    sa.PrimaryKeyConstraint('id')
+    )
+    for source in ('responses_legacy', 'responses_partitioned'):
+        op.execute('INSERT INTO responses SELECT id, assignment_id, student_id, answers, is_completed, created_at '
+                   f'FROM {source}')
+    op.execute('ALTER SEQUENCE responses_id_seq OWNED BY responses.id')
+    op.execute('DROP TABLE responses_partitioned')
+    op.execute('DROP TABLE responses_legacy')
+
+    op.create_index('ix_responses_assignment_id_student_id', 'responses', ['assignment_id', 'student_id'])
+    op.create_index('ix_responses_student_id', 'responses', ['student_id'])
+    op.create_index('ix_responses_answers', 'responses', ['answers'], postgresql_using='gin',
+                    postgresql_ops={'answers': 'jsonb_path_ops'})
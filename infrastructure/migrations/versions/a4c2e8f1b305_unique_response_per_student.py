@@ -0,0 +1,56 @@
+"""Allow one response per student and assignment
+
+Revision ID: a4c2e8f1b305
+Revises: 8b1d4f6e2a93
+Create Date: 2026-10-19 21:12:37.418260
+
+Duplicate responses (double taps, retried requests) are removed, keeping the
+newest one, and a unique index on (assignment_id, student_id) replaces the
+plain one, so `submit_response` can upsert with ON CONFLICT.
+
+A partitioned index cannot be built CONCURRENTLY: the index is created on the
+parent only, built CONCURRENTLY on every partition and attached partition by
+partition. It becomes valid when the last partition is attached.
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'a4c2e8f1b305'
+down_revision: Union[str, None] = '8b1d4f6e2a93'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+INDEX = 'uq_responses_assignment_id_student_id'
+
+
+def upgrade() -> None:
+    op.execute("""
+        DELETE FROM responses older USING responses newer
+        WHERE older.assignment_id = newer.assignment_id
+          AND older.student_id = newer.student_id
+          AND older.id < newer.id
+    """)
+    op.execute(f'CREATE UNIQUE INDEX IF NOT EXISTS {INDEX} ON ONLY responses (assignment_id, student_id)')
+    partitions = op.get_bind().execute(sa.text(
+        "SELECT c.relname FROM pg_inherits i JOIN pg_class c ON c.oid = i.inhrelid "
+        "WHERE i.inhparent = 'responses'::regclass"
+    )).scalars().all()
+
+    with op.get_context().autocommit_block():
+        for partition in partitions:
+            op.execute(f'CREATE UNIQUE INDEX CONCURRENTLY IF NOT EXISTS {partition}_assignment_id_student_id_key '
+                       f'ON {partition} (assignment_id, student_id)')
+            op.execute(f'ALTER INDEX {INDEX} ATTACH PARTITION {partition}_assignment_id_student_id_key')
+
+    # The unique index serves the same lookups
+    op.drop_index('ix_responses_assignment_id_student_id', table_name='responses')
+
+
+def downgrade() -> None:
+    op.create_index('ix_responses_assignment_id_student_id', 'responses', ['assignment_id', 'student_id'])
+    op.drop_index(INDEX, table_name='responses')
@@ -0,0 +1,34 @@
+"""Add group_members table
+
+Revision ID: b6e3f9a2c418
+Revises: a4c2e8f1b305
+Create Date: 2026-10-19 22:31:05.274916
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'b6e3f9a2c418'
+down_revision: Union[str, None] = 'a4c2e8f1b305'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_table('group_members',
+    sa.Column('group_id', sa.BigInteger(), nullable=False),
+    sa.Column('user_id', sa.BigInteger(), nullable=False),
+    sa.Column('is_member', sa.Boolean(), server_default=sa.text('true'), nullable=False),
+    sa.Column('updated_at', postgresql.TIMESTAMP(), server_default=sa.text('now()'), nullable=False),
+    sa.ForeignKeyConstraint(['group_id'], ['groups.group_id'], ),
+    sa.PrimaryKeyConstraint('group_id', 'user_id')
+    )
+
+
+def downgrade() -> None:
+    op.drop_table('group_members')
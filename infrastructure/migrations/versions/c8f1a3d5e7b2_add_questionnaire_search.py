@@ -0,0 +1,46 @@
+"""Add full-text search over questionnaires
+
+Revision ID: c8f1a3d5e7b2
+Revises: b6e3f9a2c418
+Create Date: 2026-10-19 23:18:44.602187
+
+Adding a stored generated column rewrites `questionnaires` under an
+exclusive lock; the table holds templates only, so this takes moments.
+The GIN index is built CONCURRENTLY.
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'c8f1a3d5e7b2'
+down_revision: Union[str, None] = 'b6e3f9a2c418'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+# Keep in sync with infrastructure.database.models.questionnaires.SEARCH_VECTOR
+SEARCH_VECTOR = (
+    "setweight(to_tsvector('simple', coalesce(title, '')), 'A') || "
+    "setweight(to_tsvector('simple', coalesce(description, '')), 'B') || "
+    "setweight(jsonb_to_tsvector('simple', "
+    "jsonb_path_query_array(questions, '$[*].text') || "
+    "jsonb_path_query_array(questions, '$[*].question'), '[\"string\"]'), 'C')"
+)
+
+
+def upgrade() -> None:
+    op.add_column('questionnaires', sa.Column(
+        'search_vector', postgresql.TSVECTOR(), sa.Computed(SEARCH_VECTOR, persisted=True), nullable=True
+    ))
+    with op.get_context().autocommit_block():
+        op.create_index('ix_questionnaires_search_vector', 'questionnaires', ['search_vector'],
+                        postgresql_using='gin', postgresql_concurrently=True, if_not_exists=True)
+
+
+def downgrade() -> None:
+    op.drop_index('ix_questionnaires_search_vector', table_name='questionnaires')
+    op.drop_column('questionnaires', 'search_vector')
@@ -0,0 +1,56 @@
+"""Add jobs table
+
+Revision ID: d2a7b9c4e6f1
+Revises: c8f1a3d5e7b2
+Create Date: 2026-10-20 00:42:17.508311
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'd2a7b9c4e6f1'
+down_revision: Union[str, None] = 'c8f1a3d5e7b2'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_table('jobs',
+    sa.Column('id', sa.BigInteger(), nullable=False),
+    sa.Column('kind', sa.String(length=50), nullable=False),
+    sa.Column('payload', postgresql.JSONB(astext_type=sa.Text()), nullable=False),
+    sa.Column('status', sa.Enum('QUEUED', 'RUNNING', 'DONE', 'FAILED', name='job_status_enum'), nullable=False),
+    sa.Column('priority', sa.Integer(), server_default=sa.text('0'), nullable=False),
+    sa.Column('attempts', sa.Integer(), server_default=sa.text('0'), nullable=False),
+    sa.Column('max_attempts', sa.Integer(), server_default=sa.text('5'), nullable=False),
+    sa.Column('run_at', postgresql.TIMESTAMP(), server_default=sa.text('now()'), nullable=False),
+    sa.Column('locked_by', sa.String(length=100), nullable=True),
+    sa.Column('locked_until', postgresql.TIMESTAMP(), nullable=True),
+    sa.Column('progress', sa.Float(), server_default=sa.text('0'), nullable=False),
+    sa.Column('result', postgresql.JSONB(astext_type=sa.Text()), nullable=True),
+    sa.Column('output', sa.LargeBinary(), nullable=True),
+    sa.Column('output_type', sa.String(length=100), nullable=True),
+    sa.Column('error', sa.Text(), nullable=True),
+    sa.Column('created_by', sa.BigInteger(), nullable=True),
+    sa.Column('started_at', postgresql.TIMESTAMP(), nullable=True),
+    sa.Column('finished_at', postgresql.TIMESTAMP(), nullable=True),
+    sa.Column('created_at', postgresql.TIMESTAMP(), server_default=sa.text('now()'), nullable=False),
+    sa.ForeignKeyConstraint(['created_by'], ['users.user_id'], ),
+    sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index('ix_jobs_queue', 'jobs', [sa.text('priority DESC'), 'run_at'], unique=False,
+                    postgresql_where=sa.text("status = 'QUEUED'"))
+    op.create_index('ix_jobs_running_locked_until', 'jobs', ['locked_until'], unique=False,
+                    postgresql_where=sa.text("status = 'RUNNING'"))
+
+
+def downgrade() -> None:
+    op.drop_index('ix_jobs_running_locked_until', table_name='jobs')
+    op.drop_index('ix_jobs_queue', table_name='jobs')
+    op.drop_table('jobs')
+    sa.Enum(name='job_status_enum').drop(op.get_bind())
@@ -0,0 +1,45 @@
+"""Index responses by created_at
+
+Revision ID: e3b8c0d5f7a2
+Revises: d2a7b9c4e6f1
+Create Date: 2026-10-20 10:14:52.306127
+
+The dashboard counts the responses of the last 24 hours; without an index
+on created_at that count reads every partition of `responses`.
+
+Like the unique index of a4c2e8f1b305, the index is created on the parent
+only, built CONCURRENTLY on every partition and attached partition by
+partition.
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'e3b8c0d5f7a2'
+down_revision: Union[str, None] = 'd2a7b9c4e6f1'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+INDEX = 'ix_responses_created_at'
+
+
+def upgrade() -> None:
+    op.execute(f'CREATE INDEX IF NOT EXISTS {INDEX} ON ONLY responses (created_at)')
+    partitions = op.get_bind().execute(sa.text(
+        "SELECT c.relname FROM pg_inherits i JOIN pg_class c ON c.oid = i.inhrelid "
+        "WHERE i.inhparent = 'responses'::regclass"
+    )).scalars().all()
+
+    with op.get_context().autocommit_block():
+        for partition in partitions:
+            op.execute(f'CREATE INDEX CONCURRENTLY IF NOT EXISTS {partition}_created_at_idx '
+                       f'ON {partition} (created_at)')
+            op.execute(f'ALTER INDEX {INDEX} ATTACH PARTITION {partition}_created_at_idx')
+
+
+def downgrade() -> None:
+    op.drop_index(INDEX, table_name='responses')
@@ -0,0 +1,410 @@
+"""
+Worker running the background jobs queued in the `jobs` table.
+
+Routes and bot commands queue heavy work with `JobRepo.enqueue` and answer
+right away with the job ID; `GET /jobs/{id}` and `/job <id>` show its status.
+Any number of workers can run, on any hosts: each claims the next due job
+with `FOR UPDATE SKIP LOCKED`, so a job is given to exactly one of them and
+they never wait for each other.
+
+A claimed job is leased to its worker, which renews the lease while the job
+runs. The job of a worker that died is queued again once its lease expired.
+A failed attempt is retried with an exponential backoff until the job made
+`max_attempts` attempts; handlers raise `JobError` for failures that retrying
+cannot fix.
+
+Workers are woken up by a NOTIFY when a job is queued and also look for due
+jobs every `POLL_INTERVAL` seconds, e.g. for retries.
+
+Usage:
+    python -m infrastructure.worker --concurrency 4
+    python -m infrastructure.worker --kinds export_bundle
+"""
+import argparse
+import asyncio
+import logging
+import os
+import signal
+import socket
+from contextlib import suppress
+from dataclasses import dataclass
+from datetime import datetime, timedelta
+from typing import Any, Awaitable, Callable, Dict, Iterable, Optional
+
+from aiogram import Bot
+from aiogram.types import BufferedInputFile
+from sqlalchemy import func, select
+from sqlalchemy.ext.asyncio import async_sessionmaker
+
+from infrastructure.database.bundles import FORMATS, MEDIA_TYPES, encode_record, export_records
+from infrastructure.database.listener import PgListener
+from infrastructure.database.models import Job, JobKind, Questionnaire
+from infrastructure.database.repo.requests import RequestsRepo
+from infrastructure.database.repo.jobs import JOBS_CHANNEL
+from infrastructure.database.setup import create_engine, create_session_pool
+from tgbot.config import Config, get_config
+from tgbot.services.broadcaster import send_message
+from tgbot.services.notifications import notify_groups_about_assignments, remind_non_responders
+from tgbot.services.session import create_bot_session
+
+# A job is given to another worker when its worker did not renew the lease for this long
+LEASE = timedelta(minutes=2)
+POLL_INTERVAL = 5
+# Running jobs with an expired lease are looked for this often
+REQUEUE_INTERVAL = 60
+RETRY_BASE_DELAY = 10
+RETRY_MAX_DELAY = 3600
+# Progress is written at most this often
+PROGRESS_INTERVAL = 1
+# On shutdown running jobs get this long to finish, then they are cancelled and queued again
+SHUTDOWN_TIMEOUT = 30
+
+Handler = Callable[["JobContext"], Awaitable[Optional[Dict[str, Any]]]]
+
+HANDLERS: Dict[str, Handler] = {}
+
+
+class JobError(Exception):
+    """A failure retrying the job cannot fix, the job fails right away."""
+
+
+class JobLost(Exception):
+    """The lease expired and the job was queued again, e.g. after a long database outage."""
+
+
+def job_handler(kind: str):
+    """Register the decorated coroutine as the handler of `kind` jobs; it returns the JSON result of the job."""
+
+    def decorator(handler: Handler) -> Handler:
+        HANDLERS[kind] = handler
+        return handler
+
+    return decorator
+
+
+def retry_delay(attempts: int) -> timedelta:
+    """Backoff before the next attempt of a job that made `attempts` attempts."""
+    return timedelta(seconds=min(RETRY_BASE_DELAY * 2 ** (attempts - 1), RETRY_MAX_DELAY))
+
+
+@dataclass
+class JobContext:
+    job: Job
+    worker: "Worker"
+    output: Optional[bytes] = None
+    output_type: Optional[str] = None
+    _progress_at: float = 0
+
+    @property
+    def payload(self) -> Dict[str, Any]:
+        return self.job.payload
+
+    @property
+    def bot(self) -> Bot:
+        return self.worker.bot
+
+    @property
+    def session_pool(self) -> async_sessionmaker:
+        return self.worker.session_pool
+
+    async def progress(self, progress: float) -> None:
+        """Report the share of the work done, from 0 to 1."""
+        now = asyncio.get_running_loop().time()
+        if now - self._progress_at < PROGRESS_INTERVAL:
+            return
+        self._progress_at = now
+        await self.worker.renew(self.job.id, progress)
+
+    async def report(self, text: str) -> None:
+        """Tell the chat the job was queued from, if any, how it went."""
+        chat_id = self.payload.get("chat_id")
+        if chat_id:
+            await send_message(self.bot, chat_id, text)
+
+
+class Worker:
+    def __init__(
+            self,
+            config: Config,
+            session_pool: async_sessionmaker,
+            bot: Bot,
+            kinds: Iterable[str],
+            concurrency: int = 1,
+    ) -> None:
+        self.config = config
+        self.session_pool = session_pool
+        self.bot = bot
+        self.kinds = list(kinds)
+        self.name = f"{socket.gethostname()}:{os.getpid()}"
+        self._slots = asyncio.Semaphore(concurrency)
+        self._wakeup = asyncio.Event()
+        self._stopping = asyncio.Event()
+        self._running: set[asyncio.Task] = set()
+        self._bot_username: Optional[str] = None
+
+    def attach(self, listener: PgListener) -> None:
+        listener.listen(JOBS_CHANNEL, self._on_queued)
+        # Jobs queued while disconnected are found by polling, but sooner is better
+        listener.on_reconnect(self._wakeup.set)
+
+    def _on_queued(self, kind: str) -> None:
+        if kind in self.kinds:
+            self._wakeup.set()
+
+    def stop(self) -> None:
+        """Stop claiming jobs; the running jobs get `SHUTDOWN_TIMEOUT` seconds, then are cancelled and queued again."""
+        self._stopping.set()
+        self._wakeup.set()
+
+    async def bot_username(self) -> str:
+        if self._bot_username is None:
+            self._bot_username = (await self.bot.me()).username
+        return self._bot_username
+
+    async def renew(self, job_id: int, progress: Optional[float] = None) -> None:
+        async with self.session_pool() as session:
+            if not await RequestsRepo(session).jobs.report_progress(job_id, self.name, LEASE, progress):
+                raise JobLost(f"Job {job_id} is no longer leased to {self.name}")
+
+    async def _claim(self) -> Optional[Job]:
+        async with self.session_pool() as session:
+            return await RequestsRepo(session).jobs.claim_job(self.name, self.kinds, LEASE)
+
+    async def _heartbeat(self, job_id: int, task: asyncio.Task) -> None:
+        while True:
+            await asyncio.sleep(LEASE.total_seconds() / 3)
+            try:
+                await self.renew(job_id)
+            except JobLost:
+                logging.warning(f"Job {job_id} was taken back, cancelling it")
+                task.cancel()
+                return
+            except Exception:
+                logging.exception(f"Failed to renew the lease of job {job_id}")
+
+    async def _execute(self, job: Job) -> None:
+        context = JobContext(job, self)
+        task = asyncio.current_task()
+        heartbeat = asyncio.create_task(self._heartbeat(job.id, task))
+        logging.info(f"Running job {job.id} ({job.kind}), attempt {job.attempts} of {job.max_attempts}")
+        try:
+            result = await HANDLERS[job.kind](context)
+        except asyncio.CancelledError:
+            if not self._stopping.is_set():
+                return
+            # Shutting down: give the job back right away instead of waiting for the lease to expire
+            retry = timedelta(0) if job.attempts < job.max_attempts else None
+            await self._fail(job, "The worker stopped", retry)
+            raise
+        except JobLost:
+            return
+        except JobError as e:
+            await self._fail(job, str(e), None)
+        except Exception as e:
+            logging.exception(f"Job {job.id} ({job.kind}) failed")
+            retry = retry_delay(job.attempts) if job.attempts < job.max_attempts else None
+            await self._fail(job, f"{type(e).__name__}: {e}", retry)
+        else:
+            async with self.session_pool() as session:
+                await RequestsRepo(session).jobs.complete_job(
+                    job.id, self.name, result, context.output, context.output_type
+                )
+            logging.info(f"Job {job.id} ({job.kind}) done")
+        finally:
+            heartbeat.cancel()
+
+    async def _fail(self, job: Job, error: str, retry_in: Optional[timedelta]) -> None:
+        async with self.session_pool() as session:
+            await RequestsRepo(session).jobs.fail_job(job.id, self.name, error, retry_in)
+
+    async def _requeue_expired(self) -> None:
+        while True:
+            try:
+                async with self.session_pool() as session:
+                    requeued = await RequestsRepo(session).jobs.requeue_expired_jobs()
+                if requeued:
+                    logging.warning(f"Took back {requeued} job(s) of workers that stopped responding")
+            except Exception:
+                logging.exception("Failed to take back expired jobs")
+            await asyncio.sleep(REQUEUE_INTERVAL)
+
+    async def _acquire_slot(self) -> bool:
+        """Wait for a free slot; False when the worker is stopped first."""
+        acquire = asyncio.create_task(self._slots.acquire())
+        stopping = asyncio.create_task(self._stopping.wait())
+        await asyncio.wait({acquire, stopping}, return_when=asyncio.FIRST_COMPLETED)
+        stopping.cancel()
+        if not acquire.done():
+            acquire.cancel()
+            with suppress(asyncio.CancelledError):
+                await acquire
+        if acquire.cancelled():
+            return False
+        if self._stopping.is_set():
+            self._slots.release()
+            return False
+        return True
+
+    async def _shutdown(self) -> None:
+        """Let the running jobs finish for a while, then cancel the rest, which gives them back to the queue."""
+        # Also when run() itself is cancelled, so that the cancelled jobs are given back
+        self._stopping.set()
+        if not self._running:
+            return
+        logging.info(f"Waiting up to {SHUTDOWN_TIMEOUT} s for {len(self._running)} running job(s)")
+        _, pending = await asyncio.wait(set(self._running), timeout=SHUTDOWN_TIMEOUT)
+        if not pending:
+            return
+        logging.warning(f"Cancelling {len(pending)} job(s) still running")
+        for task in pending:
+            task.cancel()
+        _, pending = await asyncio.wait(pending, timeout=SHUTDOWN_TIMEOUT)
+        if pending:
+            logging.error(f"{len(pending)} job(s) did not stop, they are taken back when their lease expires")
+
+    async def run(self) -> None:
+        logging.info(f"Worker {self.name} running {', '.join(self.kinds)}")
+        requeuer = asyncio.create_task(self._requeue_expired())
+        try:
+            while await self._acquire_slot():
+                try:
+                    job = await self._claim()
+                except Exception:
+                    logging.exception("Failed to claim a job")
+                    job = None
+                if job is None:
+                    self._slots.release()
+                    self._wakeup.clear()
+                    with suppress(asyncio.TimeoutError):
+                        await asyncio.wait_for(self._wakeup.wait(), POLL_INTERVAL)
+                    continue
+
+                task = asyncio.create_task(self._execute(job))
+                self._running.add(task)
+                task.add_done_callback(self._running.discard)
+                task.add_done_callback(lambda _: self._slots.release())
+        finally:
+            requeuer.cancel()
+            await self._shutdown()
+
+
+@job_handler(JobKind.EXPORT_BUNDLE)
+async def export_bundle_job(context: JobContext) -> Dict[str, Any]:
+    """Export the catalog as a bundle file: payload {"format": "ndjson" | "yaml", "chat_id": optional}."""
+    fmt = context.payload.get("format", "ndjson")
+    if fmt not in FORMATS:
+        raise JobError(f"Unknown bundle format {fmt}")
+
+    async with context.session_pool() as session:
+        # Progress counts the questionnaires, the schedules after them are few
+        total = await session.scalar(select(func.count()).select_from(Questionnaire))
+        chunks = []
+        records = 0
+        async for record in export_records(session):
+            chunks.append(encode_record(record, fmt))
+            records += 1
+            await context.progress(records / max(total, 1))
+
+    context.output = "".join(chunks).encode()
+    context.output_type = MEDIA_TYPES[fmt]
+
+    chat_id = context.payload.get("chat_id")
+    if chat_id:
+        await context.bot.send_document(
+            chat_id, BufferedInputFile(context.output, filename=f"questionnaires.{fmt}")
+        )
+    return {"format": fmt, "records": records, "size": len(context.output)}
+
+
+@job_handler(JobKind.ASSIGN_BULK)
+async def assign_bulk_job(context: JobContext) -> Dict[str, Any]:
+    """
+    Assign a questionnaire to many groups and announce it:
+    payload {"questionnaire_id", "group_ids", "due_date" (ISO), "created_by"}.
+
+    Assigning again would duplicate the assignments, so these jobs are queued with one attempt.
+    """
+    payload = context.payload
+    async with context.session_pool() as session:
+        repo = RequestsRepo(session)
+        questionnaire = await repo.questionnaires.get_questionnaire(payload["questionnaire_id"])
+        if questionnaire is None:
+            raise JobError(f"Questionnaire {payload['questionnaire_id']} not found")
+        results = await repo.questionnaires.assign_questionnaire_to_groups(
+            questionnaire_id=questionnaire.id,
+            group_ids=payload["group_ids"],
+            due_date=datetime.fromisoformat(payload["due_date"]),
+            created_by=payload.get("created_by"),
+        )
+    await context.progress(0.5)
+
+    assignments = [result.assignment for result in results if result.assignment]
+    notified = await notify_groups_about_assignments(
+        context.bot, assignments, questionnaire, bot_username=await context.worker.bot_username()
+    )
+    return {
+        "assigned": len(assignments),
+        "failed": len(results) - len(assignments),
+        "groups": [
+            {
+                "group_id": result.group_id,
+                "status": "assigned" if result.assignment else "failed",
+                "assignment_id": result.assignment.id if result.assignment else None,
+                "notified": notified.get(result.group_id, False),
+                "error": result.error,
+            }
+            for result in results
+        ]
+    }
+
+
+@job_handler(JobKind.REMIND_NON_RESPONDERS)
+async def remind_non_responders_job(context: JobContext) -> Dict[str, Any]:
+    """Remind the students who did not answer an assignment: payload {"assignment_id", "chat_id": optional}."""
+    assignment_id = context.payload["assignment_id"]
+    async with context.session_pool() as session:
+        repo = RequestsRepo(session)
+        assignment = await repo.questionnaires.get_assignment(assignment_id)
+        if assignment is None:
+            raise JobError(f"Assignment {assignment_id} not found")
+        user_ids = await repo.group_members.get_non_responders(assignment_id)
+
+    delivered = await remind_non_responders(
+        context.bot, assignment, user_ids, bot_username=await context.worker.bot_username()
+    ) if user_ids else 0
+    await context.report(f"✅ Reminded {delivered} of {len(user_ids)} student(s) about assignment {assignment_id}.")
+    return {"non_responders": len(user_ids), "reminded": delivered}
+
+
+async def main(kinds: Iterable[str], concurrency: int) -> None:
+    config = get_config()
+    engine = create_engine(config.db)
+    session_pool = create_session_pool(engine)
+    bot = Bot(token=config.tg_bot.token, session=create_bot_session(config.tg_bot))
+
+    worker = Worker(config, session_pool, bot, kinds, concurrency)
+    listener = PgListener(config.db)
+    worker.attach(listener)
+    listener_task = asyncio.create_task(listener.run())
+
+    loop = asyncio.get_running_loop()
+    for signum in (signal.SIGINT, signal.SIGTERM):
+        loop.add_signal_handler(signum, worker.stop)
+    try:
+        await worker.run()
+    finally:
+        listener_task.cancel()
+        with suppress(asyncio.CancelledError):
+            await listener_task
+        await bot.session.close()
+        await engine.dispose()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Run background jobs")
+    parser.add_argument("--concurrency", type=int, default=4, help="Jobs run at the same time")
+    parser.add_argument("--kinds", nargs="+", default=list(HANDLERS), choices=list(HANDLERS))
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s %(levelname)s %(message)s")
+    asyncio.run(main(args.kinds, args.concurrency))
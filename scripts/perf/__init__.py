@@ -0,0 +1 @@
+"""Performance tooling: query budgets and helpers for running the bot and the API offline."""
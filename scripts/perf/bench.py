@@ -0,0 +1,282 @@
+"""
+Benchmarks of the hot paths, compared against a stored baseline.
+
+Repository calls run against a scratch Postgres database (see
+`scripts.perf.environment`), API routes run in-process through the real
+application, keyboard builders run on in-memory objects. Each benchmark
+reports ops/sec and p50/p95/p99 latency. Results are compared with
+`baseline.json`: a benchmark whose throughput or p95 latency is worse than
+the baseline by more than `--threshold` percent is reported as a regression,
+which fails the run with `--fail-on-regression`. The baseline records the
+machine and the Postgres version it was measured on, under `ENVIRONMENT_KEY`;
+numbers from another environment are not comparable.
+
+Usage:
+    python -m scripts.perf.bench [--only keyboard] [--threshold 20] [--fail-on-regression]
+    python -m scripts.perf.bench --save-baseline --rounds 5
+"""
+import argparse
+import asyncio
+import inspect
+import json
+import logging
+import os
+import platform
+import sys
+import time
+from dataclasses import dataclass, asdict
+from pathlib import Path
+from types import SimpleNamespace
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from sqlalchemy import text
+
+from infrastructure.database.repo.questionnaires import QuestionnaireRepo
+from infrastructure.database.repo.users import UserRepo
+from infrastructure.database.setup import create_engine, create_session_pool
+from scripts.perf.environment import Seed, api_client, load_perf_config, prepare_database, seed, seed_assignments
+from tgbot.config import Config
+from tgbot.keyboards.inline import (
+    get_questionnaire_button,
+    get_questionnaires_keyboard,
+    get_active_assignments_keyboard,
+    get_groups_keyboard,
+)
+
+BASELINE_PATH = Path(__file__).with_name("baseline.json")
+ENVIRONMENT_KEY = "_environment"
+
+
+@dataclass
+class Benchmark:
+    name: str
+    op: Callable[[], Any]
+    iterations: int = 500
+    warmup: int = 20
+
+
+@dataclass
+class Result:
+    name: str
+    iterations: int
+    ops_per_sec: float
+    p50_ms: float
+    p95_ms: float
+    p99_ms: float
+
+
+def percentile(sorted_values: List[float], q: float) -> float:
+    """Nearest-rank percentile of an already sorted list."""
+    index = min(len(sorted_values) - 1, max(0, round(q / 100 * len(sorted_values)) - 1))
+    return sorted_values[index]
+
+
+async def measure(benchmark: Benchmark, iterations: Optional[int] = None) -> Result:
+    iterations = iterations or benchmark.iterations
+
+    async def call():
+        result = benchmark.op()
+        if inspect.isawaitable(result):
+            await result
+
+    for _ in range(benchmark.warmup):
+        await call()
+
+    latencies = []
+    started = time.perf_counter()
+    for _ in range(iterations):
+        op_started = time.perf_counter()
+        await call()
+        latencies.append(time.perf_counter() - op_started)
+    total = time.perf_counter() - started
+
+    latencies.sort()
+    return Result(
+        name=benchmark.name,
+        iterations=iterations,
+        ops_per_sec=round(iterations / total, 1),
+        p50_ms=round(percentile(latencies, 50) * 1000, 3),
+        p95_ms=round(percentile(latencies, 95) * 1000, 3),
+        p99_ms=round(percentile(latencies, 99) * 1000, 3),
+    )
+
+
+def keyboard_benchmarks() -> List[Benchmark]:
+    questionnaires = [SimpleNamespace(id=i, title=f"Questionnaire number {i}") for i in range(1, 301)]
+    groups = [SimpleNamespace(id=i, group_id=-100000 - i, title=f"Cohort {i}") for i in range(1, 81)]
+    assignments = [
+        SimpleNamespace(id=i, questionnaire=questionnaires[i % 300], group=groups[i % 80])
+        for i in range(1, 301)
+    ]
+    return [
+        Benchmark("keyboard questionnaire_button", lambda: get_questionnaire_button(42, "pollemic_bot"), 5000),
+        Benchmark("keyboard questionnaires page", lambda: get_questionnaires_keyboard(questionnaires, 10), 5000),
+        Benchmark("keyboard active assignments page", lambda: get_active_assignments_keyboard(assignments, 10), 5000),
+        Benchmark("keyboard groups (80)", lambda: get_groups_keyboard(groups), 2000),
+    ]
+
+
+def repository_benchmarks(session_pool, data: Seed) -> List[Benchmark]:
+    assignment_id = data.assignment_ids[0]
+    answers = {"0": "Good", "1": "Nothing to add"}
+
+    async def get_or_create_user():
+        async with session_pool() as session:
+            await UserRepo(session).get_or_create_user(
+                user_id=data.student_id, full_name="Perf Student", username="perf_student"
+            )
+
+    async def get_active_assignments():
+        async with session_pool() as session:
+            await QuestionnaireRepo(session).get_active_assignments()
+
+    async def get_assignment():
+        async with session_pool() as session:
+            await QuestionnaireRepo(session).get_assignment(assignment_id)
+
+    async def submit_response():
+        async with session_pool() as session:
+            await QuestionnaireRepo(session).submit_response(assignment_id, data.student_id, answers)
+
+    return [
+        Benchmark("repo get_or_create_user", get_or_create_user),
+        Benchmark("repo get_active_assignments", get_active_assignments, 200),
+        Benchmark("repo get_assignment", get_assignment),
+        Benchmark("repo submit_response", submit_response),
+    ]
+
+
+def api_benchmarks(client, data: Seed) -> List[Benchmark]:
+    def get(path: str) -> Callable[[], Any]:
+        async def op():
+            response = await client.get(path)
+            response.raise_for_status()
+        return op
+
+    return [
+        Benchmark("api GET /auth/me", get("/auth/me")),
+        Benchmark("api GET /groups/", get("/groups/")),
+        Benchmark("api GET /questionnaires/", get("/questionnaires/"), 200),
+        Benchmark("api GET /questionnaires/{id}", get(f"/questionnaires/{data.questionnaire_id}")),
+        Benchmark("api GET /dashboard/summary", get("/dashboard/summary")),
+    ]
+
+
+def cpu_model() -> str:
+    try:
+        with open("/proc/cpuinfo") as cpuinfo:
+            for line in cpuinfo:
+                if line.startswith("model name"):
+                    return line.split(":", 1)[1].strip()
+    except OSError:
+        pass
+    return platform.processor() or platform.machine()
+
+
+async def describe_environment(engine) -> Dict[str, Any]:
+    """What the numbers depend on: the machine, Python and Postgres."""
+    async with engine.connect() as connection:
+        server_version = (await connection.execute(text("SHOW server_version"))).scalar()
+    return {
+        "cpu": cpu_model(),
+        "cpus": os.cpu_count(),
+        "platform": platform.platform(),
+        "python": platform.python_version(),
+        "postgres": server_version,
+    }
+
+
+def compare(results: List[Result], baseline: Dict[str, dict], threshold: float) -> int:
+    """Print results next to the baseline and return the number of regressions."""
+    regressions = 0
+    print(f"{'benchmark':36} {'ops/sec':>10} {'p50 ms':>9} {'p95 ms':>9} {'p99 ms':>9}  vs baseline")
+    for result in results:
+        line = (
+            f"{result.name:36} {result.ops_per_sec:>10.1f} {result.p50_ms:>9.3f} "
+            f"{result.p95_ms:>9.3f} {result.p99_ms:>9.3f}  "
+        )
+        reference = baseline.get(result.name)
+        if reference is None:
+            print(line + "no baseline")
+            continue
+
+        throughput_change = (result.ops_per_sec / reference["ops_per_sec"] - 1) * 100
+        p95_change = (result.p95_ms / reference["p95_ms"] - 1) * 100
+        regressed = throughput_change < -threshold or p95_change > threshold
+        regressions += regressed
+        print(
+            line
+            + f"ops {throughput_change:+.1f}%, p95 {p95_change:+.1f}%"
+            + ("  REGRESSION" if regressed else "")
+        )
+    return regressions
+
+
+async def measure_rounds(benchmark: Benchmark, iterations: Optional[int], rounds: int) -> Result:
+    """Measure `rounds` times and keep the round with the median p95, so one noisy round does not count."""
+    measured = sorted([await measure(benchmark, iterations) for _ in range(rounds)], key=lambda r: r.p95_ms)
+    return measured[len(measured) // 2]
+
+
+async def run(
+        config: Config, only: Optional[str], iterations: Optional[int], rounds: int = 1
+) -> Tuple[List[Result], Dict[str, Any]]:
+    engine = create_engine(config.db)
+    session_pool = create_session_pool(engine)
+    results = []
+
+    def selected(benchmarks: List[Benchmark]) -> List[Benchmark]:
+        return [b for b in benchmarks if not only or only in b.name]
+
+    try:
+        environment = await describe_environment(engine)
+        data = await seed(session_pool)
+        await seed_assignments(session_pool, data, 200)
+
+        for benchmark in selected(keyboard_benchmarks() + repository_benchmarks(session_pool, data)):
+            results.append(await measure_rounds(benchmark, iterations, rounds))
+
+        api = selected(api_benchmarks(None, data))
+        if api:
+            async with api_client(config, data) as (client, _):
+                for benchmark in selected(api_benchmarks(client, data)):
+                    results.append(await measure_rounds(benchmark, iterations, rounds))
+    finally:
+        await engine.dispose()
+    return results, environment
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--only", help="run only benchmarks whose name contains this text")
+    parser.add_argument("--iterations", type=int, help="override the number of iterations of every benchmark")
+    parser.add_argument("--rounds", type=int, default=1, help="measure every benchmark this many times, keep the median")
+    parser.add_argument("--threshold", type=float, default=20.0, help="allowed regression, percent")
+    parser.add_argument("--fail-on-regression", action="store_true", help="exit with 1 on a regression")
+    parser.add_argument("--save-baseline", action="store_true", help=f"write the results to {BASELINE_PATH.name}")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.WARNING)
+    config = load_perf_config()
+    prepare_database(config)
+    results, environment = asyncio.run(run(config, args.only, args.iterations, args.rounds))
+
+    baseline = json.loads(BASELINE_PATH.read_text()) if BASELINE_PATH.exists() else {}
+    baseline_environment = baseline.pop(ENVIRONMENT_KEY, None)
+    if baseline_environment and baseline_environment != environment and not args.save_baseline:
+        print(f"The baseline was measured on another environment: {json.dumps(baseline_environment)}")
+    regressions = compare(results, baseline, args.threshold)
+
+    if args.save_baseline:
+        baseline.update({result.name: asdict(result) for result in results})
+        baseline[ENVIRONMENT_KEY] = environment
+        BASELINE_PATH.write_text(json.dumps(baseline, indent=2, sort_keys=True) + "\n")
+        print(f"Baseline saved to {BASELINE_PATH}")
+    elif regressions:
+        print(f"{regressions} benchmark(s) regressed by more than {args.threshold}%")
+        if args.fail_on_regression:
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
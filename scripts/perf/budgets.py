@@ -0,0 +1,222 @@
+"""
+Query-count budgets for API routes and bot handlers.
+
+Every case declares how many SQL statements and Telegram Bot API calls it may
+make. The check runs the real FastAPI application and the real dispatcher
+against a scratch Postgres database (see `scripts.perf.environment`) with a
+fake Bot API session, and fails when a case goes over its budget, e.g. because
+a relationship started lazy loading.
+
+Usage:
+    python -m scripts.perf.budgets
+"""
+import asyncio
+import logging
+import sys
+from dataclasses import dataclass
+from datetime import datetime, timedelta
+from typing import Callable, List, Optional
+
+from aiogram import Bot
+from aiogram.fsm.storage.memory import MemoryStorage
+from aiogram.types import Update
+
+from bot import create_bot, create_dispatcher
+from infrastructure.database.instrumentation import track_queries
+from infrastructure.database.models import JobKind
+from infrastructure.database.repo.requests import RequestsRepo
+from infrastructure.database.setup import create_engine, create_session_pool
+from scripts.perf.environment import Seed, api_client, load_perf_config, prepare_database, seed, seed_assignments
+from scripts.perf.fake_session import FakeTelegramSession
+from scripts.perf.updates import message_update, callback_update
+from tgbot.config import Config
+
+
+@dataclass
+class Budget:
+    """How much a case may cost."""
+
+    name: str
+    max_statements: int
+    max_telegram_calls: int = 0
+
+
+@dataclass
+class ApiCase:
+    budget: Budget
+    method: str
+    path: Callable[[Seed], str]
+    json: Optional[Callable[[Seed], dict]] = None
+
+
+@dataclass
+class BotCase:
+    budget: Budget
+    update: Callable[[Bot, Seed], Update]
+
+
+@dataclass
+class Measurement:
+    budget: Budget
+    statements: int
+    telegram_calls: int
+    error: Optional[str] = None
+
+    @property
+    def failed(self) -> bool:
+        return (
+            self.error is not None
+            or self.statements > self.budget.max_statements
+            or self.telegram_calls > self.budget.max_telegram_calls
+        )
+
+
+API_CASES: List[ApiCase] = [
+    ApiCase(Budget("GET /auth/me", 1), "GET", lambda s: "/auth/me"),
+    ApiCase(Budget("GET /admin/pool", 0), "GET", lambda s: "/admin/pool"),
+    ApiCase(Budget("GET /groups/", 1), "GET", lambda s: "/groups/"),
+    ApiCase(Budget("GET /groups/active", 1), "GET", lambda s: "/groups/active"),
+    ApiCase(Budget("GET /groups/{id}", 1), "GET", lambda s: f"/groups/{s.group_id}"),
+    ApiCase(Budget("GET /questionnaires/", 1), "GET", lambda s: "/questionnaires/"),
+    ApiCase(Budget("GET /questionnaires/{id}", 1), "GET", lambda s: f"/questionnaires/{s.questionnaire_id}"),
+    ApiCase(
+        Budget("POST /questionnaires/", 2),
+        "POST",
+        lambda s: "/questionnaires/",
+        lambda s: {
+            "title": "Budget check",
+            "description": "Created by scripts.perf.budgets",
+            "questions": [{"text": "Ok?", "type": "single_choice", "options": ["Yes", "No"]}],
+            "created_by": s.admin_id,
+        },
+    ),
+    ApiCase(Budget("GET /questionnaires/search", 1), "GET", lambda s: "/questionnaires/search?q=perf"),
+    ApiCase(
+        Budget("POST /questionnaires/{id}/assign", 4, 1),
+        "POST",
+        lambda s: f"/questionnaires/{s.questionnaire_id}/assign",
+        lambda s: {"group_id": s.group_id, "due_date": due_date()},
+    ),
+    ApiCase(
+        Budget("POST /questionnaires/{id}/assign-bulk", 5, 1),
+        "POST",
+        lambda s: f"/questionnaires/{s.questionnaire_id}/assign-bulk",
+        lambda s: {"group_ids": [s.group_id], "due_date": due_date()},
+    ),
+    ApiCase(Budget("GET /questionnaires/assignments", 1), "GET", lambda s: "/questionnaires/assignments"),
+    ApiCase(Budget("GET /dashboard/summary", 1), "GET", lambda s: "/dashboard/summary"),
+    ApiCase(Budget("GET /jobs/{id}", 1), "GET", lambda s: f"/jobs/{s.job_id}"),
+]
+
+BOT_CASES: List[BotCase] = [
+    BotCase(Budget("bot /start", 1, 1), lambda bot, s: message_update(bot, s.student_id, "/start")),
+    BotCase(Budget("bot /pool", 1, 1), lambda bot, s: message_update(bot, s.admin_id, "/pool")),
+    BotCase(
+        Budget("bot cancel_assignment", 1, 1),
+        lambda bot, s: callback_update(bot, s.admin_id, "cancel_assignment"),
+    ),
+    # The /assign flow, one step after the other in the same FSM state
+    BotCase(Budget("bot /assign", 2, 1), lambda bot, s: message_update(bot, s.admin_id, "/assign")),
+    BotCase(
+        Budget("bot questionnaire_{id}", 3, 3),
+        lambda bot, s: callback_update(bot, s.admin_id, f"questionnaire_{s.questionnaire_id}"),
+    ),
+    BotCase(
+        Budget("bot toggle_group_{id}", 1, 2),
+        lambda bot, s: callback_update(bot, s.admin_id, f"toggle_group_{s.group_id}"),
+    ),
+    BotCase(Budget("bot groups_selected", 1, 2), lambda bot, s: callback_update(bot, s.admin_id, "groups_selected")),
+    BotCase(
+        Budget("bot confirm_assignment", 5, 3),
+        lambda bot, s: callback_update(bot, s.admin_id, "confirm_assignment"),
+    ),
+]
+
+
+def due_date() -> str:
+    return (datetime.utcnow() + timedelta(days=7)).isoformat()
+
+
+async def measure_api(config: Config, data: Seed, cases: List[ApiCase]) -> List[Measurement]:
+    measurements = []
+    async with api_client(config, data) as (client, session):
+        for case in cases:
+            calls_before = len(session.calls)
+            with track_queries(case.budget.name) as stats:
+                response = await client.request(
+                    case.method,
+                    case.path(data),
+                    json=case.json(data) if case.json else None,
+                )
+            error = None
+            if response.status_code >= 400:
+                error = f"HTTP {response.status_code}: {response.text[:200]}"
+            measurements.append(
+                Measurement(case.budget, stats.statements, len(session.calls) - calls_before, error)
+            )
+    return measurements
+
+
+async def measure_bot(config: Config, engine, session_pool, data: Seed, cases: List[BotCase]) -> List[Measurement]:
+    measurements = []
+    session = FakeTelegramSession()
+    bot = create_bot(config, session=session)
+    dp = create_dispatcher(config, MemoryStorage(), engine, session_pool)
+
+    for case in cases:
+        calls_before = len(session.calls)
+        error = None
+        with track_queries(case.budget.name) as stats:
+            try:
+                await dp.feed_update(bot, case.update(bot, data))
+            except Exception as e:
+                error = f"{type(e).__name__}: {e}"
+        measurements.append(
+            Measurement(case.budget, stats.statements, len(session.calls) - calls_before, error)
+        )
+    return measurements
+
+
+def report(measurements: List[Measurement]) -> int:
+    """Print the results and return the number of failed cases."""
+    failures = 0
+    for m in measurements:
+        failures += m.failed
+        print(
+            f"{'FAIL' if m.failed else 'ok':4}  {m.budget.name:40} "
+            f"sql {m.statements:>3}/{m.budget.max_statements:<3} "
+            f"telegram {m.telegram_calls:>3}/{m.budget.max_telegram_calls:<3}"
+            + (f"  {m.error}" if m.error else "")
+        )
+    return failures
+
+
+async def run(config: Config) -> int:
+    engine = create_engine(config.db)
+    session_pool = create_session_pool(engine)
+    try:
+        data = await seed(session_pool)
+        # A few rows, so that loading them one by one shows in the statement counts
+        await seed_assignments(session_pool, data, 3)
+        async with session_pool() as session:
+            job = await RequestsRepo(session).jobs.enqueue(JobKind.EXPORT_BUNDLE, {}, created_by=data.admin_id)
+            data.job_id = job.id
+        measurements = await measure_api(config, data, API_CASES)
+        measurements += await measure_bot(config, engine, session_pool, data, BOT_CASES)
+    finally:
+        await engine.dispose()
+    return report(measurements)
+
+
+def main():
+    logging.basicConfig(level=logging.WARNING)
+    config = load_perf_config()
+    prepare_database(config)
+    failures = asyncio.run(run(config))
+    if failures:
+        print(f"{failures} case(s) over budget")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,195 @@
+import asyncio
+import os
+from contextlib import asynccontextmanager
+from dataclasses import dataclass, field, replace
+from datetime import datetime, timedelta
+from typing import AsyncIterator, List, Tuple
+
+import asyncpg
+import httpx
+from aiogram import Bot
+from alembic import command
+from alembic.config import Config as AlembicConfig
+from sqlalchemy import insert
+
+from infrastructure.api.app import create_app
+from infrastructure.api.security.token import create_access_token
+from infrastructure.database.models import User, UserRole, Group, Questionnaire, Assignment
+from scripts.perf.fake_session import FakeTelegramSession
+from tgbot.config import load_config, Config
+
+ADMIN_ID = 900000001
+STUDENT_ID = 900000002
+GROUP_ID = -1009000000001
+
+
+@dataclass
+class Seed:
+    """Ids of the rows every perf run starts with."""
+
+    admin_id: int = ADMIN_ID
+    student_id: int = STUDENT_ID
+    group_id: int = GROUP_ID
+    questionnaire_id: int = 0
+    assignment_ids: List[int] = field(default_factory=list)
+    job_id: int = 0
+
+
+def load_perf_config() -> Config:
+    """
+    Load the `.env` configuration, pointed at the scratch perf database.
+
+    The database is `PERF_POSTGRES_DB` (default: the main database name with
+    a `_perf` suffix) on the same server. It is dropped and recreated by
+    `prepare_database`, so it must never be the main database.
+    """
+    config = load_config(".env")
+    database = os.environ.get("PERF_POSTGRES_DB", f"{config.db.database}_perf")
+    if database == config.db.database:
+        raise RuntimeError("PERF_POSTGRES_DB must not be the main database, it gets dropped")
+
+    config.db = replace(config.db, database=database, pool_warmup=1, replica_host=None)
+    config.tg_bot = replace(config.tg_bot, admin_ids=[ADMIN_ID], use_redis=False)
+    config.metrics = replace(config.metrics, enabled=False)
+    return config
+
+
+def prepare_database(config: Config) -> None:
+    """
+    Recreate the perf database and migrate it to the latest revision.
+
+    Must be called outside of a running event loop: the Alembic environment
+    runs its own one.
+    """
+    asyncio.run(_recreate_database(config))
+
+    # The Alembic environment reads the database name from the process environment
+    os.environ["POSTGRES_DB"] = config.db.database
+    command.upgrade(AlembicConfig("alembic.ini"), "head")
+
+
+async def _recreate_database(config: Config) -> None:
+    connection = await asyncpg.connect(
+        user=config.db.user,
+        password=config.db.password,
+        host=config.db.host,
+        port=config.db.port,
+        database="postgres",
+    )
+    try:
+        await connection.execute(f'DROP DATABASE IF EXISTS "{config.db.database}"')
+        await connection.execute(f'CREATE DATABASE "{config.db.database}"')
+    finally:
+        await connection.close()
+
+
+async def seed(session_pool) -> Seed:
+    """Insert an admin, a student, an active group and a questionnaire."""
+    result = Seed()
+    async with session_pool() as session:
+        session.add_all([
+            User(user_id=ADMIN_ID, username="perf_admin", full_name="Perf Admin", role=UserRole.UNIVERSITY_ADMIN),
+            User(user_id=STUDENT_ID, username="perf_student", full_name="Perf Student", role=UserRole.STUDENT),
+            Group(group_id=GROUP_ID, title="Perf Group", type="supergroup", is_active=True),
+        ])
+        await session.flush()
+
+        questionnaire = Questionnaire(
+            title="Perf questionnaire",
+            description="Seeded by scripts.perf",
+            questions=[
+                {"text": "How was the lecture?", "type": "single_choice", "options": ["Good", "Bad"]},
+                {"text": "Anything else?", "type": "text", "options": None},
+            ],
+            created_by=ADMIN_ID,
+        )
+        session.add(questionnaire)
+        await session.commit()
+        result.questionnaire_id = questionnaire.id
+    return result
+
+
+async def seed_users(session_pool, first_id: int, count: int, role: UserRole) -> List[int]:
+    """Insert `count` users with consecutive ids starting at `first_id`, in one statement."""
+    ids = list(range(first_id, first_id + count))
+    async with session_pool() as session:
+        await session.execute(
+            insert(User),
+            [
+                {"user_id": user_id, "username": f"user{user_id}", "full_name": f"User {user_id}", "role": role}
+                for user_id in ids
+            ],
+        )
+        await session.commit()
+    return ids
+
+
+async def seed_questionnaires(session_pool, data: Seed, count: int) -> List[int]:
+    """Insert `count` more questionnaires by the seeded admin, in one statement."""
+    async with session_pool() as session:
+        result = await session.execute(
+            insert(Questionnaire).returning(Questionnaire.id),
+            [
+                {
+                    "title": f"Perf questionnaire {i}",
+                    "description": "Seeded by scripts.perf",
+                    "questions": [{"text": f"Question {i}?", "type": "text", "options": None}],
+                    "created_by": data.admin_id,
+                }
+                for i in range(count)
+            ],
+        )
+        ids = list(result.scalars())
+        await session.commit()
+    return ids
+
+
+async def seed_assignments(session_pool, data: Seed, count: int) -> List[int]:
+    """Assign the seeded questionnaire to the seeded group `count` times, in one statement."""
+    now = datetime.utcnow()
+    async with session_pool() as session:
+        result = await session.execute(
+            insert(Assignment).returning(Assignment.id),
+            [
+                {
+                    "questionnaire_id": data.questionnaire_id,
+                    "group_id": data.group_id,
+                    "start_time": now,
+                    "deadline_time": now + timedelta(days=7),
+                    "created_by": data.admin_id,
+                }
+                for _ in range(count)
+            ],
+        )
+        ids = list(result.scalars())
+        await session.commit()
+    data.assignment_ids.extend(ids)
+    return ids
+
+
+def admin_token(config: Config, data: Seed) -> str:
+    """An access token of the seeded admin."""
+    return create_access_token(
+        {"sub": "perf_admin", "user_id": data.admin_id, "role": "university_admin"},
+        config.auth,
+    )
+
+
+@asynccontextmanager
+async def api_client(config: Config, data: Seed) -> AsyncIterator[Tuple[httpx.AsyncClient, FakeTelegramSession]]:
+    """
+    Run the API application in-process and yield a client authenticated as the seeded admin.
+
+    The application lifespan runs as in production; its bot is swapped for
+    one on a fake Bot API session, which is yielded along with the client.
+    """
+    app = create_app(config)
+    async with app.router.lifespan_context(app):
+        session = FakeTelegramSession()
+        app.state.bot = Bot(token=config.tg_bot.token, session=session)
+        async with httpx.AsyncClient(
+                transport=httpx.ASGITransport(app=app),
+                base_url="http://perf",
+                headers={"Authorization": f"Bearer {admin_token(config, data)}"},
+        ) as client:
+            yield client, session
@@ -0,0 +1,234 @@
+"""
+Check that the repository queries on the hot paths use their indexes.
+
+Fills the scratch perf database (see `scripts.perf.environment`) with
+`--rows` users and responses (1M by default) and proportional numbers of
+questionnaires, groups and assignments, runs VACUUM ANALYZE, then calls each
+repository method, captures the SQL it sends and checks with
+`EXPLAIN (FORMAT JSON)` that the plan uses the expected index.
+
+Usage:
+    python -m scripts.perf.explain [--rows 1000000] [--verbose]
+"""
+import argparse
+import asyncio
+import json
+import logging
+import sys
+from dataclasses import dataclass
+from typing import Any, Awaitable, Callable, Iterator, List, Set, Tuple
+
+from sqlalchemy import event, text
+from sqlalchemy.ext.asyncio import AsyncEngine
+
+from infrastructure.database.partitions import ensure_response_partitions
+from infrastructure.database.repo.requests import RequestsRepo
+from infrastructure.database.setup import create_engine, create_session_pool
+from scripts.perf.environment import load_perf_config, prepare_database
+from tgbot.config import Config
+
+FIRST_USER_ID = 1_000_000_000
+FIRST_GROUP_ID = -1_000_000_000_000
+
+
+@dataclass
+class QueryCase:
+    name: str
+    call: Callable[[RequestsRepo], Awaitable[Any]]
+    expected_index: str
+
+
+CASES: List[QueryCase] = [
+    QueryCase(
+        "get_active_assignments_for_group",
+        lambda repo: repo.questionnaires.get_active_assignments_for_group(FIRST_GROUP_ID - 7),
+        "ix_assignments_group_id_active",
+    ),
+    QueryCase(
+        "get_active_assignments",
+        lambda repo: repo.questionnaires.get_active_assignments(),
+        "ix_assignments_active_deadline",
+    ),
+    QueryCase("get_assignment", lambda repo: repo.questionnaires.get_assignment(12345), "assignments_pkey"),
+    QueryCase(
+        "get_questionnaires(limit=10)",
+        lambda repo: repo.questionnaires.get_questionnaires(limit=10),
+        "ix_questionnaires_created_at",
+    ),
+    QueryCase(
+        "search_questionnaires",
+        lambda repo: repo.questionnaires.search_questionnaires("4242"),
+        "ix_questionnaires_search_vector",
+    ),
+    QueryCase(
+        "get_user_by_username",
+        lambda repo: repo.users.get_user_by_username("user4242"),
+        "ix_users_username",
+    ),
+    QueryCase(
+        "get_assignment_responses",
+        lambda repo: repo.responses.get_assignment_responses(12345),
+        "uq_responses_assignment_id_student_id",
+    ),
+    QueryCase(
+        "get_non_responders",
+        lambda repo: repo.group_members.get_non_responders(12345),
+        "group_members_pkey",
+    ),
+    QueryCase(
+        "get_summary",
+        lambda repo: repo.dashboard.get_summary(),
+        "uq_responses_assignment_id_student_id",
+    ),
+    QueryCase(
+        "get_student_responses",
+        lambda repo: repo.responses.get_student_responses(FIRST_USER_ID + 4242),
+        "ix_responses_student_id",
+    ),
+    QueryCase(
+        "get_students_by_answer",
+        lambda repo: repo.responses.get_students_by_answer(2, "Option 7"),
+        "ix_responses_answers",
+    ),
+]
+
+
+async def fill(engine: AsyncEngine, rows: int) -> None:
+    """Insert `rows` users, group members and responses, rows/100 questionnaires, rows/5 assignments (2% active)."""
+    statements = [
+        """
+        INSERT INTO users (user_id, username, full_name, role)
+        SELECT :first_user + g, 'user' || g, 'User ' || g, 'STUDENT'
+        FROM generate_series(1, :rows) g
+        """,
+        """
+        INSERT INTO groups (group_id, title, type, is_active)
+        SELECT CAST(:first_group AS bigint) - g, 'Group ' || g, 'supergroup', true
+        FROM generate_series(1, greatest(:rows / 1000, 1)) g
+        """,
+        """
+        INSERT INTO questionnaires (title, description, questions, created_by, is_anonymous, created_at)
+        SELECT 'Questionnaire ' || g, '', '[]', :first_user + 1, false, now() - g * interval '1 minute'
+        FROM generate_series(1, greatest(:rows / 100, 1)) g
+        """,
+        """
+        INSERT INTO assignments (questionnaire_id, group_id, start_time, deadline_time, is_active, created_by)
+        SELECT 1 + g % greatest(:rows / 100, 1), CAST(:first_group AS bigint) - 1 - g % greatest(:rows / 1000, 1),
+               now(), now() + interval '7 days', g % 50 = 0, :first_user + 1
+        FROM generate_series(1, greatest(:rows / 5, 1)) g
+        """,
+        """
+        INSERT INTO group_members (group_id, user_id)
+        SELECT CAST(:first_group AS bigint) - 1 - g % greatest(:rows / 1000, 1), :first_user + g
+        FROM generate_series(1, :rows) g
+        """,
+    ]
+    responses = """
+        INSERT INTO responses (assignment_id, student_id, answers, is_completed)
+        SELECT 1 + g % greatest(:rows / 5, 1), :first_user + 1 + (g::bigint * 7919) % :rows,
+               jsonb_build_object('0', (array['Good', 'Bad', 'Okay'])[1 + g % 3], '2', 'Option ' || g % 500),
+               true
+        FROM generate_series(1, :rows) g
+    """
+    params = {"rows": rows, "first_user": FIRST_USER_ID, "first_group": FIRST_GROUP_ID}
+    async with engine.begin() as connection:
+        for statement in statements:
+            await connection.execute(text(statement), params)
+    # Assignment ids past the partitions created by the migration need theirs first
+    await ensure_response_partitions(engine)
+    async with engine.begin() as connection:
+        await connection.execute(text(responses), params)
+    # Plans must not depend on what autovacuum got to yet: VACUUM sets the visibility map index-only scans are
+    # costed with, and the larger sample keeps the estimates of the GIN-indexed columns the same from run to run
+    async with engine.connect() as connection:
+        await connection.execution_options(isolation_level="AUTOCOMMIT")
+        await connection.execute(text("SET default_statistics_target = 1000"))
+        await connection.execute(text("VACUUM (ANALYZE)"))
+
+
+def plan_nodes(plan: dict) -> Iterator[dict]:
+    yield plan
+    for child in plan.get("Plans", []):
+        yield from plan_nodes(child)
+
+
+async def capture(engine: AsyncEngine, session_pool, case: QueryCase) -> List[Tuple[str, Any]]:
+    """Run the repository call and return the SELECT statements it executed."""
+    statements = []
+
+    def before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        if statement.lstrip().upper().startswith("SELECT"):
+            statements.append((statement, parameters))
+
+    event.listen(engine.sync_engine, "before_cursor_execute", before_cursor_execute)
+    try:
+        async with session_pool() as session:
+            await case.call(RequestsRepo(session))
+    finally:
+        event.remove(engine.sync_engine, "before_cursor_execute", before_cursor_execute)
+    return statements
+
+
+async def check(engine: AsyncEngine, session_pool, case: QueryCase, verbose: bool) -> bool:
+    statements = await capture(engine, session_pool, case)
+    indexes: Set[str] = set()
+    seq_scans: Set[str] = set()
+    async with engine.connect() as connection:
+        for statement, parameters in statements:
+            result = await connection.exec_driver_sql(f"EXPLAIN (FORMAT JSON) {statement}", parameters)
+            plan = result.scalar()
+            if isinstance(plan, str):
+                plan = json.loads(plan)
+            for node in plan_nodes(plan[0]["Plan"]):
+                if "Index Name" in node:
+                    indexes.add(node["Index Name"])
+                if node["Node Type"] == "Seq Scan":
+                    seq_scans.add(node["Relation Name"])
+            if verbose:
+                print(json.dumps(plan, indent=2))
+        # Plans over partitions name the partitions' indexes, report their parent index instead
+        indexes = set((await connection.execute(
+            text("SELECT coalesce(pg_partition_root(c.oid), c.oid)::regclass::text "
+                 "FROM pg_class c WHERE c.relname = ANY(:names)"),
+            {"names": list(indexes)},
+        )).scalars())
+
+    ok = case.expected_index in indexes
+    print(
+        f"{'ok' if ok else 'FAIL':4}  {case.name:36} expects {case.expected_index}; "
+        f"indexes used: {', '.join(sorted(indexes)) or '-'}"
+        + (f"; seq scans: {', '.join(sorted(seq_scans))}" if seq_scans else "")
+    )
+    return ok
+
+
+async def run(config: Config, rows: int, verbose: bool) -> int:
+    engine = create_engine(config.db)
+    session_pool = create_session_pool(engine)
+    try:
+        await fill(engine, rows)
+        failures = 0
+        for case in CASES:
+            failures += not await check(engine, session_pool, case, verbose)
+    finally:
+        await engine.dispose()
+    return failures
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=int, default=1_000_000, help="number of users and of responses")
+    parser.add_argument("--verbose", action="store_true", help="print the full plans")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.WARNING)
+    config = load_perf_config()
+    prepare_database(config)
+    failures = asyncio.run(run(config, args.rows, args.verbose))
+    if failures:
+        print(f"{failures} query(ies) do not use the expected index")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,133 @@
+import asyncio
+import itertools
+import json
+import time
+from collections import Counter
+from typing import Any, Callable, Dict, Iterator, List, Optional, Union
+
+from aiogram import Bot
+from aiogram.client.session.base import BaseSession
+from aiogram.methods import TelegramMethod
+from aiogram.methods.base import TelegramType
+
+BOT_USER = {
+    "id": 100000001,
+    "is_bot": True,
+    "first_name": "Pollemic",
+    "username": "pollemic_perf_bot",
+}
+
+BOT_ADMINISTRATOR = {
+    "status": "administrator",
+    "user": BOT_USER,
+    "can_be_edited": False,
+    "is_anonymous": False,
+    "can_manage_chat": True,
+    "can_delete_messages": True,
+    "can_manage_video_chats": True,
+    "can_restrict_members": True,
+    "can_promote_members": False,
+    "can_change_info": True,
+    "can_invite_users": True,
+    "can_post_messages": True,
+    "can_pin_messages": True,
+    "can_post_stories": False,
+    "can_edit_stories": False,
+    "can_delete_stories": False,
+    "can_send_welcome_messages": False,
+}
+
+ResultFactory = Callable[[TelegramMethod], Any]
+
+
+def fake_result(api_method: str, params: Dict[str, Any], message_ids: Iterator[int]) -> Any:
+    """
+    A plausible result of a Bot API call, shared by the fake session and the fake server.
+
+    :param api_method: Bot API method name, e.g. `sendMessage`.
+    :param params: Call parameters; only `chat_id`, `message_id` and `text` are used.
+    :param message_ids: Source of ids for newly sent messages.
+    """
+    if api_method in ("sendMessage", "editMessageText", "editMessageReplyMarkup"):
+        chat_id = int(params.get("chat_id") or 1)
+        return {
+            "message_id": int(params.get("message_id") or next(message_ids)),
+            "date": int(time.time()),
+            "chat": {"id": chat_id, "type": "private" if chat_id > 0 else "supergroup"},
+            "from": BOT_USER,
+            "text": params.get("text") or "",
+        }
+    if api_method == "sendDocument":
+        chat_id = int(params.get("chat_id") or 1)
+        message_id = next(message_ids)
+        return {
+            "message_id": message_id,
+            "date": int(time.time()),
+            "chat": {"id": chat_id, "type": "private" if chat_id > 0 else "supergroup"},
+            "from": BOT_USER,
+            "document": {"file_id": f"document-{message_id}", "file_unique_id": f"document-{message_id}"},
+        }
+    if api_method == "getMe":
+        return BOT_USER
+    if api_method == "getChatMember":
+        return BOT_ADMINISTRATOR
+    if api_method == "getChatAdministrators":
+        return [BOT_ADMINISTRATOR]
+    return True
+
+
+class FakeTelegramSession(BaseSession):
+    """
+    Bot API session that never leaves the process.
+
+    Every call is recorded and answered with a plausible result, so handlers,
+    the broadcaster and the dispatcher can be exercised without Telegram.
+    Results can be overridden per Bot API method with a value or a callable
+    taking the method object.
+
+    Example usage:
+        session = FakeTelegramSession(latency=0.05)
+        bot = Bot(token="42:fake", session=session)
+        await bot.send_message(1, "hi")
+        assert session.calls_by_method["sendMessage"] == 1
+    """
+
+    def __init__(
+            self,
+            results: Optional[Dict[str, Union[Any, ResultFactory]]] = None,
+            latency: float = 0.0,
+    ) -> None:
+        super().__init__()
+        self.results = results or {}
+        self.latency = latency
+        self.calls: List[TelegramMethod] = []
+        self.calls_by_method: Counter = Counter()
+        self._message_ids = itertools.count(1)
+
+    async def make_request(
+            self,
+            bot: Bot,
+            method: TelegramMethod[TelegramType],
+            timeout: Optional[int] = None,
+    ) -> TelegramType:
+        self.calls.append(method)
+        self.calls_by_method[method.__api_method__] += 1
+        if self.latency:
+            await asyncio.sleep(self.latency)
+
+        result = self.results.get(method.__api_method__)
+        if result is None:
+            result = fake_result(method.__api_method__, method.model_dump(), self._message_ids)
+        elif callable(result):
+            result = result(method)
+
+        content = json.dumps({"ok": True, "result": result}, default=str)
+        response = self.check_response(bot=bot, method=method, status_code=200, content=content)
+        return response.result
+
+    async def stream_content(self, url: str, headers=None, timeout: int = 30, chunk_size: int = 65536,
+                             raise_for_status: bool = True):
+        yield b""
+
+    async def close(self) -> None:
+        pass
@@ -0,0 +1,98 @@
+"""
+Import-time budgets for the entry points.
+
+Every entry point is imported in a fresh interpreter with `-X importtime`,
+`--runs` times, and the median cumulative import time is compared with its
+budget. The check fails when an entry point goes over, e.g. because a module
+on its import path started importing a heavy optional dependency at module
+level. The heaviest modules are listed to show where the time goes.
+
+Usage:
+    python -m scripts.perf.imports
+    python -m scripts.perf.imports --runs 9 --top 20
+"""
+import argparse
+import re
+import statistics
+import subprocess
+import sys
+from dataclasses import dataclass
+from typing import Dict, List
+
+# Milliseconds, measured from a warm bytecode cache. The bot cannot start without aiogram,
+# whose types alone take about 4 s to import; the API imports it only when a route needs the bot
+BUDGETS_MS: Dict[str, float] = {
+    "bot": 7000,
+    "infrastructure.api.app": 1500,
+}
+
+_LINE = re.compile(r"^import time:\s+(\d+) \|\s+(\d+) \|( *)(\S+)$")
+
+
+@dataclass
+class ModuleTime:
+    name: str
+    self_us: int
+    cumulative_us: int
+    depth: int
+
+
+def import_times(module: str) -> List[ModuleTime]:
+    """Import `module` in a fresh interpreter and parse its `-X importtime` report."""
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        capture_output=True,
+        text=True,
+    )
+    if result.returncode != 0:
+        raise RuntimeError(f"Importing {module} failed:\n{result.stderr[-2000:]}")
+
+    times = []
+    for line in result.stderr.splitlines():
+        match = _LINE.match(line)
+        if match:
+            self_us, cumulative_us, indent, name = match.groups()
+            times.append(ModuleTime(name, int(self_us), int(cumulative_us), len(indent) // 2))
+    return times
+
+
+def measure(module: str, runs: int) -> List[List[ModuleTime]]:
+    # The first import compiles the bytecode, it is not what a restart costs
+    import_times(module)
+    return [import_times(module) for _ in range(runs)]
+
+
+def total_ms(times: List[ModuleTime]) -> float:
+    """Cumulative time of the top-level imports, i.e. the whole import."""
+    return sum(t.cumulative_us for t in times if t.depth == 0) / 1000
+
+
+def report(module: str, runs: List[List[ModuleTime]], budget_ms: float, top: int) -> bool:
+    totals = [total_ms(times) for times in runs]
+    median = statistics.median(totals)
+    ok = median <= budget_ms
+    print(f"{'OK  ' if ok else 'OVER'} {module:28} {median:8.1f} ms (budget {budget_ms:.0f} ms, "
+          f"min {min(totals):.1f}, max {max(totals):.1f})")
+
+    # Heaviest modules of the median run, by their own time
+    median_run = min(runs, key=lambda times: abs(total_ms(times) - median))
+    for t in sorted(median_run, key=lambda t: t.self_us, reverse=True)[:top]:
+        print(f"       {t.self_us / 1000:8.1f} ms  {t.cumulative_us / 1000:8.1f} ms cumulative  {t.name}")
+    return ok
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--runs", type=int, default=5, help="imports per entry point, the median is checked")
+    parser.add_argument("--top", type=int, default=10, help="heaviest modules to list per entry point")
+    parser.add_argument("--scale", type=float, default=1.0, help="multiply the budgets, for slow machines")
+    args = parser.parse_args()
+
+    ok = True
+    for module, budget_ms in BUDGETS_MS.items():
+        ok &= report(module, measure(module, args.runs), budget_ms * args.scale, args.top)
+    return 0 if ok else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
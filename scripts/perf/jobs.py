@@ -0,0 +1,102 @@
+"""
+Check that jobs of a dead worker are taken back.
+
+Against the scratch database (see `scripts.perf.environment`), two jobs are
+claimed by a worker that never renews its lease, which expires right away.
+A real `infrastructure.worker.Worker` then has to queue the job with attempts
+left again and run it, and fail the job that used up its attempts.
+
+Usage:
+    python -m scripts.perf.jobs
+"""
+import asyncio
+import logging
+import sys
+from datetime import timedelta
+from typing import Optional
+
+from aiogram import Bot
+
+from infrastructure.database.models import Job, JobStatus
+from infrastructure.database.repo.requests import RequestsRepo
+from infrastructure.database.setup import create_engine, create_session_pool
+from infrastructure.worker import Worker, job_handler
+from scripts.perf.environment import load_perf_config, prepare_database, seed
+from scripts.perf.fake_session import FakeTelegramSession
+from tgbot.config import Config
+
+KIND = "perf_noop"
+DEAD_WORKER = "perf-dead-worker"
+# The worker polls every POLL_INTERVAL seconds, the requeued job runs on the next poll at the latest
+TIMEOUT = 15
+
+
+@job_handler(KIND)
+async def noop_job(context) -> dict:
+    return {"ok": True}
+
+
+async def wait_for_status(session_pool, job_id: int, status: JobStatus, timeout: float) -> Optional[Job]:
+    """Poll a job until it has `status`; the job as last read."""
+    loop = asyncio.get_running_loop()
+    deadline = loop.time() + timeout
+    while True:
+        async with session_pool() as session:
+            job = await RequestsRepo(session).jobs.get_job(job_id)
+        if job.status == status or loop.time() > deadline:
+            return job
+        await asyncio.sleep(0.2)
+
+
+async def run(config: Config) -> int:
+    engine = create_engine(config.db)
+    session_pool = create_session_pool(engine)
+    bot = Bot(token=config.tg_bot.token, session=FakeTelegramSession())
+    try:
+        data = await seed(session_pool)
+        async with session_pool() as session:
+            jobs = RequestsRepo(session).jobs
+            retried = (await jobs.enqueue(KIND, {}, max_attempts=3, created_by=data.admin_id)).id
+            failed = (await jobs.enqueue(KIND, {}, max_attempts=1, created_by=data.admin_id)).id
+            # Claimed by a worker that dies at once: the lease expires immediately and is never renewed
+            for _ in range(2):
+                await jobs.claim_job(DEAD_WORKER, [KIND], timedelta(0))
+
+        worker = Worker(config, session_pool, bot, [KIND])
+        running = asyncio.create_task(worker.run())
+        try:
+            done = await wait_for_status(session_pool, retried, JobStatus.DONE, TIMEOUT)
+            # Taken back by the same pass as the other job
+            out_of_attempts = await wait_for_status(session_pool, failed, JobStatus.FAILED, 0)
+        finally:
+            worker.stop()
+            await running
+    finally:
+        await bot.session.close()
+        await engine.dispose()
+
+    failures = 0
+    for name, job, expected in [
+        ("job with attempts left runs again", done, JobStatus.DONE),
+        ("job out of attempts fails", out_of_attempts, JobStatus.FAILED),
+    ]:
+        ok = job.status == expected
+        failures += not ok
+        print(f"{'ok' if ok else 'FAIL':4}  {name:36} {job.status.value}, attempts {job.attempts}"
+              + (f", error {job.error!r}" if job.error else "")
+              + ("" if ok else f", expected {expected.value}"))
+    return failures
+
+
+def main():
+    logging.basicConfig(level=logging.WARNING)
+    config = load_perf_config()
+    prepare_database(config)
+    failures = asyncio.run(run(config))
+    if failures:
+        print(f"{failures} job check(s) failed")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,125 @@
+"""
+End-to-end check of the live response stream.
+
+Serves the API with uvicorn on a local port against the scratch database (see
+`scripts.perf.environment`), opens `GET /assignments/{id}/live` as the seeded
+admin and submits responses through the repository. Fails unless every
+response arrives on the stream as a `response` event with the expected
+changes, i.e. unless the notification made it from the submitting
+transaction through the listener to the stream.
+
+Usage:
+    python -m scripts.perf.live
+"""
+import asyncio
+import json
+import logging
+import socket
+import sys
+from dataclasses import dataclass
+from typing import AsyncIterator, Dict, List, Tuple
+
+import httpx
+import uvicorn
+
+from infrastructure.api.app import create_app
+from infrastructure.database.repo.requests import RequestsRepo
+from infrastructure.database.setup import create_engine, create_session_pool
+from scripts.perf.environment import admin_token, load_perf_config, prepare_database, seed, seed_assignments
+from tgbot.config import Config
+
+# How long an event may take to arrive
+EVENT_TIMEOUT = 10
+
+
+@dataclass
+class Step:
+    """A submitted response and the stream event it must produce."""
+
+    name: str
+    answers: dict
+    expected: dict
+
+
+STEPS: List[Step] = [
+    Step("new response", {"0": "Good", "1": "Nice"}, {"responses": 1, "options": {"0": {"Good": 1}}}),
+    Step("changed answer", {"0": "Bad", "1": "Nice"}, {"responses": 0, "options": {"0": {"Good": -1, "Bad": 1}}}),
+]
+
+
+async def sse_events(response: httpx.Response) -> AsyncIterator[Tuple[str, Dict]]:
+    """Parse a Server-Sent Events body into (event, data) pairs, skipping comments."""
+    event, data = None, []
+    async for line in response.aiter_lines():
+        if line.startswith("event: "):
+            event = line[len("event: "):]
+        elif line.startswith("data: "):
+            data.append(line[len("data: "):])
+        elif not line and event:
+            yield event, json.loads("\n".join(data))
+            event, data = None, []
+
+
+async def check(session_pool, base_url: str, token: str, assignment_id: int, student_id: int) -> int:
+    """Run the steps against the stream, print the results and return the number of failed steps."""
+    failures = 0
+    async with httpx.AsyncClient(base_url=base_url, headers={"Authorization": f"Bearer {token}"}) as client:
+        async with client.stream("GET", f"/assignments/{assignment_id}/live", timeout=None) as response:
+            response.raise_for_status()
+            events = sse_events(response)
+            event, data = await asyncio.wait_for(anext(events), EVENT_TIMEOUT)
+            print(f"{'ok' if event == 'snapshot' else 'FAIL':4}  snapshot  {data}")
+            failures += event != "snapshot"
+
+            for step in STEPS:
+                async with session_pool() as session:
+                    await RequestsRepo(session).questionnaires.submit_response(assignment_id, student_id, step.answers)
+                try:
+                    event, data = await asyncio.wait_for(anext(events), EVENT_TIMEOUT)
+                except (asyncio.TimeoutError, StopAsyncIteration):
+                    # A timeout also ends the stream, the next steps fail right away
+                    event, data = None, {}
+                received = {"responses": data.get("responses"), "options": data.get("options")}
+                failed = event != "response" or received != step.expected
+                failures += failed
+                print(f"{'FAIL' if failed else 'ok':4}  {step.name:16} got {event} {received}"
+                      + (f", expected response {step.expected}" if failed else ""))
+    return failures
+
+
+async def run(config: Config) -> int:
+    engine = create_engine(config.db)
+    session_pool = create_session_pool(engine)
+    sock = socket.socket()
+    sock.bind(("127.0.0.1", 0))
+    server = uvicorn.Server(uvicorn.Config(create_app(config), log_level="warning"))
+    serving = asyncio.create_task(server.serve(sockets=[sock]))
+    try:
+        data = await seed(session_pool)
+        [assignment_id] = await seed_assignments(session_pool, data, 1)
+        while not server.started:
+            if serving.done():
+                serving.result()
+            await asyncio.sleep(0.05)
+        host, port = sock.getsockname()
+        return await check(
+            session_pool, f"http://{host}:{port}", admin_token(config, data), assignment_id, data.student_id
+        )
+    finally:
+        server.should_exit = True
+        await serving
+        await engine.dispose()
+
+
+def main():
+    logging.basicConfig(level=logging.WARNING)
+    config = load_perf_config()
+    prepare_database(config)
+    failures = asyncio.run(run(config))
+    if failures:
+        print(f"{failures} live stream check(s) failed")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,265 @@
+"""
+Replay synthetic update streams through the bot's dispatcher at a target rate.
+
+Builds realistic traffic - students opening `/start q_<id>` deep links,
+mentors walking through `/assign` (pagination, selection, confirmation) and
+the bot being added to groups - and feeds it into the dispatcher built by
+`bot.create_dispatcher` with a fake Bot API session. Updates of one user are
+sent one after another, different users run concurrently, like polling does.
+
+Reports sustained updates/sec, per-handler latency percentiles, database
+pool saturation and event loop lag. Exits with 1 when any update failed.
+
+Usage:
+    python -m scripts.perf.replay --rate 200 --duration 60 --telegram-latency 0.05
+"""
+import argparse
+import asyncio
+import logging
+import random
+import sys
+import time
+from collections import Counter, defaultdict
+from dataclasses import dataclass, field
+from typing import Any, Awaitable, Callable, Dict, List
+
+from aiogram import BaseMiddleware, Bot, Dispatcher
+from aiogram.fsm.storage.memory import MemoryStorage
+from aiogram.types import Update
+
+from bot import create_bot, create_dispatcher
+from infrastructure.database.models import UserRole
+from infrastructure.database.pool import pool_status
+from infrastructure.database.setup import create_engine, create_session_pool
+from scripts.perf.bench import percentile
+from scripts.perf.environment import (
+    Seed, load_perf_config, prepare_database, seed, seed_users, seed_questionnaires, seed_assignments,
+)
+from scripts.perf.fake_session import FakeTelegramSession
+from scripts.perf.updates import message_update, callback_update, my_chat_member_update
+from tgbot.config import Config
+
+STUDENTS_FROM = 910000000
+MENTORS_FROM = 920000000
+NEW_GROUPS_FROM = -1009100000000
+
+
+@dataclass
+class Population:
+    """Who sends the synthetic updates."""
+
+    data: Seed
+    students: List[int]
+    mentors: List[int]
+    questionnaire_ids: List[int]
+    joined_groups: int = 0
+
+
+@dataclass
+class Scenario:
+    """A sequence of updates sent by one user, one after another."""
+
+    name: str
+    weight: float
+    build: Callable[[Bot, Population, random.Random], List[Update]]
+
+
+def deep_link(bot: Bot, population: Population, rnd: random.Random) -> List[Update]:
+    assignment_id = rnd.choice(population.data.assignment_ids)
+    return [message_update(bot, rnd.choice(population.students), f"/start q_{assignment_id}")]
+
+
+def assign_flow(bot: Bot, population: Population, rnd: random.Random) -> List[Update]:
+    mentor = rnd.choice(population.mentors)
+    questionnaire_id = rnd.choice(population.questionnaire_ids)
+    return [
+        message_update(bot, mentor, "/assign"),
+        callback_update(bot, mentor, "page_1"),
+        callback_update(bot, mentor, "page_0"),
+        callback_update(bot, mentor, f"questionnaire_{questionnaire_id}"),
+        callback_update(bot, mentor, f"toggle_group_{population.data.group_id}"),
+        callback_update(bot, mentor, "groups_selected"),
+        callback_update(bot, mentor, "confirm_assignment"),
+    ]
+
+
+def group_join(bot: Bot, population: Population, rnd: random.Random) -> List[Update]:
+    population.joined_groups += 1
+    chat_id = NEW_GROUPS_FROM - population.joined_groups
+    return [my_chat_member_update(bot, population.data.admin_id, chat_id)]
+
+
+SCENARIOS = [
+    Scenario("deep_link", 0.80, deep_link),
+    Scenario("assign_flow", 0.15, assign_flow),
+    Scenario("group_join", 0.05, group_join),
+]
+
+
+@dataclass
+class Recording:
+    latencies: Dict[str, List[float]] = field(default_factory=lambda: defaultdict(list))
+    errors: Counter = field(default_factory=Counter)
+    completed: int = 0
+    failed: int = 0
+    loop_lag: List[float] = field(default_factory=list)
+    pool_samples: List[dict] = field(default_factory=list)
+
+
+class RecorderMiddleware(BaseMiddleware):
+    """Outer update middleware, inside the metrics one, that keeps raw latencies per handler."""
+
+    def __init__(self, recording: Recording) -> None:
+        self.recording = recording
+
+    async def __call__(
+            self,
+            handler: Callable[[Update, Dict[str, Any]], Awaitable[Any]],
+            event: Update,
+            data: Dict[str, Any],
+    ) -> Any:
+        metrics = data["update_metrics"]
+        started = time.perf_counter()
+        try:
+            return await handler(event, data)
+        except Exception:
+            self.recording.errors[f"{metrics.router}.{metrics.handler}"] += 1
+            raise
+        finally:
+            self.recording.latencies[f"{metrics.router}.{metrics.handler}"].append(time.perf_counter() - started)
+            self.recording.completed += 1
+
+
+async def play(dp: Dispatcher, bot: Bot, updates: List[Update], recording: Recording) -> None:
+    for update in updates:
+        try:
+            await dp.feed_update(bot, update)
+        except Exception:
+            # Counted per handler by the recorder, the first one is logged with its traceback
+            if not recording.failed:
+                logging.exception("Update %s failed", update.update_id)
+            recording.failed += 1
+
+
+async def watch_loop_lag(recording: Recording, interval: float = 0.05) -> None:
+    while True:
+        started = time.perf_counter()
+        await asyncio.sleep(interval)
+        recording.loop_lag.append(max(0.0, time.perf_counter() - started - interval))
+
+
+async def watch_pool(recording: Recording, engine, interval: float = 0.25) -> None:
+    while True:
+        recording.pool_samples.append(pool_status(engine))
+        await asyncio.sleep(interval)
+
+
+async def replay(dp: Dispatcher, bot: Bot, population: Population, recording: Recording, rate: float,
+                 duration: float, seed_value: int) -> float:
+    """Feed scenarios at `rate` updates/sec for `duration` seconds, return the elapsed time."""
+    rnd = random.Random(seed_value)
+    weights = [scenario.weight for scenario in SCENARIOS]
+    tasks = set()
+
+    started = time.perf_counter()
+    sent = 0
+    while time.perf_counter() - started < duration:
+        scenario = rnd.choices(SCENARIOS, weights)[0]
+        updates = scenario.build(bot, population, rnd)
+        task = asyncio.create_task(play(dp, bot, updates, recording))
+        tasks.add(task)
+        task.add_done_callback(tasks.discard)
+
+        sent += len(updates)
+        delay = started + sent / rate - time.perf_counter()
+        if delay > 0:
+            await asyncio.sleep(delay)
+
+    if tasks:
+        await asyncio.wait(tasks, timeout=60)
+    return time.perf_counter() - started
+
+
+def report(recording: Recording, elapsed: float, rate: float) -> None:
+    print(f"Target {rate:.0f} updates/sec, sustained {recording.completed / elapsed:.1f} updates/sec "
+          f"({recording.completed} updates in {elapsed:.1f} s)")
+
+    print(f"\n{'handler':44} {'count':>7} {'errors':>7} {'p50 ms':>9} {'p95 ms':>9} {'p99 ms':>9}")
+    for label, latencies in sorted(recording.latencies.items()):
+        latencies.sort()
+        print(
+            f"{label:44} {len(latencies):>7} {recording.errors[label]:>7} "
+            f"{percentile(latencies, 50) * 1000:>9.1f} {percentile(latencies, 95) * 1000:>9.1f} "
+            f"{percentile(latencies, 99) * 1000:>9.1f}"
+        )
+
+    if recording.pool_samples:
+        last = recording.pool_samples[-1]
+        print(
+            f"\nDB pool: size {last['size']}, max checked out "
+            f"{max(s['checked_out'] for s in recording.pool_samples)}, max overflow "
+            f"{max(s['overflow'] for s in recording.pool_samples)}/{last['max_overflow']}, "
+            f"checkout waits {last.get('wait_seconds_total', 0):.3f} s total, "
+            f"{last.get('wait_seconds_max', 0) * 1000:.1f} ms max, timeouts {last.get('timeouts', 0)}"
+        )
+
+    if recording.loop_lag:
+        lag = sorted(recording.loop_lag)
+        print(f"Event loop lag: p50 {percentile(lag, 50) * 1000:.1f} ms, p99 {percentile(lag, 99) * 1000:.1f} ms, "
+              f"max {lag[-1] * 1000:.1f} ms")
+
+
+async def run(config: Config, args) -> int:
+    engine = create_engine(config.db)
+    session_pool = create_session_pool(engine)
+    try:
+        data = await seed(session_pool)
+        population = Population(
+            data=data,
+            students=await seed_users(session_pool, STUDENTS_FROM, args.students, UserRole.STUDENT),
+            mentors=await seed_users(session_pool, MENTORS_FROM, args.mentors, UserRole.MENTOR),
+            questionnaire_ids=[data.questionnaire_id] + await seed_questionnaires(session_pool, data, 30),
+        )
+        await seed_assignments(session_pool, data, 50)
+
+        bot = create_bot(config, session=FakeTelegramSession(latency=args.telegram_latency))
+        dp = create_dispatcher(config, MemoryStorage(), engine, session_pool)
+        recording = Recording()
+        dp.update.outer_middleware(RecorderMiddleware(recording))
+
+        watchers = [
+            asyncio.create_task(watch_loop_lag(recording)),
+            asyncio.create_task(watch_pool(recording, engine)),
+        ]
+        try:
+            elapsed = await replay(dp, bot, population, recording, args.rate, args.duration, args.seed)
+        finally:
+            for watcher in watchers:
+                watcher.cancel()
+        report(recording, elapsed, args.rate)
+        return recording.failed
+    finally:
+        await engine.dispose()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rate", type=float, default=100, help="target updates per second")
+    parser.add_argument("--duration", type=float, default=30, help="seconds to keep sending")
+    parser.add_argument("--students", type=int, default=2000)
+    parser.add_argument("--mentors", type=int, default=40)
+    parser.add_argument("--telegram-latency", type=float, default=0.05, help="fake Bot API latency, seconds")
+    parser.add_argument("--seed", type=int, default=1, help="random seed of the update stream")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.WARNING)
+    config = load_perf_config()
+    prepare_database(config)
+    failed = asyncio.run(run(config, args))
+    if failed:
+        print(f"\n{failed} updates failed")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
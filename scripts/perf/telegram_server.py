@@ -0,0 +1,205 @@
+"""
+Local stand-in for the Telegram Bot API.
+
+Serves the methods the bot, the API and the worker call (sendMessage,
+sendDocument, editMessageText, editMessageReplyMarkup, answerCallbackQuery,
+getChatMember, getChatAdministrators, getMe) with plausible results, so
+broadcasts and throughput tests run offline. Point the processes at it with
+`BOT_API_URL=http://localhost:8081`.
+
+Like Telegram, it limits outgoing messages: `--global-rate` per second per
+bot, one per second per private chat and `--group-rate` per minute per group.
+Calls over a limit get HTTP 429 with `retry_after`. Latency (`--latency`,
+`--jitter`) and failures (`--error-rate` for 502 Bad Gateway,
+`--forbidden-rate` for "bot was blocked by the user") can be injected.
+`GET /stats` returns the call counters.
+
+Usage:
+    python -m scripts.perf.telegram_server --port 8081 --latency 0.05 --error-rate 0.01
+"""
+import argparse
+import asyncio
+import itertools
+import json
+import math
+import random
+import time
+from collections import Counter, deque
+from dataclasses import dataclass
+from typing import Any, Deque, Dict, Optional
+
+from aiohttp import web
+
+from scripts.perf.fake_session import fake_result
+
+SUPPORTED_METHODS = {
+    "sendMessage",
+    "sendDocument",
+    "editMessageText",
+    "editMessageReplyMarkup",
+    "answerCallbackQuery",
+    "getChatMember",
+    "getChatAdministrators",
+    "getMe",
+}
+RATE_LIMITED_METHODS = {"sendMessage", "sendDocument", "editMessageText", "editMessageReplyMarkup"}
+
+
+@dataclass
+class ServerSettings:
+    """Limits and fault injection of the fake server."""
+
+    latency: float = 0.0
+    jitter: float = 0.0
+    global_rate: int = 30
+    private_chat_rate: int = 1
+    group_rate: int = 20
+    error_rate: float = 0.0
+    forbidden_rate: float = 0.0
+
+
+class SlidingWindow:
+    """Allows at most `limit` events per `period` seconds."""
+
+    def __init__(self, limit: int, period: float) -> None:
+        self.limit = limit
+        self.period = period
+        self.events: Deque[float] = deque()
+
+    def retry_after(self, now: float) -> int:
+        """Register an event, or return the seconds to wait when the window is full."""
+        while self.events and now - self.events[0] >= self.period:
+            self.events.popleft()
+        if len(self.events) >= self.limit:
+            return max(1, math.ceil(self.period - (now - self.events[0])))
+        self.events.append(now)
+        return 0
+
+
+class FakeTelegramServer:
+    def __init__(self, settings: ServerSettings, seed: Optional[int] = None) -> None:
+        self.settings = settings
+        self.random = random.Random(seed)
+        self.calls: Counter = Counter()
+        self.rejected: Counter = Counter()
+        self._message_ids = itertools.count(1)
+        self._global: Dict[str, SlidingWindow] = {}
+        self._chats: Dict[Any, SlidingWindow] = {}
+        self._started = time.monotonic()
+
+    def app(self) -> web.Application:
+        app = web.Application()
+        app.router.add_get("/stats", self.stats)
+        app.router.add_route("*", "/bot{token}/{method}", self.handle)
+        return app
+
+    async def handle(self, request: web.Request) -> web.Response:
+        method = request.match_info["method"]
+        self.calls[method] += 1
+        if method not in SUPPORTED_METHODS:
+            return self._error(method, 404, "Not Found: method not found")
+
+        params = await self._params(request)
+        if self.settings.latency or self.settings.jitter:
+            await asyncio.sleep(max(0.0, self.random.gauss(self.settings.latency, self.settings.jitter)))
+
+        if self.random.random() < self.settings.error_rate:
+            return self._error(method, 502, "Bad Gateway")
+
+        if method in RATE_LIMITED_METHODS:
+            if self.random.random() < self.settings.forbidden_rate:
+                return self._error(method, 403, "Forbidden: bot was blocked by the user")
+            retry_after = self._retry_after(request.match_info["token"], params.get("chat_id"))
+            if retry_after:
+                return self._error(
+                    method, 429, f"Too Many Requests: retry after {retry_after}", {"retry_after": retry_after}
+                )
+
+        return web.json_response({"ok": True, "result": fake_result(method, params, self._message_ids)})
+
+    async def stats(self, request: web.Request) -> web.Response:
+        elapsed = time.monotonic() - self._started
+        return web.json_response({
+            "uptime_seconds": round(elapsed, 1),
+            "calls": dict(self.calls),
+            "rejected": {f"{method} {status}": count for (method, status), count in self.rejected.items()},
+            "calls_per_second": round(sum(self.calls.values()) / elapsed, 1) if elapsed else 0,
+        })
+
+    def _retry_after(self, token: str, chat_id: Any) -> int:
+        now = time.monotonic()
+        if token not in self._global:
+            self._global[token] = SlidingWindow(self.settings.global_rate, 1)
+        chat_window = None
+        if chat_id is not None:
+            key = (token, str(chat_id))
+            if key not in self._chats:
+                is_group = str(chat_id).startswith("-")
+                self._chats[key] = (
+                    SlidingWindow(self.settings.group_rate, 60) if is_group
+                    else SlidingWindow(self.settings.private_chat_rate, 1)
+                )
+            chat_window = self._chats[key]
+
+        # Check the chat first so a rejected call does not use up the global budget
+        if chat_window is not None:
+            retry_after = chat_window.retry_after(now)
+            if retry_after:
+                return retry_after
+        return self._global[token].retry_after(now)
+
+    def _error(self, method: str, status: int, description: str,
+               parameters: Optional[dict] = None) -> web.Response:
+        self.rejected[(method, status)] += 1
+        payload = {"ok": False, "error_code": status, "description": description}
+        if parameters:
+            payload["parameters"] = parameters
+        return web.json_response(payload, status=status)
+
+    @staticmethod
+    async def _params(request: web.Request) -> Dict[str, Any]:
+        if request.content_type == "application/json":
+            return await request.json()
+        if request.method == "POST":
+            form = await request.post()
+            params = {key: value for key, value in form.items() if isinstance(value, str)}
+        else:
+            params = dict(request.query)
+        # aiogram sends nested objects as JSON strings in form data
+        for key in ("reply_markup", "entities"):
+            if key in params:
+                try:
+                    params[key] = json.loads(params[key])
+                except ValueError:
+                    pass
+        return params
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8081)
+    parser.add_argument("--latency", type=float, default=0.0, help="mean response latency, seconds")
+    parser.add_argument("--jitter", type=float, default=0.0, help="standard deviation of the latency, seconds")
+    parser.add_argument("--global-rate", type=int, default=30, help="messages per second per bot")
+    parser.add_argument("--private-chat-rate", type=int, default=1, help="messages per second per private chat")
+    parser.add_argument("--group-rate", type=int, default=20, help="messages per minute per group")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="share of calls failing with 502")
+    parser.add_argument("--forbidden-rate", type=float, default=0.0, help="share of messages failing with 403")
+    parser.add_argument("--seed", type=int, help="random seed of the injected latency and failures")
+    args = parser.parse_args()
+
+    settings = ServerSettings(
+        latency=args.latency,
+        jitter=args.jitter,
+        global_rate=args.global_rate,
+        private_chat_rate=args.private_chat_rate,
+        group_rate=args.group_rate,
+        error_rate=args.error_rate,
+        forbidden_rate=args.forbidden_rate,
+    )
+    web.run_app(FakeTelegramServer(settings, args.seed).app(), host=args.host, port=args.port)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,78 @@
+import itertools
+import time
+from typing import Optional
+
+from aiogram import Bot
+from aiogram.types import Update
+
+from scripts.perf.fake_session import BOT_USER
+
+_update_ids = itertools.count(1)
+
+
+def _user(user_id: int) -> dict:
+    return {
+        "id": user_id,
+        "is_bot": False,
+        "first_name": f"User {user_id}",
+        "username": f"user{user_id}",
+        "language_code": "en",
+    }
+
+
+def _chat(chat_id: int) -> dict:
+    if chat_id > 0:
+        return {"id": chat_id, "type": "private", "first_name": f"User {chat_id}"}
+    return {"id": chat_id, "type": "supergroup", "title": f"Group {chat_id}"}
+
+
+def build_update(bot: Bot, payload: dict) -> Update:
+    """Wrap an update payload into an `Update` bound to `bot`."""
+    payload = {"update_id": next(_update_ids), **payload}
+    return Update.model_validate(payload, context={"bot": bot})
+
+
+def message_update(bot: Bot, user_id: int, text: str, chat_id: Optional[int] = None) -> Update:
+    """A text message, e.g. a command, sent by `user_id`."""
+    message = {
+        "message_id": next(_update_ids),
+        "date": int(time.time()),
+        "chat": _chat(chat_id or user_id),
+        "from": _user(user_id),
+        "text": text,
+    }
+    if text.startswith("/"):
+        command = text.split()[0]
+        message["entities"] = [{"type": "bot_command", "offset": 0, "length": len(command)}]
+    return build_update(bot, {"message": message})
+
+
+def callback_update(bot: Bot, user_id: int, data: str, message_id: int = 1) -> Update:
+    """An inline keyboard button press by `user_id` on a message of the bot."""
+    callback_query = {
+        "id": str(next(_update_ids)),
+        "from": _user(user_id),
+        "chat_instance": str(user_id),
+        "data": data,
+        "message": {
+            "message_id": message_id,
+            "date": int(time.time()),
+            "chat": _chat(user_id),
+            "from": BOT_USER,
+            "text": "Select questionnaire:",
+        },
+    }
+    return build_update(bot, {"callback_query": callback_query})
+
+
+def my_chat_member_update(bot: Bot, user_id: int, chat_id: int, joined: bool = True) -> Update:
+    """The bot being added to (or removed from) group `chat_id` by `user_id`."""
+    old_status, new_status = ("left", "member") if joined else ("member", "left")
+    my_chat_member = {
+        "chat": _chat(chat_id),
+        "from": _user(user_id),
+        "date": int(time.time()),
+        "old_chat_member": {"status": old_status, "user": BOT_USER},
+        "new_chat_member": {"status": new_status, "user": BOT_USER},
+    }
+    return build_update(bot, {"my_chat_member": my_chat_member})
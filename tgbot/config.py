@@ -1,4 +1,5 @@
 from dataclasses import dataclass
+from functools import lru_cache
 from typing import Optional, List
 from sqlalchemy.engine.url import URL
 from environs import Env
@@ -22,6 +23,27 @@ class DbConfig:
         The name of the database.
     port : int
         The port where the database server is listening.
+    pool_size : int
+        The number of connections kept open in the pool (default is 10).
+    max_overflow : int
+        The number of extra connections allowed above `pool_size` under load (default is 5).
+    pool_timeout : float
+        Seconds to wait for a free connection before giving up (default is 30).
+    pool_recycle : int
+        Seconds after which a pooled connection is replaced, -1 disables recycling (default is 1800).
+    pool_pre_ping : bool
+        Whether to test connections for liveness on checkout (default is True).
+    pool_warmup : int
+        How many pooled connections to open before the process reports ready (default is 5).
+    slow_query_ms : int
+        Statements running longer than this many milliseconds go to the slow-query log,
+        0 disables the log (default is 200).
+    replica_host : Optional(str)
+        The host of a streaming replica for read-only queries, none by default.
+    replica_port : Optional(int)
+        The port of the replica (default is `port`).
+    replica_max_lag : float
+        Seconds of replication lag above which reads fall back to the primary (default is 5).
     """
 
     host: str
@@ -29,6 +51,16 @@ class DbConfig:
     user: str
     database: str
     port: int = 5432
+    pool_size: int = 10
+    max_overflow: int = 5
+    pool_timeout: float = 30
+    pool_recycle: int = 1800
+    pool_pre_ping: bool = True
+    pool_warmup: int = 5
+    slow_query_ms: int = 200
+    replica_host: Optional[str] = None
+    replica_port: Optional[int] = None
+    replica_max_lag: float = 5
 
     # For SQLAlchemy
     def construct_sqlalchemy_url(self, driver="asyncpg", host=None, port=None) -> str:
@@ -60,8 +92,32 @@ class DbConfig:
         user = env.str("POSTGRES_USER")
         database = env.str("POSTGRES_DB")
         port = env.int("DB_PORT", 5432)
+        pool_size = env.int("DB_POOL_SIZE", 10)
+        max_overflow = env.int("DB_MAX_OVERFLOW", 5)
+        pool_timeout = env.float("DB_POOL_TIMEOUT", 30)
+        pool_recycle = env.int("DB_POOL_RECYCLE", 1800)
+        pool_pre_ping = env.bool("DB_POOL_PRE_PING", True)
+        pool_warmup = env.int("DB_POOL_WARMUP", 5)
+        slow_query_ms = env.int("DB_SLOW_QUERY_MS", 200)
+        replica_host = env.str("DB_REPLICA_HOST", None)
+        replica_port = env.int("DB_REPLICA_PORT", None)
+        replica_max_lag = env.float("DB_REPLICA_MAX_LAG", 5)
         return DbConfig(
-            host=host, password=password, user=user, database=database, port=port
+            host=host,
+            password=password,
+            user=user,
+            database=database,
+            port=port,
+            pool_size=pool_size,
+            max_overflow=max_overflow,
+            pool_timeout=pool_timeout,
+            pool_recycle=pool_recycle,
+            pool_pre_ping=pool_pre_ping,
+            pool_warmup=pool_warmup,
+            slow_query_ms=slow_query_ms,
+            replica_host=replica_host,
+            replica_port=replica_port,
+            replica_max_lag=replica_max_lag,
         )
 
 
@@ -69,11 +125,18 @@ class DbConfig:
 class TgBot:
     """
     Creates the TgBot object from environment variables.
+
+    Attributes
+    ----------
+    api_url : Optional(str)
+        Base URL of the Bot API server, e.g. `http://localhost:8081` for the fake server
+        in `scripts/perf`. The official `https://api.telegram.org` is used when not set.
     """
 
     token: str
     admin_ids: List[int]
     use_redis: bool
+    api_url: Optional[str] = None
 
     @staticmethod
     def from_env(env: Env):
@@ -83,7 +146,8 @@ class TgBot:
         token = env.str("BOT_TOKEN")
         admin_ids = env.list("ADMINS", subcast=int)
         use_redis = env.bool("USE_REDIS")
-        return TgBot(token=token, admin_ids=admin_ids, use_redis=use_redis)
+        api_url = env.str("BOT_API_URL", None)
+        return TgBot(token=token, admin_ids=admin_ids, use_redis=use_redis, api_url=api_url)
 
 
 @dataclass
@@ -164,6 +228,93 @@ class AuthConfig:
             access_token_expire_minutes=access_token_expire_minutes
         )
 
+@dataclass
+class MetricsConfig:
+    """
+    Metrics endpoint configuration class.
+
+    Attributes
+    ----------
+    enabled : bool
+        Whether the bot serves Prometheus metrics (default is True).
+    host : str
+        The host the metrics endpoint binds to (default is 0.0.0.0).
+    port : int
+        The port the metrics endpoint listens on (default is 9101).
+    """
+
+    enabled: bool = True
+    host: str = "0.0.0.0"
+    port: int = 9101
+
+    @staticmethod
+    def from_env(env: Env):
+        """
+        Creates the MetricsConfig object from environment variables.
+        """
+        enabled = env.bool("METRICS_ENABLED", True)
+        host = env.str("METRICS_HOST", "0.0.0.0")
+        port = env.int("METRICS_PORT", 9101)
+
+        return MetricsConfig(enabled=enabled, host=host, port=port)
+
+
+@dataclass
+class StreamConfig:
+    """
+    Redis Stream ingestion configuration class, used by `python -m bot receiver` and `python -m bot worker`.
+
+    Attributes
+    ----------
+    shards : int
+        The number of streams updates are sharded into by chat id; should be several times
+        the number of workers (default is 16).
+    workers : int
+        The number of worker processes sharing the shards (default is 1).
+    prefix : str
+        The prefix of the stream keys, shard N is `<prefix>:N` (default is bot:updates).
+    group : str
+        The consumer group of the workers (default is bot-workers).
+    max_len : int
+        The approximate number of entries kept per stream (default is 100000).
+    max_deliveries : int
+        How many times an update is tried before it goes to the `<prefix>:dead` stream (default is 5).
+    claim_idle_ms : int
+        Entries pending this long with another consumer are taken over (default is 60000).
+    """
+
+    shards: int = 16
+    workers: int = 1
+    prefix: str = "bot:updates"
+    group: str = "bot-workers"
+    max_len: int = 100000
+    max_deliveries: int = 5
+    claim_idle_ms: int = 60000
+
+    @staticmethod
+    def from_env(env: Env):
+        """
+        Creates the StreamConfig object from environment variables.
+        """
+        shards = env.int("UPDATES_STREAM_SHARDS", 16)
+        workers = env.int("UPDATES_STREAM_WORKERS", 1)
+        prefix = env.str("UPDATES_STREAM_PREFIX", "bot:updates")
+        group = env.str("UPDATES_STREAM_GROUP", "bot-workers")
+        max_len = env.int("UPDATES_STREAM_MAX_LEN", 100000)
+        max_deliveries = env.int("UPDATES_STREAM_MAX_DELIVERIES", 5)
+        claim_idle_ms = env.int("UPDATES_STREAM_CLAIM_IDLE_MS", 60000)
+
+        return StreamConfig(
+            shards=shards,
+            workers=workers,
+            prefix=prefix,
+            group=group,
+            max_len=max_len,
+            max_deliveries=max_deliveries,
+            claim_idle_ms=claim_idle_ms,
+        )
+
+
 @dataclass
 class Miscellaneous:
     """
@@ -200,6 +351,10 @@ class Config:
         Holds the settings specific to Redis (default is None).
     auth : Optional[AuthConfig]
         Holds the settings specific to authentication (default is None).
+    metrics : Optional[MetricsConfig]
+        Holds the settings of the metrics endpoint (default is None).
+    stream : Optional[StreamConfig]
+        Holds the settings of the Redis Stream ingestion (default is None).
     """
 
     tg_bot: TgBot
@@ -207,6 +362,8 @@ class Config:
     db: Optional[DbConfig] = None
     redis: Optional[RedisConfig] = None
     auth: Optional[AuthConfig] = None
+    metrics: Optional[MetricsConfig] = None
+    stream: Optional[StreamConfig] = None
 
 
 def load_config(path: str = None) -> Config:
@@ -227,5 +384,21 @@ def load_config(path: str = None) -> Config:
         db=DbConfig.from_env(env),
         redis=RedisConfig.from_env(env),
         auth=AuthConfig.from_env(env),
+        metrics=MetricsConfig.from_env(env),
+        stream=StreamConfig.from_env(env),
         misc=Miscellaneous(),
     )
+
+
+@lru_cache(maxsize=None)
+def get_config(path: str = ".env") -> Config:
+    """
+    Return the configuration of the process, loading it on the first call only.
+
+    Every later call with the same `path` returns the same object, so the env
+    file is read once however many entry points ask for it. Use `load_config`
+    for a fresh copy to modify, e.g. to point it at another database.
+    :param path: The path of env file from where to load the configuration variables.
+    :return: The shared Config object.
+    """
+    return load_config(path)
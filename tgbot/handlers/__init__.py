@@ -3,12 +3,14 @@ from .admin import admin_router
 from .user import user_router
 from .group import group_router
 from .questionnaire import questionnaire_router
+from .inline import inline_router
 
 routers_list = [
     admin_router,
     user_router,
     group_router,
     questionnaire_router,
+    inline_router,
 ]
 
 __all__ = [
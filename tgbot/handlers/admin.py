@@ -1,13 +1,25 @@
 from aiogram import Router
-from aiogram.filters import CommandStart
+from aiogram.filters import CommandStart, Command
 from aiogram.types import Message
+from sqlalchemy.ext.asyncio import AsyncEngine
 
+from infrastructure.database.pool import pool_status
 from tgbot.filters.admin import AdminFilter
 
-admin_router = Router()
+admin_router = Router(name="admin")
 admin_router.message.filter(AdminFilter())
 
 
 # @admin_router.message(CommandStart())
 # async def admin_start(message: Message):
 #     await message.reply("Hello, World Debug!")
+
+
+@admin_router.message(Command("pool"))
+async def show_pool_status(message: Message, engine: AsyncEngine):
+    """Show connection pool gauges of the bot process"""
+    status = pool_status(engine)
+    await message.answer(
+        "🗄 Database pool\n\n"
+        + "\n".join(f"{name}: {value}" for name, value in status.items())
+    )
@@ -4,8 +4,9 @@ from aiogram.filters.chat_member_updated import ChatMemberUpdatedFilter, JOIN_TR
 from aiogram.enums import ChatMemberStatus
 from infrastructure.database.models import Group
 from infrastructure.database.repo.requests import RequestsRepo
+from tgbot.services.membership import MembershipRecorder
 
-group_router = Router()
+group_router = Router(name="group")
 
 
 def check_missing_permissions(bot_member: ChatMemberAdministrator) -> list[str]:
@@ -78,9 +79,7 @@ async def bot_status_updated(message: ChatMemberUpdated, repo: RequestsRepo):
 
             # Save group to database
             await repo.groups.create_or_update_group(
-                group_id=chat.id,
-                title=chat.title,
-                is_active=True
+                Group(group_id=chat.id, title=chat.title, type=chat.type, is_active=True)
             )
 
             # Prepare greeting message
@@ -122,6 +121,19 @@ async def bot_status_updated(message: ChatMemberUpdated, repo: RequestsRepo):
             print(error_text)
 
 
+@group_router.chat_member()
+async def member_status_updated(update: ChatMemberUpdated, membership: MembershipRecorder):
+    """Handler for members joining and leaving the group, the bot must be an administrator to get these"""
+    user = update.new_chat_member.user
+    if user.is_bot:
+        return
+    status = update.new_chat_member.status
+    is_member = status in (ChatMemberStatus.CREATOR, ChatMemberStatus.ADMINISTRATOR, ChatMemberStatus.MEMBER) or (
+        isinstance(update.new_chat_member, ChatMemberRestricted) and update.new_chat_member.is_member
+    )
+    membership.record(update.chat.id, user.id, is_member=is_member)
+
+
 # TODO: Implement this handler
 async def answer_to_questionnaire(message: Message):
     """Handler for answering to questionnaire"""
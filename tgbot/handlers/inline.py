@@ -0,0 +1,145 @@
+import asyncio
+import logging
+import re
+from datetime import datetime
+from functools import partial
+from typing import Dict
+
+from aiogram import Router, F
+from aiogram.types import (
+    CallbackQuery,
+    InlineQuery,
+    InlineQueryResultArticle,
+    InputTextMessageContent,
+)
+from aiogram.utils.text_decorations import html_decoration
+
+from infrastructure.database.repo.requests import RequestsRepo
+from tgbot.handlers.questionnaire import DEFAULT_ASSIGNMENT_DURATION
+from tgbot.keyboards.inline import get_inline_assign_keyboard, get_inline_pick_group_keyboard
+from tgbot.services.inline_index import InlineIndex
+from tgbot.services.notifications import notify_groups_about_assignments
+
+inline_router = Router(name="inline")
+
+# Telegram shows at most 50 results per answer
+INLINE_RESULTS_LIMIT = 20
+# Seconds Telegram may answer the same query of the same user from its own cache
+INLINE_CACHE_TIME = 30
+# A query is only answered if the user typed nothing else for this long
+DEBOUNCE_SECONDS = 0.3
+
+# "q<questionnaire_id> <group query>" lists the groups for a questionnaire
+GROUP_QUERY = re.compile(r"^q(\d+)(?:\s+(.*))?$", re.DOTALL)
+
+# Answer waiting for the user to stop typing, by user
+_pending_answers: Dict[int, asyncio.Task] = {}
+
+
+@inline_router.inline_query()
+async def inline_search(query: InlineQuery, inline_index: InlineIndex):
+    """`@bot <title>` lists questionnaires, `@bot q<id> <group>` the groups to assign one to"""
+    # The answer waits in a task, not in the handler: updates may be fed one at a time
+    # (see tgbot.services.update_stream), a sleeping handler would hold back the next keystroke
+    user_id = query.from_user.id
+    pending = _pending_answers.get(user_id)
+    if pending is not None:
+        pending.cancel()
+    task = asyncio.create_task(_answer_when_idle(query, inline_index))
+    _pending_answers[user_id] = task
+    task.add_done_callback(partial(_forget_answer, user_id))
+
+
+def _forget_answer(user_id: int, task: asyncio.Task) -> None:
+    # A cancelled answer was already replaced by the newer one
+    if _pending_answers.get(user_id) is task:
+        del _pending_answers[user_id]
+
+
+async def _answer_when_idle(query: InlineQuery, inline_index: InlineIndex) -> None:
+    """Answer the query unless the user types on within `DEBOUNCE_SECONDS`, which cancels this"""
+    await asyncio.sleep(DEBOUNCE_SECONDS)
+    try:
+        await _answer(query, inline_index)
+    except Exception:
+        logging.exception(f"Failed to answer inline query {query.id}")
+
+
+async def _answer(query: InlineQuery, inline_index: InlineIndex) -> None:
+    await inline_index.ensure_loaded()
+    if not inline_index.can_assign(query.from_user.id):
+        await query.answer([], cache_time=INLINE_CACHE_TIME, is_personal=True)
+        return
+
+    match = GROUP_QUERY.match(query.query.strip())
+    if match is None:
+        results = [
+            InlineQueryResultArticle(
+                id=f"q{entry.id}",
+                title=entry.title,
+                description=entry.description[:100],
+                input_message_content=InputTextMessageContent(
+                    message_text=f"📋 {html_decoration.quote(entry.title)}\n\nChoose a group to assign it to:"
+                ),
+                reply_markup=get_inline_pick_group_keyboard(entry.id),
+            )
+            for entry in inline_index.search("questionnaires", query.query, INLINE_RESULTS_LIMIT)
+        ]
+    else:
+        questionnaire_id = int(match.group(1))
+        questionnaire = inline_index.questionnaires.entries.get(questionnaire_id)
+        groups = inline_index.search("groups", match.group(2) or "", INLINE_RESULTS_LIMIT) \
+            if questionnaire is not None else []
+        results = [
+            InlineQueryResultArticle(
+                id=f"g{questionnaire_id}_{group.id}",
+                title=group.title,
+                description=f"Assign «{questionnaire.title}»",
+                input_message_content=InputTextMessageContent(
+                    message_text=f"Assign «{html_decoration.quote(questionnaire.title)}» "
+                                 f"to {html_decoration.quote(group.title)}?"
+                ),
+                reply_markup=get_inline_assign_keyboard(questionnaire_id, group.id),
+            )
+            for group in groups
+        ]
+
+    await query.answer(results, cache_time=INLINE_CACHE_TIME, is_personal=True)
+
+
+@inline_router.callback_query(F.data.startswith("inline_assign:"))
+async def inline_assign(callback: CallbackQuery, repo: RequestsRepo):
+    """The Assign button of a message sent from the inline group results"""
+    # Anyone in the chat the message was sent to can press the button
+    user = await repo.users.get_user(callback.from_user.id)
+    if not user or not (user.is_admin() or user.is_mentor()):
+        await callback.answer("You don't have permission to assign questionnaires.", show_alert=True)
+        return
+
+    _, questionnaire_id, group_id = callback.data.split(":")
+    questionnaire = await repo.questionnaires.get_questionnaire(int(questionnaire_id))
+    if questionnaire is None:
+        await callback.answer("❌ Questionnaire not found.", show_alert=True)
+        return
+
+    [result] = await repo.questionnaires.assign_questionnaire_to_groups(
+        questionnaire_id=questionnaire.id,
+        group_ids=[int(group_id)],
+        due_date=datetime.now() + DEFAULT_ASSIGNMENT_DURATION,
+        created_by=callback.from_user.id
+    )
+    if result.error:
+        await callback.answer(f"❌ {result.error}", show_alert=True)
+        return
+
+    notified = await notify_groups_about_assignments(
+        callback.bot, [result.assignment], questionnaire, bot_username=(await callback.bot.me()).username
+    )
+    text = f"✅ «{html_decoration.quote(questionnaire.title)}» has been assigned to group {result.group_id}" + (
+        "" if notified.get(result.group_id) else " (announcement not delivered)"
+    )
+    await callback.answer()
+    if callback.inline_message_id:
+        await callback.bot.edit_message_text(text=text, inline_message_id=callback.inline_message_id)
+    elif callback.message:
+        await callback.message.edit_text(text)
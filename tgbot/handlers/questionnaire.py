@@ -1,19 +1,29 @@
 # tgbot/handlers/questionnaire.py
 from aiogram import Router, F
 from aiogram.types import Message, CallbackQuery
-from aiogram.filters import Command
-from infrastructure.database.repo.users import UserRepo
+from aiogram.filters import Command, CommandObject
+from aiogram.utils.text_decorations import html_decoration
+from infrastructure.database.repo.requests import RequestsRepo
+from infrastructure.database.models import JobKind
+from tgbot.services.notifications import notify_groups_about_assignments
 from tgbot.keyboards.inline import (
-    get_questionnaire_button, get_done_button,
-    get_questionnaires_keyboard, get_groups_keyboard,
+    get_done_button,
+    get_questionnaires_keyboard, get_groups_multiselect_keyboard,
     get_confirm_cancel_assignment_keyboard,
-    get_active_assignments_keyboard, get_confirm_cancel_close_keyboard
+    get_active_assignments_keyboard, get_confirm_cancel_close_keyboard,
+    QUESTIONNAIRES_PER_PAGE
 )
 from aiogram.fsm.state import State, StatesGroup
 from aiogram.fsm.context import FSMContext
-from datetime import datetime
+from datetime import datetime, timedelta
 
-questionnaire_router = Router()
+questionnaire_router = Router(name="questionnaire")
+
+# Questionnaires don't store a deadline yet, assignments made from the bot get this one
+DEFAULT_ASSIGNMENT_DURATION = timedelta(days=7)
+
+# "/assign <search query>" lists at most this many matches, best first
+SEARCH_RESULTS_LIMIT = 5 * QUESTIONNAIRES_PER_PAGE
 
 
 # Add states for the assignment process
@@ -26,10 +36,10 @@ class AssignmentStates(StatesGroup):
 
 
 @questionnaire_router.message(Command("new_questionnaire"))
-async def create_questionnaire(message: Message, state: FSMContext, repo: UserRepo):
+async def create_questionnaire(message: Message, state: FSMContext, repo: RequestsRepo):
     # Check if user is admin or mentor
-    user = await repo.get_user(message.from_user.id)
-    if not (user.is_admin() or user.is_mentor()):
+    user = await repo.users.get_user(message.from_user.id)
+    if not user or not (user.is_admin() or user.is_mentor()):
         await message.answer("You don't have permission to create questionnaires.")
         return
 
@@ -138,11 +148,11 @@ async def review_questionnaire(callback: CallbackQuery, state: FSMContext):
 
 
 @questionnaire_router.callback_query(F.data == "confirm_questionnaire")
-async def save_questionnaire(callback: CallbackQuery, state: FSMContext, repo: UserRepo):
+async def save_questionnaire(callback: CallbackQuery, state: FSMContext, repo: RequestsRepo):
     data = await state.get_data()
 
     # Create questionnaire in DB
-    questionnaire = await repo.create_questionnaire(
+    questionnaire = await repo.questionnaires.create_questionnaire(
         title=data['title'],
         description=data['description'],
         questions=data['questions'],
@@ -163,19 +173,23 @@ async def cancel_questionnaire(callback: CallbackQuery, state: FSMContext):
     await callback.message.edit_text("❌ Questionnaire creation cancelled.")
 
 
-QUESTIONNAIRES_PER_PAGE = 6  # 2 columns × 3 rows
-
-
 @questionnaire_router.message(Command("assign"))
-async def assign_questionnaire(message: Message, state: FSMContext, repo: UserRepo):
+async def assign_questionnaire(message: Message, command: CommandObject, state: FSMContext, repo: RequestsRepo):
     # Check if user is admin or mentor
-    user = await repo.get_user(message.from_user.id)
-    if not (user.is_admin() or user.is_mentor()):
+    user = await repo.users.get_user(message.from_user.id)
+    if not user or not (user.is_admin() or user.is_mentor()):
         await message.answer("You don't have permission to assign questionnaires.")
         return
 
-    # Get questionnaires and store in state
-    questionnaires = await repo.get_all_questionnaires()
+    # Get questionnaires, or the ones matching "/assign <search query>", and store in state
+    if command.args:
+        results = await repo.questionnaires.search_questionnaires(command.args, limit=SEARCH_RESULTS_LIMIT)
+        questionnaires = [questionnaire for questionnaire, _ in results]
+        if not questionnaires:
+            await message.answer(f"No questionnaires match \"{html_decoration.quote(command.args)}\".")
+            return
+    else:
+        questionnaires = await repo.questionnaires.get_questionnaires()
     await state.update_data(
         questionnaires=questionnaires,
         current_page=0,
@@ -190,8 +204,12 @@ async def assign_questionnaire(message: Message, state: FSMContext, repo: UserRe
 
 @questionnaire_router.callback_query(F.data.startswith("page_"))
 async def handle_pagination(callback: CallbackQuery, state: FSMContext):
-    await callback.answer()
     data = await state.get_data()
+    if 'questionnaires' not in data:
+        # A button of an older /assign message, the flow it belonged to is over
+        await callback.answer("This list is outdated, use /assign again.", show_alert=True)
+        return
+    await callback.answer()
 
     # Get new page number
     new_page = int(callback.data.split("_")[1])
@@ -206,12 +224,12 @@ async def handle_pagination(callback: CallbackQuery, state: FSMContext):
 
 
 @questionnaire_router.callback_query(F.data.startswith("questionnaire_"))
-async def show_questionnaire_details(callback: CallbackQuery, state: FSMContext, repo: UserRepo):
+async def show_questionnaire_details(callback: CallbackQuery, state: FSMContext, repo: RequestsRepo):
     await callback.answer()
     questionnaire_id = int(callback.data.split("_")[1])
 
     # Get questionnaire details
-    questionnaire = await repo.get_questionnaire(questionnaire_id)
+    questionnaire = await repo.questionnaires.get_questionnaire(questionnaire_id)
     await state.update_data(selected_questionnaire=questionnaire)
 
     # Format questionnaire details
@@ -223,7 +241,8 @@ async def show_questionnaire_details(callback: CallbackQuery, state: FSMContext,
     )
 
     for i, q in enumerate(questionnaire.questions, 1):
-        details_text += f"\n{i}. {q['question']}\n"
+        # Questionnaires created through the API store the question as "text"
+        details_text += f"\n{i}. {q.get('text') or q.get('question')}\n"
         if q['type'] == 'multiple_choice':
             details_text += "Options: " + ", ".join(q['options']) + "\n"
         else:
@@ -233,29 +252,44 @@ async def show_questionnaire_details(callback: CallbackQuery, state: FSMContext,
     await callback.message.edit_text(details_text)
 
     # Get available groups and send as separate message
-    groups = await repo.get_active_groups()
+    groups = [(group.group_id, group.title) for group in await repo.groups.get_active_groups()]
+    await state.update_data(groups=groups, selected_group_ids=[])
     await callback.message.answer(
-        "Select group to assign:",
-        reply_markup=get_groups_keyboard(groups)
+        "Select groups to assign:",
+        reply_markup=get_groups_multiselect_keyboard(groups, set())
+    )
+
+
+@questionnaire_router.callback_query(F.data.startswith("toggle_group_"))
+async def toggle_group(callback: CallbackQuery, state: FSMContext):
+    await callback.answer()
+    data = await state.get_data()
+    group_id = int(callback.data.split("_")[2])
+
+    selected = set(data.get('selected_group_ids', []))
+    selected.symmetric_difference_update({group_id})
+    await state.update_data(selected_group_ids=list(selected))
+
+    await callback.message.edit_reply_markup(
+        reply_markup=get_groups_multiselect_keyboard(data.get('groups', []), selected)
     )
 
 
-@questionnaire_router.callback_query(F.data.startswith("group_"))
-async def confirm_assignment(callback: CallbackQuery, state: FSMContext, repo: UserRepo):
+@questionnaire_router.callback_query(F.data == "groups_selected")
+async def confirm_assignment(callback: CallbackQuery, state: FSMContext):
     await callback.answer()
     data = await state.get_data()
-    group_id = int(callback.data.split("_")[1])
 
     questionnaire = data['selected_questionnaire']
-    group = await repo.get_group(group_id)
+    selected = set(data.get('selected_group_ids', []))
+    titles = [title for group_id, title in data.get('groups', []) if group_id in selected]
 
     confirmation_text = (
         f"Please confirm assignment:\n\n"
         f"Questionnaire: {questionnaire.title}\n"
-        f"Group: {group.title}\n"
+        f"Groups ({len(titles)}):\n" + "\n".join(f"- {title}" for title in titles)
     )
 
-    await state.update_data(selected_group_id=group_id)
     await callback.message.edit_text(
         confirmation_text,
         reply_markup=get_confirm_cancel_assignment_keyboard()
@@ -263,42 +297,36 @@ async def confirm_assignment(callback: CallbackQuery, state: FSMContext, repo: U
 
 
 @questionnaire_router.callback_query(F.data == "confirm_assignment")
-async def save_assignment(callback: CallbackQuery, state: FSMContext, repo: UserRepo):
+async def save_assignment(callback: CallbackQuery, state: FSMContext, repo: RequestsRepo):
     data = await state.get_data()
 
     try:
-        # Create assignment
-        assignment = await repo.assign_questionnaire(
+        # Create all assignments at once
+        results = await repo.questionnaires.assign_questionnaire_to_groups(
             questionnaire_id=data['selected_questionnaire'].id,
-            group_id=data['selected_group_id'],
-            due_date=data['selected_questionnaire'].due_date
-        )
-
-        # Get questionnaire and group details
-        questionnaire = await repo.get_questionnaire(assignment.questionnaire_id)
-        group = await repo.get_group(assignment.group_id)
-
-        # Format announcement message
-        announcement_text = (
-            f"📝 New Questionnaire\n\n"
-            f"Title: {questionnaire.title}\n"
-            f"Description: {questionnaire.description}\n"
-            f"Due Date: {assignment.due_date.strftime('%d/%m/%Y %H:%M')}\n\n"
-            f"Please click the button below to start answering:"
+            group_ids=data.get('selected_group_ids', []),
+            due_date=datetime.now() + DEFAULT_ASSIGNMENT_DURATION,
+            created_by=callback.from_user.id
         )
-
-        # Send announcement to the group
-        await callback.bot.send_message(
-            chat_id=group.group_id,
-            text=announcement_text,
-            reply_markup=get_questionnaire_button(
-                assignment_id=assignment.id,
-                bot_username=callback.bot.username
-            )
+        assignments = [result.assignment for result in results if result.assignment]
+
+        # Announce to the groups
+        notified = await notify_groups_about_assignments(
+            callback.bot,
+            assignments,
+            data['selected_questionnaire'],
+            bot_username=(await callback.bot.me()).username
         )
 
         await state.clear()
-        await callback.message.edit_text("✅ Questionnaire has been successfully assigned!")
+        report = "\n".join(
+            f"❌ {result.error}" if result.error else
+            f"✅ Group {result.group_id}" + ("" if notified.get(result.group_id) else " (announcement not delivered)")
+            for result in results
+        )
+        await callback.message.edit_text(
+            f"Questionnaire has been assigned to {len(assignments)} of {len(results)} group(s):\n\n{report}"
+        )
 
     except Exception as e:
         await state.clear()
@@ -313,16 +341,88 @@ async def cancel_assignment(callback: CallbackQuery, state: FSMContext):
     await callback.message.edit_text("❌ Assignment cancelled.")
 
 
+@questionnaire_router.message(Command("remind"))
+async def remind_assignment(message: Message, command: CommandObject, repo: RequestsRepo):
+    """Remind the group members who have not answered an assignment yet: /remind <assignment_id>"""
+    user = await repo.users.get_user(message.from_user.id)
+    if not user or not (user.is_admin() or user.is_mentor()):
+        await message.answer("You don't have permission to send reminders.")
+        return
+
+    if not command.args or not command.args.strip().isdigit():
+        await message.answer("Usage: /remind <assignment_id>")
+        return
+
+    assignment = await repo.questionnaires.get_assignment(int(command.args))
+    if not assignment:
+        await message.answer("Assignment not found.")
+        return
+
+    user_ids = await repo.group_members.get_non_responders(assignment.id)
+    if not user_ids:
+        await message.answer("Everyone in the group has answered 🎉")
+        return
+
+    # Sent by the worker, which reports back to this chat
+    job = await repo.jobs.enqueue(
+        JobKind.REMIND_NON_RESPONDERS,
+        {"assignment_id": assignment.id, "chat_id": message.chat.id},
+        priority=1,
+        created_by=message.from_user.id,
+    )
+    await message.answer(f"Sending reminders to {len(user_ids)} student(s)... (job {job.id}, see /job {job.id})")
+
+
+@questionnaire_router.message(Command("job"))
+async def show_job(message: Message, command: CommandObject, repo: RequestsRepo):
+    """Show the status of a background job: /job <job_id>"""
+    if not command.args or not command.args.strip().isdigit():
+        await message.answer("Usage: /job <job_id>")
+        return
+
+    user = await repo.users.get_user(message.from_user.id)
+    job = await repo.jobs.get_job(int(command.args))
+    if not job or not user or (job.created_by != user.user_id and not user.is_admin()):
+        await message.answer("Job not found.")
+        return
+
+    text = f"Job {job.id} ({job.kind}): {job.status.value}, {job.progress:.0%} done"
+    if job.error:
+        text += f"\nLast error: {html_decoration.quote(job.error)}"
+    if job.result:
+        text += "\n" + ", ".join(f"{key}: {value}" for key, value in job.result.items() if not isinstance(value, list))
+    await message.answer(text)
+
+
+@questionnaire_router.message(Command("export"))
+async def export_catalog(message: Message, command: CommandObject, repo: RequestsRepo):
+    """Send the questionnaires and schedules as a bundle file: /export [ndjson|yaml]"""
+    user = await repo.users.get_user(message.from_user.id)
+    if not user or not user.is_admin():
+        await message.answer("You don't have permission to export questionnaires.")
+        return
+
+    fmt = (command.args or "ndjson").strip()
+    if fmt not in ("ndjson", "yaml"):
+        await message.answer("Usage: /export [ndjson|yaml]")
+        return
+
+    job = await repo.jobs.enqueue(
+        JobKind.EXPORT_BUNDLE, {"format": fmt, "chat_id": message.chat.id}, created_by=message.from_user.id
+    )
+    await message.answer(f"Exporting questionnaires... (job {job.id}, see /job {job.id})")
+
+
 @questionnaire_router.message(Command("close_questionnaire"))
-async def list_active_assignments(message: Message, state: FSMContext, repo: UserRepo):
+async def list_active_assignments(message: Message, state: FSMContext, repo: RequestsRepo):
     # Check if user is admin or mentor
-    user = await repo.get_user(message.from_user.id)
-    if not (user.is_admin() or user.is_mentor()):
+    user = await repo.users.get_user(message.from_user.id)
+    if not user or not (user.is_admin() or user.is_mentor()):
         await message.answer("You don't have permission to close questionnaires.")
         return
 
     # Get active assignments
-    assignments = await repo.get_active_assignments()
+    assignments = await repo.questionnaires.get_active_assignments()
     if not assignments:
         await message.answer("No active questionnaires found.")
         return
@@ -340,12 +440,12 @@ async def list_active_assignments(message: Message, state: FSMContext, repo: Use
 
 
 @questionnaire_router.callback_query(F.data.startswith("close_assignment_"))
-async def confirm_close_assignment(callback: CallbackQuery, state: FSMContext, repo: UserRepo):
+async def confirm_close_assignment(callback: CallbackQuery, state: FSMContext, repo: RequestsRepo):
     await callback.answer()
     assignment_id = int(callback.data.split("_")[2])
 
     # Get assignment details
-    assignment = await repo.get_assignment(assignment_id)
+    assignment = await repo.questionnaires.get_assignment(assignment_id)
     await state.update_data(selected_assignment=assignment)
 
     # Format confirmation message
@@ -367,12 +467,12 @@ async def confirm_close_assignment(callback: CallbackQuery, state: FSMContext, r
 
 
 @questionnaire_router.callback_query(F.data == "confirm_close")
-async def close_assignment(callback: CallbackQuery, state: FSMContext, repo: UserRepo):
+async def close_assignment(callback: CallbackQuery, state: FSMContext, repo: RequestsRepo):
     data = await state.get_data()
     assignment = data['selected_assignment']
 
     # Close the assignment
-    await repo.close_assignment(assignment.id)
+    await repo.questionnaires.close_assignment(assignment.id)
 
     # Send notification to the group
     notification_text = (
@@ -1,20 +1,19 @@
 from aiogram import Router, F
-from aiogram.filters import CommandStart, Command
+from aiogram.filters import CommandStart, Command, CommandObject
 from aiogram.types import Message
 from aiogram.fsm.context import FSMContext
 
 from infrastructure.database.repo.requests import RequestsRepo
 from tgbot.misc.states import QuestionnaireAnswering
 
-user_router = Router()
+user_router = Router(name="user")
 
 
 @user_router.message(CommandStart(deep_link=True))
-async def handle_deep_link(message: Message, state: FSMContext, repo: RequestsRepo):
+async def handle_deep_link(message: Message, command: CommandObject, state: FSMContext, repo: RequestsRepo):
     """Handle deep link start command"""
     # Extract action and payload from deep link
-    args = message.get_args()
-    action, *payload = args.split('_')
+    action, *payload = command.args.split('_')
 
     if action == 'q' and payload:
         try:
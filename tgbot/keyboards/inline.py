@@ -3,6 +3,8 @@ from aiogram.types import InlineKeyboardMarkup, InlineKeyboardButton
 from aiogram.utils.keyboard import InlineKeyboardBuilder
 from typing import Optional
 
+QUESTIONNAIRES_PER_PAGE = 6  # 2 columns × 3 rows
+
 
 def get_questionnaire_button(assignment_id: int, bot_username: str) -> InlineKeyboardMarkup:
     """
@@ -98,6 +100,30 @@ def get_groups_keyboard(groups: list) -> InlineKeyboardMarkup:
     )
 
 
+def get_groups_multiselect_keyboard(groups: list, selected: set) -> InlineKeyboardMarkup:
+    """
+    Create group keyboard where every tap toggles a group
+
+    Args:
+        groups: (group_id, title) pairs of the groups to choose from
+        selected: IDs of the groups selected so far
+    """
+    keyboard = [
+        [InlineKeyboardButton(
+            text=f"{'☑️' if group_id in selected else '⬜'} {title}",
+            callback_data=f"toggle_group_{group_id}"
+        )]
+        for group_id, title in groups
+    ]
+    if selected:
+        keyboard.append([InlineKeyboardButton(
+            text=f"➡️ Assign to {len(selected)} group(s)",
+            callback_data="groups_selected"
+        )])
+    keyboard.append([InlineKeyboardButton(text="❌ Cancel", callback_data="cancel_assignment")])
+    return InlineKeyboardMarkup(inline_keyboard=keyboard)
+
+
 def get_confirm_cancel_assignment_keyboard() -> InlineKeyboardMarkup:
     return InlineKeyboardMarkup(
         inline_keyboard=[
@@ -109,6 +135,25 @@ def get_confirm_cancel_assignment_keyboard() -> InlineKeyboardMarkup:
     )
 
 
+def get_inline_pick_group_keyboard(questionnaire_id: int) -> InlineKeyboardMarkup:
+    """Button continuing the inline query with the groups for a questionnaire"""
+    return InlineKeyboardMarkup(
+        inline_keyboard=[[InlineKeyboardButton(
+            text="👥 Choose a group",
+            switch_inline_query_current_chat=f"q{questionnaire_id} "
+        )]]
+    )
+
+
+def get_inline_assign_keyboard(questionnaire_id: int, group_id: int) -> InlineKeyboardMarkup:
+    return InlineKeyboardMarkup(
+        inline_keyboard=[[InlineKeyboardButton(
+            text="✅ Assign",
+            callback_data=f"inline_assign:{questionnaire_id}:{group_id}"
+        )]]
+    )
+
+
 def get_active_assignments_keyboard(assignments: list, current_page: int) -> InlineKeyboardMarkup:
     keyboard = []
     start_idx = current_page * QUESTIONNAIRES_PER_PAGE
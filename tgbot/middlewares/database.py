@@ -28,10 +28,9 @@ class DatabaseMiddleware(BaseMiddleware):
                 role = UserRole.UNIVERSITY_ADMIN if is_admin else UserRole.STUDENT
 
                 user = await repo.users.get_or_create_user(
-                    event.from_user.id,
-                    event.from_user.full_name,
-                    event.from_user.language_code,
-                    event.from_user.username,
+                    user_id=event.from_user.id,
+                    full_name=event.from_user.full_name,
+                    username=event.from_user.username,
                     role=role
                 )
                 data["user"] = user
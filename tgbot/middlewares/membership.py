@@ -0,0 +1,30 @@
+from typing import Callable, Dict, Any, Awaitable
+
+from aiogram import BaseMiddleware
+from aiogram.enums import ChatType
+from aiogram.types import Message
+
+from tgbot.services.membership import MembershipRecorder
+
+
+class MembershipMiddleware(BaseMiddleware):
+    """Outer message middleware recording who writes in, joins and leaves groups."""
+
+    def __init__(self, recorder: MembershipRecorder) -> None:
+        self.recorder = recorder
+
+    async def __call__(
+        self,
+        handler: Callable[[Message, Dict[str, Any]], Awaitable[Any]],
+        event: Message,
+        data: Dict[str, Any],
+    ) -> Any:
+        if event.chat.type in (ChatType.GROUP, ChatType.SUPERGROUP):
+            if event.from_user and not event.from_user.is_bot:
+                self.recorder.record(event.chat.id, event.from_user.id)
+            for user in event.new_chat_members or []:
+                if not user.is_bot:
+                    self.recorder.record(event.chat.id, user.id)
+            if event.left_chat_member and not event.left_chat_member.is_bot:
+                self.recorder.record(event.chat.id, event.left_chat_member.id, is_member=False)
+        return await handler(event, data)
@@ -0,0 +1,101 @@
+import logging
+import time
+from typing import Callable, Dict, Any, Awaitable
+
+from aiogram import BaseMiddleware, Bot
+from aiogram.client.session.middlewares.base import BaseRequestMiddleware, NextRequestMiddlewareType
+from aiogram.methods import TelegramMethod
+from aiogram.methods.base import TelegramType, Response
+from aiogram.types import TelegramObject, Update
+
+from infrastructure.database.instrumentation import track_queries
+from tgbot.services.metrics import (
+    UpdateMetrics,
+    current_update_metrics,
+    UPDATES,
+    UPDATE_ERRORS,
+    UPDATE_LATENCY,
+    UPDATE_DB_TIME,
+    UPDATE_TELEGRAM_TIME,
+    TELEGRAM_REQUESTS,
+    TELEGRAM_ERRORS,
+)
+
+
+class MetricsMiddleware(BaseMiddleware):
+    """
+    Outer update middleware that measures every update.
+
+    Records the latency, count and errors of the update together with the
+    time it spent on database statements and Telegram API calls.
+    """
+
+    async def __call__(
+        self,
+        handler: Callable[[Update, Dict[str, Any]], Awaitable[Any]],
+        event: Update,
+        data: Dict[str, Any],
+    ) -> Any:
+        metrics = UpdateMetrics(update_type=event.event_type)
+        data["update_metrics"] = metrics
+        token = current_update_metrics.set(metrics)
+
+        started = time.perf_counter()
+        try:
+            with track_queries(f"update {event.update_id}") as query_stats:
+                return await handler(event, data)
+        except Exception:
+            UPDATE_ERRORS.labels(**metrics.labels).inc()
+            raise
+        finally:
+            current_update_metrics.reset(token)
+            elapsed = time.perf_counter() - started
+            labels = metrics.labels
+            UPDATES.labels(**labels).inc()
+            UPDATE_LATENCY.labels(**labels).observe(elapsed)
+            UPDATE_DB_TIME.labels(**labels).observe(query_stats.duration)
+            UPDATE_TELEGRAM_TIME.labels(**labels).observe(metrics.telegram_time)
+            logging.info(
+                f"Update {event.update_id} ({metrics.update_type}) "
+                f"handled by {metrics.router}.{metrics.handler} in {elapsed * 1000:.1f} ms: "
+                f"{query_stats.summary()}, {metrics.telegram_time * 1000:.1f} ms in Telegram"
+            )
+
+
+class HandlerLabelMiddleware(BaseMiddleware):
+    """Inner middleware that tells the metrics which router and handler took the update."""
+
+    async def __call__(
+        self,
+        handler: Callable[[TelegramObject, Dict[str, Any]], Awaitable[Any]],
+        event: TelegramObject,
+        data: Dict[str, Any],
+    ) -> Any:
+        metrics = data.get("update_metrics")
+        if metrics is not None:
+            metrics.router = data["event_router"].name
+            metrics.handler = data["handler"].callback.__name__
+        return await handler(event, data)
+
+
+class TelegramRequestMetrics(BaseRequestMiddleware):
+    """Bot session middleware that times every Telegram Bot API call."""
+
+    async def __call__(
+        self,
+        make_request: NextRequestMiddlewareType[TelegramType],
+        bot: Bot,
+        method: TelegramMethod[TelegramType],
+    ) -> Response[TelegramType]:
+        started = time.perf_counter()
+        try:
+            return await make_request(bot, method)
+        except Exception:
+            TELEGRAM_ERRORS.labels(method=method.__api_method__).inc()
+            raise
+        finally:
+            elapsed = time.perf_counter() - started
+            TELEGRAM_REQUESTS.labels(method=method.__api_method__).observe(elapsed)
+            metrics = current_update_metrics.get()
+            if metrics is not None:
+                metrics.telegram_time += elapsed
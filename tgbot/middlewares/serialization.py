@@ -0,0 +1,95 @@
+import asyncio
+import logging
+import time
+from dataclasses import dataclass, field
+from typing import TYPE_CHECKING, Callable, Dict, Any, Awaitable, Optional, Tuple
+
+from aiogram import BaseMiddleware
+from aiogram.types import Update
+from tgbot.services.metrics import UPDATE_LOCK_WAIT, UPDATE_LOCK_CONTENDED, UPDATE_LOCK_REJECTED, UPDATE_LOCK_KEYS
+
+if TYPE_CHECKING:
+    from redis.asyncio import Redis
+
+LockKey = Tuple[int, int]
+
+
+@dataclass
+class _KeyLock:
+    lock: asyncio.Lock = field(default_factory=asyncio.Lock)
+    # Updates holding or waiting for the lock
+    users: int = 0
+
+
+class UserSerializationMiddleware(BaseMiddleware):
+    """
+    Outer update middleware that handles the updates of one user in one chat one at a time.
+
+    aiogram handles updates concurrently, so two quick taps on the same
+    button could interleave their FSM reads and writes. Updates of the same
+    (chat, user) pair wait for each other here, other users are not affected.
+    At most `max_waiting` updates wait per pair, further ones are dropped.
+
+    With `redis` (the connection of `RedisStorage`), the pair is also locked
+    in Redis, so processes sharing the FSM storage serialize too. The Redis
+    lock expires after `lock_timeout` seconds in case a process dies holding it.
+
+    Inline queries are not serialized: they don't touch the FSM, and a query
+    waiting here could not be superseded by the next keystroke.
+    """
+
+    def __init__(
+            self,
+            redis: Optional["Redis"] = None,
+            max_waiting: int = 3,
+            lock_timeout: float = 60,
+    ) -> None:
+        self.redis = redis
+        self.max_waiting = max_waiting
+        self.lock_timeout = lock_timeout
+        self._locks: Dict[LockKey, _KeyLock] = {}
+
+    async def __call__(
+        self,
+        handler: Callable[[Update, Dict[str, Any]], Awaitable[Any]],
+        event: Update,
+        data: Dict[str, Any],
+    ) -> Any:
+        user = data.get("event_from_user")
+        chat = data.get("event_chat")
+        if user is None or event.inline_query is not None:
+            return await handler(event, data)
+        key = (chat.id if chat is not None else user.id, user.id)
+
+        key_lock = self._locks.get(key)
+        if key_lock is None:
+            key_lock = self._locks[key] = _KeyLock()
+            UPDATE_LOCK_KEYS.inc()
+        if key_lock.users > self.max_waiting:
+            UPDATE_LOCK_REJECTED.inc()
+            logging.warning(f"Dropped update {event.update_id}: too many updates of user {user.id} waiting")
+            if event.callback_query is not None:
+                await event.callback_query.answer("Please wait, the previous action is still in progress")
+            return None
+
+        key_lock.users += 1
+        started = time.perf_counter()
+        if key_lock.lock.locked():
+            UPDATE_LOCK_CONTENDED.inc()
+        try:
+            async with key_lock.lock:
+                if self.redis is None:
+                    UPDATE_LOCK_WAIT.observe(time.perf_counter() - started)
+                    return await handler(event, data)
+
+                redis_lock = self.redis.lock(
+                    f"update_lock:{key[0]}:{key[1]}", timeout=self.lock_timeout, blocking_timeout=self.lock_timeout
+                )
+                async with redis_lock:
+                    UPDATE_LOCK_WAIT.observe(time.perf_counter() - started)
+                    return await handler(event, data)
+        finally:
+            key_lock.users -= 1
+            if key_lock.users == 0:
+                del self._locks[key]
+                UPDATE_LOCK_KEYS.dec()
@@ -0,0 +1,173 @@
+"""
+In-memory indexes answering inline queries without touching the database.
+
+Telegram sends an inline query for every keystroke. `InlineIndex` keeps the
+questionnaire titles, the active groups and the users allowed to assign in
+memory, reloaded every `REFRESH_INTERVAL` seconds with one query each, and
+matches queries by word prefixes: "wee fee" finds "Weekly feedback". Results
+of recent queries are cached until the next reload.
+
+With an `InvalidationBus`, the indexes are reloaded as soon as any process
+changes a questionnaire, group or user, and otherwise only every
+`INVALIDATED_REFRESH_INTERVAL` seconds while the bus is connected.
+"""
+import asyncio
+import bisect
+import logging
+import re
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Dict, List, Optional, Set, Tuple
+
+from sqlalchemy import select
+
+from infrastructure.database.invalidation import InvalidationBus
+from infrastructure.database.models import Group, Questionnaire, User, UserRole
+from infrastructure.database.routing import prefer_replica
+
+REFRESH_INTERVAL = 60
+INVALIDATED_REFRESH_INTERVAL = 3600
+CACHE_SIZE = 1024
+
+_WORD = re.compile(r"\w+")
+
+
+def _words(text: str) -> List[str]:
+    return _WORD.findall(text.lower())
+
+
+@dataclass(frozen=True)
+class IndexEntry:
+    id: int
+    title: str
+    description: str = ""
+
+
+class PrefixIndex:
+    """Entries found by word prefixes: every word of a query must start a word of the title."""
+
+    def __init__(self, entries: List[IndexEntry]) -> None:
+        # Results keep the order of `entries`
+        self.entries: Dict[int, IndexEntry] = {entry.id: entry for entry in entries}
+        self._position = {entry.id: position for position, entry in enumerate(entries)}
+        pairs = sorted((word, entry.id) for entry in entries for word in set(_words(entry.title)))
+        self._words = [word for word, _ in pairs]
+        self._ids = [entry_id for _, entry_id in pairs]
+
+    def _starting_with(self, prefix: str) -> Set[int]:
+        ids = set()
+        position = bisect.bisect_left(self._words, prefix)
+        while position < len(self._words) and self._words[position].startswith(prefix):
+            ids.add(self._ids[position])
+            position += 1
+        return ids
+
+    def search(self, query: str, limit: int) -> List[IndexEntry]:
+        ids: Optional[Set[int]] = None
+        for word in _words(query):
+            found = self._starting_with(word)
+            ids = found if ids is None else ids & found
+            if not ids:
+                return []
+        if ids is None:
+            return list(self.entries.values())[:limit]
+        return [self.entries[entry_id] for entry_id in sorted(ids, key=self._position.get)[:limit]]
+
+
+class InlineIndex:
+    """
+    Questionnaires, active groups and assigning users for inline queries.
+
+    Example usage:
+        index = InlineIndex(session_pool)
+        await index.refresh()
+        index.search("questionnaires", "weekly fee", limit=20)
+    """
+
+    def __init__(
+            self,
+            session_pool,
+            refresh_interval: float = REFRESH_INTERVAL,
+            invalidation: Optional[InvalidationBus] = None,
+    ) -> None:
+        self.session_pool = session_pool
+        self.refresh_interval = refresh_interval
+        self.invalidation = invalidation
+        if invalidation is not None:
+            invalidation.subscribe(["questionnaire", "group", "user"], self.invalidate)
+        self._stale = False
+        self.questionnaires = PrefixIndex([])
+        self.groups = PrefixIndex([])
+        self.assigners: Set[int] = set()
+        self._loaded_at: Optional[float] = None
+        self._refreshing: Optional[asyncio.Task] = None
+        self._cache: "OrderedDict[Tuple[str, str, int], List[IndexEntry]]" = OrderedDict()
+
+    async def refresh(self) -> None:
+        """Reload the indexes from the database."""
+        async with self.session_pool() as session:
+            prefer_replica(session)
+            questionnaires = await session.execute(
+                select(Questionnaire.id, Questionnaire.title, Questionnaire.description)
+                .order_by(Questionnaire.created_at.desc())
+            )
+            groups = await session.execute(
+                select(Group.group_id, Group.title).where(Group.is_active == True).order_by(Group.title)
+            )
+            assigners = await session.scalars(
+                select(User.user_id).where(User.role.in_([UserRole.MENTOR, UserRole.UNIVERSITY_ADMIN]))
+            )
+            self.questionnaires = PrefixIndex([IndexEntry(*row) for row in questionnaires])
+            self.groups = PrefixIndex([IndexEntry(group_id, title) for group_id, title in groups])
+            self.assigners = set(assigners)
+        self._cache.clear()
+        self._loaded_at = time.monotonic()
+
+    async def ensure_loaded(self) -> None:
+        """Load the indexes on first use; afterwards stale indexes keep serving while they reload."""
+        if self._loaded_at is None:
+            await self.refresh()
+            return
+        max_age = INVALIDATED_REFRESH_INTERVAL \
+            if self.invalidation is not None and self.invalidation.connected else self.refresh_interval
+        if self._stale or time.monotonic() - self._loaded_at > max_age:
+            self._reload()
+
+    def invalidate(self, ids: Optional[List[int]] = None) -> None:
+        """Reload the indexes now, their data changed."""
+        self._stale = True
+        if self._loaded_at is not None:
+            self._reload()
+
+    def _reload(self) -> None:
+        if self._refreshing is None or self._refreshing.done():
+            self._refreshing = asyncio.create_task(self._refresh_in_background())
+
+    async def _refresh_in_background(self) -> None:
+        try:
+            # Changes made while reloading may not be in what was read, reload again then
+            while True:
+                self._stale = False
+                await self.refresh()
+                if not self._stale:
+                    break
+        except Exception:
+            logging.exception("Failed to reload the inline query indexes")
+
+    def can_assign(self, user_id: int) -> bool:
+        return user_id in self.assigners
+
+    def search(self, kind: str, query: str, limit: int) -> List[IndexEntry]:
+        """Search "questionnaires" or "groups", repeated queries are answered from the cache."""
+        key = (kind, " ".join(_words(query)), limit)
+        results = self._cache.get(key)
+        if results is not None:
+            self._cache.move_to_end(key)
+            return results
+
+        results = getattr(self, kind).search(query, limit)
+        self._cache[key] = results
+        if len(self._cache) > CACHE_SIZE:
+            self._cache.popitem(last=False)
+        return results
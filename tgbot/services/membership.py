@@ -0,0 +1,62 @@
+import asyncio
+import logging
+from typing import Dict, Tuple
+
+from infrastructure.database.repo.group_members import GroupMemberRepo
+
+FLUSH_INTERVAL = 5
+MAX_PENDING = 1000
+
+
+class MembershipRecorder:
+    """
+    Collects group memberships seen in updates and writes them in batches.
+
+    Every group message would otherwise be a database write. Memberships are
+    coalesced in memory, the latest state of a (group, user) pair wins, and
+    `run` upserts them every `FLUSH_INTERVAL` seconds, or sooner once
+    `MAX_PENDING` pairs are waiting. Memberships still pending when the
+    process dies are recorded again with the next message of the user.
+
+    Example usage:
+        recorder = MembershipRecorder(session_pool)
+        task = asyncio.create_task(recorder.run())
+        recorder.record(group_id, user_id, is_member=True)
+    """
+
+    def __init__(self, session_pool) -> None:
+        self.session_pool = session_pool
+        self._pending: Dict[Tuple[int, int], bool] = {}
+        self._full = asyncio.Event()
+
+    def record(self, group_id: int, user_id: int, is_member: bool = True) -> None:
+        self._pending[(group_id, user_id)] = is_member
+        if len(self._pending) >= MAX_PENDING:
+            self._full.set()
+
+    async def flush(self) -> int:
+        """Write the pending memberships, return how many were recorded."""
+        if not self._pending:
+            return 0
+        pending, self._pending = self._pending, {}
+        self._full.clear()
+        try:
+            async with self.session_pool() as session:
+                return await GroupMemberRepo(session).upsert_members(pending)
+        except Exception:
+            # Keep them for the next flush, newer states recorded meanwhile win
+            self._pending = {**pending, **self._pending}
+            raise
+
+    async def run(self, interval: float = FLUSH_INTERVAL) -> None:
+        """Flush every `interval` seconds or when enough memberships are pending, forever."""
+        while True:
+            try:
+                await asyncio.wait_for(self._full.wait(), timeout=interval)
+            except asyncio.TimeoutError:
+                pass
+            try:
+                await self.flush()
+            except Exception:
+                logging.exception("Failed to record group members")
+                await asyncio.sleep(interval)
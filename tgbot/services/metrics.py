@@ -0,0 +1,128 @@
+import logging
+from contextvars import ContextVar
+from dataclasses import dataclass
+from typing import Optional
+
+from aiohttp import web
+from prometheus_client import Counter, Gauge, Histogram, REGISTRY, CONTENT_TYPE_LATEST, generate_latest
+from prometheus_client.core import GaugeMetricFamily
+from sqlalchemy.ext.asyncio import AsyncEngine
+
+from infrastructure.database.pool import pool_status
+
+HANDLER_LABELS = ("router", "handler", "update_type")
+
+UPDATES = Counter(
+    "bot_updates_total",
+    "Updates processed by the bot",
+    HANDLER_LABELS,
+)
+UPDATE_ERRORS = Counter(
+    "bot_update_errors_total",
+    "Updates whose processing raised an exception",
+    HANDLER_LABELS,
+)
+UPDATE_LATENCY = Histogram(
+    "bot_update_duration_seconds",
+    "Time spent processing an update, middlewares included",
+    HANDLER_LABELS,
+)
+UPDATE_DB_TIME = Histogram(
+    "bot_update_db_seconds",
+    "Time an update spent waiting on the database",
+    HANDLER_LABELS,
+)
+UPDATE_TELEGRAM_TIME = Histogram(
+    "bot_update_telegram_seconds",
+    "Time an update spent waiting on Telegram Bot API calls",
+    HANDLER_LABELS,
+)
+TELEGRAM_REQUESTS = Histogram(
+    "bot_telegram_request_duration_seconds",
+    "Telegram Bot API call latency",
+    ("method",),
+)
+TELEGRAM_ERRORS = Counter(
+    "bot_telegram_request_errors_total",
+    "Telegram Bot API calls that failed",
+    ("method",),
+)
+UPDATE_LOCK_WAIT = Histogram(
+    "bot_update_lock_wait_seconds",
+    "Time an update waited for the earlier updates of the same user in the same chat",
+)
+UPDATE_LOCK_CONTENDED = Counter(
+    "bot_update_lock_contended_total",
+    "Updates that had to wait for an earlier update of the same user in the same chat",
+)
+UPDATE_LOCK_REJECTED = Counter(
+    "bot_update_lock_rejected_total",
+    "Updates dropped because too many updates of the same user in the same chat were waiting",
+)
+UPDATE_LOCK_KEYS = Gauge(
+    "bot_update_lock_keys",
+    "User and chat pairs with an update in progress",
+)
+
+
+@dataclass
+class UpdateMetrics:
+    """
+    Measurements of the update being processed.
+
+    The metrics middleware creates it, the handler label middleware fills in
+    where the update was handled, and Telegram calls add their time to it.
+    """
+
+    update_type: str
+    router: str = "unhandled"
+    handler: str = "unhandled"
+    telegram_time: float = 0.0
+
+    @property
+    def labels(self) -> dict:
+        return {
+            "router": self.router,
+            "handler": self.handler,
+            "update_type": self.update_type,
+        }
+
+
+current_update_metrics: ContextVar[Optional[UpdateMetrics]] = ContextVar("update_metrics", default=None)
+
+
+class PoolCollector:
+    """Exports the gauges of a connection pool at scrape time."""
+
+    def __init__(self, engine: AsyncEngine, process: str = "bot") -> None:
+        self.engine = engine
+        self.process = process
+
+    def collect(self):
+        for name, value in pool_status(self.engine).items():
+            gauge = GaugeMetricFamily(f"db_pool_{name}", f"Connection pool {name}", labels=["process"])
+            gauge.add_metric([self.process], value)
+            yield gauge
+
+
+async def start_metrics_server(host: str, port: int) -> web.AppRunner:
+    """
+    Serve the Prometheus metrics of this process on http://host:port/metrics.
+
+    :return: The runner; call `cleanup()` on it to stop the server.
+    """
+
+    async def metrics(request: web.Request) -> web.Response:
+        response = web.Response(body=generate_latest(REGISTRY))
+        response.content_type = CONTENT_TYPE_LATEST.split(";")[0]
+        response.charset = "utf-8"
+        return response
+
+    app = web.Application()
+    app.router.add_get("/metrics", metrics)
+
+    runner = web.AppRunner(app, access_log=None)
+    await runner.setup()
+    await web.TCPSite(runner, host, port).start()
+    logging.info(f"Serving metrics on http://{host}:{port}/metrics")
+    return runner
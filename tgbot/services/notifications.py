@@ -0,0 +1,92 @@
+import asyncio
+from typing import Dict, List
+
+from aiogram import Bot
+
+from infrastructure.database.models import Assignment, Questionnaire
+from tgbot.keyboards.inline import get_questionnaire_button
+from tgbot.services.broadcaster import broadcast, send_message
+
+# Telegram allows about 30 messages per second per bot, keep some room for other updates
+MESSAGES_PER_SECOND = 20
+MAX_CONCURRENT_SENDS = 10
+
+
+async def notify_group_about_assignment(
+        bot: Bot,
+        assignment: Assignment,
+        questionnaire: Questionnaire,
+        bot_username: str,
+) -> bool:
+    """
+    Tell a group that a questionnaire was assigned to it.
+
+    :param bot: Bot instance.
+    :param assignment: The new assignment.
+    :param questionnaire: The assigned questionnaire.
+    :param bot_username: Bot's username for deep link creation.
+    :return: success.
+    """
+    text = f"📋 A new questionnaire has been assigned to your group!\n\n" \
+           f"Title: {questionnaire.title}\n" \
+           f"Due Date: {assignment.due_date.strftime('%Y-%m-%d %H:%M')}"  # Format as needed
+
+    button = get_questionnaire_button(assignment_id=assignment.id, bot_username=bot_username)
+    return await send_message(bot=bot, user_id=assignment.group_id, text=text, reply_markup=button)
+
+
+async def notify_groups_about_assignments(
+        bot: Bot,
+        assignments: List[Assignment],
+        questionnaire: Questionnaire,
+        bot_username: str,
+        messages_per_second: float = MESSAGES_PER_SECOND,
+        concurrency: int = MAX_CONCURRENT_SENDS,
+) -> Dict[int, bool]:
+    """
+    Tell every group of a bulk assignment about it, concurrently.
+
+    At most `concurrency` messages are in flight and they start at most
+    `messages_per_second` per second; flood-limit answers are retried by `send_message`.
+
+    :return: Whether the notification was delivered, by group ID.
+    """
+    semaphore = asyncio.Semaphore(concurrency)
+    loop = asyncio.get_running_loop()
+    interval = 1 / messages_per_second
+    next_slot = loop.time()
+
+    async def notify(assignment: Assignment) -> bool:
+        nonlocal next_slot
+        async with semaphore:
+            now = loop.time()
+            slot = max(now, next_slot)
+            next_slot = slot + interval
+            await asyncio.sleep(slot - now)
+            return await notify_group_about_assignment(bot, assignment, questionnaire, bot_username)
+
+    delivered = await asyncio.gather(*(notify(assignment) for assignment in assignments))
+    return {assignment.group_id: ok for assignment, ok in zip(assignments, delivered)}
+
+
+async def remind_non_responders(
+        bot: Bot,
+        assignment: Assignment,
+        user_ids: List[int],
+        bot_username: str,
+) -> int:
+    """
+    Remind students in private messages to answer an assignment.
+
+    Students who never started the bot cannot be messaged, `broadcast` skips them.
+
+    :param assignment: The assignment, with its questionnaire loaded.
+    :param user_ids: The students to remind, see `GroupMemberRepo.get_non_responders`.
+    :return: Count of delivered reminders.
+    """
+    text = f"⏰ Reminder: you have not answered the questionnaire yet!\n\n" \
+           f"Title: {assignment.questionnaire.title}\n" \
+           f"Due Date: {assignment.due_date.strftime('%Y-%m-%d %H:%M')}"
+
+    button = get_questionnaire_button(assignment_id=assignment.id, bot_username=bot_username)
+    return await broadcast(bot, user_ids, text, reply_markup=button)
@@ -0,0 +1,19 @@
+from typing import Optional
+
+from aiogram.client.session.aiohttp import AiohttpSession
+from aiogram.client.telegram import TelegramAPIServer
+
+from tgbot.config import TgBot
+
+
+def create_bot_session(tg_bot: TgBot) -> Optional[AiohttpSession]:
+    """
+    Create a Bot API session for the configured server.
+
+    :param tg_bot: The bot configuration.
+    :return: A session pointed at `tg_bot.api_url`, or None to use aiogram's default
+        session talking to the official Bot API.
+    """
+    if not tg_bot.api_url:
+        return None
+    return AiohttpSession(api=TelegramAPIServer.from_base(tg_bot.api_url))
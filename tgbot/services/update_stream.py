@@ -0,0 +1,169 @@
+"""
+Update ingestion through Redis Streams, for running the bot on several cores.
+
+The receiver long-polls Telegram and appends every update to one of
+`StreamConfig.shards` streams, picked by chat id, so all updates of a chat
+land in the same stream in order. Worker processes run the regular
+dispatcher. Worker N of M owns the shards with `shard % M == N` and consumes
+each of its shards sequentially, so updates of a chat are handled in order
+while different shards run in parallel, in one process and across processes.
+
+Delivery is at least once. Entries are acknowledged after the dispatcher has
+handled them. A failed update is retried with backoff, and after
+`max_deliveries` attempts it is moved to the `<prefix>:dead` stream. Entries
+left pending by a crashed worker are re-delivered when it restarts, or taken
+over by the new owner of the shard after `claim_idle_ms`.
+"""
+import asyncio
+import logging
+from typing import List, Optional
+
+from aiogram import Bot, Dispatcher
+from aiogram.exceptions import TelegramNetworkError
+from aiogram.types import Update
+from redis.asyncio import Redis
+from redis.exceptions import ResponseError
+
+from tgbot.config import StreamConfig
+
+BATCH_SIZE = 50
+BLOCK_MS = 5000
+
+
+def update_chat_id(update: Update) -> int:
+    """The chat an update belongs to, or its sender for updates without a chat, 0 when there is neither."""
+    event = update.event
+    chat = getattr(event, "chat", None) or getattr(getattr(event, "message", None), "chat", None)
+    if chat is not None:
+        return chat.id
+    user = getattr(event, "from_user", None)
+    return user.id if user is not None else 0
+
+
+def shard_stream(config: StreamConfig, shard: int) -> str:
+    return f"{config.prefix}:{shard}"
+
+
+class UpdateReceiver:
+    """Polls Telegram and appends the updates to the shard streams."""
+
+    def __init__(self, bot: Bot, redis: Redis, config: StreamConfig) -> None:
+        self.bot = bot
+        self.redis = redis
+        self.config = config
+
+    async def run(self, allowed_updates: Optional[List[str]] = None, polling_timeout: int = 30) -> None:
+        offset = None
+        while True:
+            try:
+                updates = await self.bot.get_updates(
+                    offset=offset, timeout=polling_timeout, allowed_updates=allowed_updates
+                )
+            except TelegramNetworkError as e:
+                logging.warning(f"Failed to fetch updates: {e}")
+                await asyncio.sleep(1)
+                continue
+            if not updates:
+                continue
+
+            pipeline = self.redis.pipeline(transaction=False)
+            for update in updates:
+                shard = update_chat_id(update) % self.config.shards
+                pipeline.xadd(
+                    shard_stream(self.config, shard),
+                    {"update": update.model_dump_json(by_alias=True, exclude_none=True)},
+                    maxlen=self.config.max_len,
+                    approximate=True,
+                )
+            # Confirm the updates to Telegram only once they are in the streams
+            await pipeline.execute()
+            offset = updates[-1].update_id + 1
+
+
+class UpdateWorker:
+    """Feeds the updates of the owned shards into the dispatcher, see the module docstring."""
+
+    def __init__(self, dp: Dispatcher, bot: Bot, redis: Redis, config: StreamConfig, index: int) -> None:
+        if not 0 <= index < config.workers:
+            raise ValueError(f"Worker index {index} is out of range for {config.workers} workers")
+        self.dp = dp
+        self.bot = bot
+        self.redis = redis
+        self.config = config
+        self.consumer = f"worker-{index}"
+        self.shards = [shard for shard in range(config.shards) if shard % config.workers == index]
+
+    async def run(self) -> None:
+        logging.info(f"{self.consumer} consumes shards {self.shards}")
+        await asyncio.gather(*(self._consume(shard_stream(self.config, shard)) for shard in self.shards))
+
+    async def _consume(self, stream: str) -> None:
+        await self._ensure_group(stream)
+        await self._claim_abandoned(stream)
+
+        # Entries delivered to this consumer but not acknowledged first, then new ones
+        last_id = "0"
+        while True:
+            response = await self.redis.xreadgroup(
+                self.config.group,
+                self.consumer,
+                {stream: last_id},
+                count=BATCH_SIZE,
+                block=BLOCK_MS if last_id == ">" else None,
+            )
+            entries = response[0][1] if response else []
+            if not entries:
+                # Claimed entries become pending with this consumer, read them with "0"
+                last_id = "0" if last_id == ">" and await self._claim_abandoned(stream) else ">"
+                continue
+            for entry_id, fields in entries:
+                if fields:  # Empty when the entry was trimmed while pending
+                    await self._handle(stream, entry_id, fields, redelivered=last_id == "0")
+                await self.redis.xack(stream, self.config.group, entry_id)
+
+    async def _handle(self, stream: str, entry_id, fields: dict, redelivered: bool) -> None:
+        payload = fields.get(b"update") or fields.get("update")
+        attempt = await self._deliveries(stream, entry_id) if redelivered else 1
+        while True:
+            try:
+                update = Update.model_validate_json(payload, context={"bot": self.bot})
+                await self.dp.feed_update(self.bot, update)
+                return
+            except Exception:
+                logging.exception(f"Update {entry_id} from {stream} failed, attempt {attempt}")
+                if attempt >= self.config.max_deliveries:
+                    await self.redis.xadd(
+                        f"{self.config.prefix}:dead",
+                        {"update": payload, "stream": stream},
+                        maxlen=self.config.max_len,
+                        approximate=True,
+                    )
+                    return
+                await asyncio.sleep(min(2 ** attempt, 30))
+                attempt += 1
+
+    async def _deliveries(self, stream: str, entry_id) -> int:
+        pending = await self.redis.xpending_range(stream, self.config.group, min=entry_id, max=entry_id, count=1)
+        return pending[0]["times_delivered"] if pending else 1
+
+    async def _ensure_group(self, stream: str) -> None:
+        try:
+            await self.redis.xgroup_create(stream, self.config.group, id="0", mkstream=True)
+        except ResponseError as e:
+            if "BUSYGROUP" not in str(e):
+                raise
+
+    async def _claim_abandoned(self, stream: str) -> int:
+        """Take over entries pending with other consumers, e.g. after the number of workers changed."""
+        start = "0-0"
+        total = 0
+        while True:
+            start, claimed, *_ = await self.redis.xautoclaim(
+                stream, self.config.group, self.consumer, self.config.claim_idle_ms, start_id=start, justid=True
+            )
+            total += len(claimed)
+            if start in (b"0-0", "0-0"):
+                break
+        if total:
+            logging.info(f"{self.consumer} took over {total} pending updates of {stream}")
+        return total
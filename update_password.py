@@ -1,11 +1,11 @@
 import asyncio
 from infrastructure.database.repo.users import UserRepo
 from infrastructure.database.setup import create_engine, create_session_pool
-from tgbot.config import load_config
+from tgbot.config import get_config
 
 async def update_password(user_id: int, new_password: str):
     # Load configuration and create database session
-    config = load_config(".env")
+    config = get_config()
     engine = create_engine(config.db)
     session_pool = create_session_pool(engine)
 